@@ -0,0 +1,551 @@
+#!/usr/bin/env python3
+"""
+Regression checks.
+Exercises behaviour that is easy to break silently (index refresh, caches,
+checklist round trips, the service job queue) against small hand-made
+findings served from the SQLite stand-in, without TiDB or an LLM.
+
+Usage:
+    poetry run python -m benchmarks.checks
+    poetry run python -m benchmarks.checks index_refresh
+"""
+
+import argparse
+import contextlib
+import http.client
+import io
+import json
+import logging
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer
+from pathlib import Path
+from typing import List, Dict, Any, Callable
+
+from benchmarks.standin import TABLE_NAME, StandInRetriever
+from finding_retriever.query_builder import ALL_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+CHECKS: Dict[str, Callable[[Path], None]] = {}
+
+
+def check(function: Callable[[Path], None]) -> Callable[[Path], None]:
+    """Register a check; it receives a fresh working directory and raises AssertionError on failure."""
+    CHECKS[function.__name__.removeprefix("check_")] = function
+    return function
+
+
+def make_finding(row_id: int, title: str, content: str, **columns) -> Dict[str, Any]:
+    """
+    Build a finding with every t_solodit_findings column.
+
+    Args:
+        row_id: Finding id
+        title: Finding title
+        content: Finding content
+        **columns: Values overriding the defaults of other columns
+
+    Returns:
+        Finding dictionary
+    """
+    finding = {column: None for column in ALL_COLUMNS}
+    finding.update({
+        "id": row_id,
+        "title": title,
+        "content": content,
+        "impact": "HIGH",
+        "audit_company": "Code4rena",
+        "publish_date": "2024-01-15",
+        "updated_time": "2024-01-01 00:00:00",
+        "is_valid": 1,
+    })
+    finding.update(columns)
+    return finding
+
+
+def write_standin(path: Path, findings: List[Dict[str, Any]]) -> None:
+    """
+    Insert or replace findings in a stand-in database, creating it if needed.
+
+    Args:
+        path: SQLite stand-in database file
+        findings: Findings built with make_finding()
+    """
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute(f"CREATE TABLE IF NOT EXISTS {TABLE_NAME} ({', '.join(ALL_COLUMNS)}, PRIMARY KEY (id))")
+        conn.executemany(
+            f"INSERT OR REPLACE INTO {TABLE_NAME} VALUES ({', '.join('?' * len(ALL_COLUMNS))})",
+            [tuple(finding[column] for column in ALL_COLUMNS) for finding in findings],
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+@check
+def check_index_refresh(workdir: Path) -> None:
+    """A refreshed finding is only found by its new text and the FTS index stays consistent."""
+    from finding_retriever.local_index import FTS_TABLE_NAME, FindingsIndex
+
+    database = workdir / "standin.sqlite"
+    write_standin(database, [
+        make_finding(1, "Vesting cliff bug", "The vesting cliff is skipped"),
+        make_finding(2, "Oracle staleness", "Stale oracle price is accepted"),
+    ])
+    source = StandInRetriever(database)
+    index = FindingsIndex(workdir / "index.sqlite")
+    index.rebuild(source)
+
+    write_standin(database, [
+        make_finding(1, "Oracle bug", "The oracle rounds down", updated_time="2024-02-01 00:00:00"),
+    ])
+    index.refresh(source)
+
+    def search(term: str) -> List[int]:
+        return sorted(row["id"] for batch in index.search(term) for row in batch)
+
+    assert search("vesting") == [], f"stale tokens still match: {search('vesting')}"
+    assert search("oracle") == [1, 2], search("oracle")
+
+    connection = index.connect()
+    try:
+        connection.execute(f"INSERT INTO {FTS_TABLE_NAME} ({FTS_TABLE_NAME}) VALUES ('integrity-check')")
+    finally:
+        connection.close()
+
+
+@check
+def check_empty_index_rebuild(workdir: Path) -> None:
+    """Rebuilding the index from an empty source leaves a searchable index that later refreshes fill."""
+    from finding_retriever.local_index import FindingsIndex
+
+    database = workdir / "standin.sqlite"
+    write_standin(database, [])
+    source = StandInRetriever(database)
+    index = FindingsIndex(workdir / "index.sqlite")
+    assert index.rebuild(source) == {"upserted": 0, "removed": 0}
+    assert index.exists()
+    assert [row for batch in index.search("vesting") for row in batch] == []
+
+    write_standin(database, [make_finding(1, "Vesting cliff bug", "The vesting cliff is skipped")])
+    index.refresh(source)
+    assert [row["id"] for batch in index.search("vesting") for row in batch] == [1]
+
+
+@check
+def check_latest_format(workdir: Path) -> None:
+    """Stored findings are loaded from the most recently written format, not a stale one."""
+    from finding_retriever.store import findings_path, load_findings, open_writer
+
+    for fmt, title, mtime in (("arrow", "Old arrow", 1000), ("parquet", "Old parquet", 2000),
+                              ("csv", "Fresh csv", 3000)):
+        path = findings_path("vesting", fmt, workdir)
+        with open_writer(path, fmt) as writer:
+            writer.write_batch([make_finding(1, title, "content")])
+        os.utime(path, (mtime, mtime))
+
+    titles = list(load_findings("vesting", columns=["title"], findings_dir=workdir)["title"])
+    assert titles == ["Fresh csv"], titles
+
+
+@check
+def check_repeated_categories(workdir: Path) -> None:
+    """A category listed twice is retrieved once, without duplicating its findings."""
+    from finding_retriever.store import load_findings
+
+    database = workdir / "standin.sqlite"
+    write_standin(database, [
+        make_finding(1, "Vesting cliff bug", "The vesting cliff is skipped"),
+        make_finding(2, "Oracle staleness", "Stale oracle price is accepted"),
+    ])
+    counts = StandInRetriever(database).retrieve_categories(["vesting", "oracle", "vesting"])
+    assert counts == {"vesting": 1, "oracle": 1}, counts
+    assert list(load_findings("vesting")["id"]) == [1]
+
+
+@check
+def check_response_cache(workdir: Path) -> None:
+    """LLM responses round-trip, expire after the TTL and are evicted least recently used first."""
+    from checklist_generator.response_cache import LLMResponseCache
+
+    cache = LLMResponseCache(workdir / "llm", max_bytes=10 ** 6)
+    keys = [cache.key("model", [{"role": "user", "content": f"prompt {i}"}], temperature=0) for i in range(3)]
+    for i, key in enumerate(keys):
+        cache.put(key, "model", f"response {i}", parsed={"items": [i]})
+        os.utime(cache.cache_dir / f"{key}.json", (1000 + i, time.time() - 100 + i))
+    entry = cache.get(keys[0])
+    assert entry["response"] == "response 0" and entry["parsed"] == {"items": [0]}, entry
+
+    # Eviction only stats the entries, so an unreadable payload is still evicted by age
+    (cache.cache_dir / f"{keys[1]}.json").write_text("not json")
+    os.utime(cache.cache_dir / f"{keys[1]}.json", (1000, time.time() - 100))
+    cache.max_bytes = sum((cache.cache_dir / f"{key}.json").stat().st_size for key in keys) - 1
+    assert cache.evict() == 1
+    assert [cache.get(key) is not None for key in keys] == [True, False, True]
+
+    cache.ttl = 0
+    assert cache.get(keys[2]) is None
+    assert not (cache.cache_dir / f"{keys[2]}.json").exists()
+    assert cache.stats == {"hits": 3, "misses": 2, "evictions": 1}, cache.stats
+
+
+@check
+def check_query_cache(workdir: Path) -> None:
+    """Query results round-trip and the least recently used result is evicted first."""
+    from finding_retriever.result_cache import QueryResultCache
+
+    cache = QueryResultCache(workdir / "queries")
+    keys = [cache.key("SELECT * FROM t WHERE id = %s", (i,)) for i in range(2)]
+    for i, key in enumerate(keys):
+        with cache.writer(key, "SELECT * FROM t WHERE id = %s", (i,)) as writer:
+            writer.write_batch([make_finding(i, f"Finding {i}", "content")])
+        os.utime(cache.cache_dir / f"{key}.meta.json", (1000 + i, time.time() - 100 + i))
+    assert cache.get(cache.key("SELECT *  FROM t WHERE id = %s;", (0,)))["rows"] == 1
+    assert [row["title"] for batch in cache.iter_batches(keys[0], 10) for row in batch] == ["Finding 0"]
+
+    # keys[0] was just used, so keys[1] is the least recently used
+    cache.max_bytes = cache._entry_size(keys[0])
+    assert cache.evict() == 1
+    assert cache.get(keys[0]) is not None and cache.get(keys[1]) is None
+    assert not (cache.cache_dir / f"{keys[1]}.parquet").exists()
+
+    # Two writers of the same query interleave their batches; each publishes only its own rows
+    cache.max_bytes = 10 ** 6
+    barrier = threading.Barrier(2, timeout=10)
+
+    def write(first_id: int) -> None:
+        with cache.writer(keys[1], "SELECT * FROM t WHERE id = %s", (1,)) as writer:
+            for row_id in range(first_id, first_id + 3):
+                writer.write_batch([make_finding(row_id, f"Finding {row_id}", "content")])
+                barrier.wait()
+
+    with ThreadPoolExecutor(max_workers=2) as threads:
+        list(threads.map(write, (10, 20)))
+    ids = [row["id"] for batch in cache.iter_batches(keys[1], 10) for row in batch]
+    assert ids in ([10, 11, 12], [20, 21, 22]), ids
+    assert cache.get(keys[1])["rows"] == 3
+    assert not list(cache.cache_dir.glob("*.tmp"))
+
+
+@check
+def check_dataset_reuse(workdir: Path) -> None:
+    """An identical custom query reuses its completed pull until the query cache would expire it."""
+    from benchmarks.standin import DATABASE_NAME
+    from finding_retriever.result_cache import QueryResultCache
+
+    database = workdir / "standin.sqlite"
+    write_standin(database, [make_finding(i, f"Finding {i}", "content") for i in range(1, 4)])
+    query = f"SELECT * FROM {DATABASE_NAME}.{TABLE_NAME}"
+    retriever = StandInRetriever(database, cache=QueryResultCache(workdir / "queries"))
+    assert retriever.retrieve_dataset(query, chunk_rows=2) == 3
+
+    write_standin(database, [make_finding(4, "Finding 4", "content")])
+    assert retriever.retrieve_dataset(query, chunk_rows=2) == 3, "identical query pulled again"
+    assert retriever.retrieve_dataset(query, chunk_rows=2, partition_by=None) == 4
+    assert retriever.derive(refresh_cache=True).retrieve_dataset(query, chunk_rows=2, partition_by=None) == 4
+    assert StandInRetriever(database).retrieve_dataset(query, chunk_rows=2) == 4
+
+
+@check
+def check_sync_removals(workdir: Path) -> None:
+    """An incremental sync drops findings that stopped matching the category or impact filter."""
+    from finding_retriever.store import WatermarkStore, load_findings
+
+    database = workdir / "standin.sqlite"
+    write_standin(database, [
+        make_finding(1, "Vesting cliff bug", "The vesting cliff is skipped"),
+        make_finding(2, "Vesting schedule", "Tokens unlock early"),
+        make_finding(3, "Vesting rounding", "Claims round down"),
+    ])
+    retriever = StandInRetriever(database)
+    watermarks = WatermarkStore(workdir / "watermarks.json")
+    assert retriever.sync_findings("vesting", watermarks=watermarks)["total"] == 3
+
+    later = "2024-02-01 00:00:00"
+    write_standin(database, [
+        make_finding(1, "Vesting cliff bug", "The vesting cliff is skipped", impact="MEDIUM", updated_time=later),
+        make_finding(2, "Unlock schedule", "Tokens unlock early", updated_time=later),
+        make_finding(4, "Vesting revocation", "Revoked grants keep vesting", updated_time=later),
+        make_finding(5, "Oracle staleness", "Stale price", updated_time=later),
+    ])
+    stats = retriever.sync_findings("vesting", watermarks=watermarks)
+    assert stats["removed"] == 2, stats
+    assert sorted(load_findings("vesting")["id"]) == [3, 4]
+
+
+@check
+def check_streamed_upsert(workdir: Path) -> None:
+    """Merging a delta batch by batch keeps the latest version of each row in every format."""
+    from finding_retriever.store import SUPPORTED_FORMATS, read_findings, upsert_findings, write_findings
+
+    stored = [make_finding(i, f"Finding {i}", f"Content {i}") for i in range(1, 8)]
+    delta = [
+        [make_finding(2, "Finding 2 v2", "Edited"), {"id": 3, "is_valid": 0}],
+        [make_finding(9, "Finding 9", "New"), make_finding(3, "Finding 3 v2", "Restored")],
+        [{"id": 5, "is_valid": 0}, make_finding(2, "Finding 2 v3", "Edited again")],
+    ]
+    for fmt in SUPPORTED_FORMATS:
+        path = workdir / f"findings.{fmt}"
+        assert write_findings(path, [stored[:4], stored[4:]], fmt)["total"] == 7
+        stats = upsert_findings(path, iter(delta), fmt, batch_size=3)
+        assert stats == {"upserted": 3, "removed": 1, "total": 7}, (fmt, stats)
+        merged = read_findings(path, fmt)
+        assert list(merged["id"]) == [1, 4, 6, 7, 9, 3, 2], (fmt, list(merged["id"]))
+        assert list(merged["title"])[-2:] == ["Finding 3 v2", "Finding 2 v3"], fmt
+        assert not (workdir / f"findings.{fmt}.delta").exists()
+
+
+@check
+def check_normalizer_pool(workdir: Path) -> None:
+    """The normalizer keeps one worker pool across calls from several threads and shuts it down on close."""
+    from checklist_generator.normalizer import MIN_PARALLEL_FINDINGS, FindingNormalizer, summarize_finding
+
+    findings = [make_finding(i, f"Finding {i}", f"Submitted by auditor{i}\n\nThe vesting cliff {i} is skipped")
+                for i in range(2 * MIN_PARALLEL_FINDINGS)]
+    normalizer = FindingNormalizer(processes=2)
+    try:
+        with ThreadPoolExecutor(max_workers=3) as threads:
+            results = list(threads.map(normalizer.normalize, [findings] * 3))
+        pool = normalizer._executor
+        assert pool is not None
+        normalizer.normalize(findings)
+        assert normalizer._executor is pool, "pool was recreated"
+    finally:
+        normalizer.close()
+    assert normalizer._executor is None
+    expected = [summarize_finding(finding)["summary"] for finding in findings]
+    assert all([summary["summary"] for summary in result] == expected for result in results)
+
+
+@check
+def check_oversize_batches(workdir: Path) -> None:
+    """A finding too large for a batch on its own is shortened to fit, whichever fields make it large."""
+    from checklist_generator.batching import build_batches, estimate_tokens, to_prompt_json
+
+    findings = [
+        make_finding(1, "Short title", "word " * 4000),
+        make_finding(2, "long title " * 400, "word " * 50, protocol="protocol " * 400, tag_list="tag," * 400),
+        make_finding(3, "Small", "Fits as is"),
+    ]
+    for budget in (100, 500, 2000):
+        batches = build_batches(findings, budget)
+        for batch in batches:
+            assert estimate_tokens(to_prompt_json(batch)) <= budget + len(batch) + 1, (budget, batch)
+        assert [finding["id"] for batch in batches for finding in batch] == [1, 2, 3], batches
+        assert batches[-1][-1]["content"] == "Fits as is"
+
+
+@check
+def check_checklist_round_trip(workdir: Path) -> None:
+    """Checklists render back byte for byte, and diff plus merge reproduces an update."""
+    from checklist_generator.checklist_model import Checklist, diff, diff_to_dicts, merge
+
+    samples = [
+        path.read_text() for path in sorted((Path(__file__).parent.parent / "checklist").rglob("*.md"))
+    ] + [
+        "# Title\r\n\r\n1. First  \r\n   * nested item\r\n\t+ tab item\r\n2) Second",
+        "Intro paragraph\n\n## Section\n- a\n  - b\n      - c\n\n- d\n",
+    ]
+    for sample in samples:
+        assert Checklist.parse(sample).render() == sample, f"render changed {sample[:40]!r}"
+
+    old = Checklist.parse("- Claim Issues\n    - Check rounding\n- Revoke Issues\n")
+    new = Checklist.parse("- Claim Issues\n    - Check rounding\n    - Check reentrancy\n"
+                          "- Revoke Issues\n- Pause Issues\n    - Check paused claims\n")
+    changes = diff(old, new)
+    assert changes["removed"] == [], changes
+    updated = old.copy()
+    assert merge(updated, diff_to_dicts(changes["added"])) == 3
+    assert diff(updated, new) == {"added": [], "removed": []}
+    assert merge(updated, new.to_dicts()) == 0, "merging the same items twice added nodes"
+    assert updated.render() == new.render()
+
+
+@check
+def check_coverage_sources(workdir: Path) -> None:
+    """Coverage reads finding content, and items added by the model are traced to their findings."""
+    import pandas as pd
+
+    from checklist_generator.checklist_model import Checklist
+    from checklist_generator.coverage import CoverageIndex
+    from checklist_generator.generator import ChecklistGenerator
+    from checklist_generator.manifest import ChecklistManifest
+
+    markdown = "## Vesting\n- Check that the vesting cliff cannot be skipped\n"
+    findings = pd.DataFrame([
+        make_finding(1, "Unexpected unlock", "The vesting cliff can be skipped by claiming before the cliff"),
+        make_finding(2, "Unexpected unlock", "Oracle prices are stale"),
+    ])
+    # Both titles are vague, so only the content can tell the findings apart
+    labelled = CoverageIndex.from_markdown(markdown, threshold=0.1).label(findings)
+    assert list(labelled["covered_by"] != "") == [True, False], labelled[["id", "coverage_score"]]
+
+    existing = {"introduction": "", "checklist": Checklist.parse(markdown)}
+    deltas = [
+        {"introduction": "", "checklist": [{"text": "Vesting", "items": [{"text": "Check revoked grants"}]}]},
+        {"introduction": "", "checklist": [{"text": "Oracles", "items": [{"text": "Check price staleness"}]}]},
+    ]
+    merged = ChecklistGenerator("vesting")._merge_deltas(existing, deltas, [[3, 4], [5]])
+    assert merged["sources"] == {
+        "Vesting > Check revoked grants": [3, 4],
+        "Oracles": [5],
+        "Oracles > Check price staleness": [5],
+    }, merged["sources"]
+
+    manifest = ChecklistManifest(workdir / "manifest.json")
+    manifest.update(findings, "fingerprint", sources=merged["sources"])
+    assert ChecklistManifest(workdir / "manifest.json").sources == merged["sources"]
+
+
+@check
+def check_service_queue(workdir: Path) -> None:
+    """The service coalesces identical jobs, rejects bad options and a full queue, and fails queued jobs on stop."""
+    from main import parse_arguments
+    from service import ChecklistService, ServiceBusy, ServiceRequestHandler, job_arguments
+
+    class BlockingService(ChecklistService):
+        """Runs jobs that block until released instead of retrieving and generating."""
+
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.release = threading.Event()
+
+        def _execute(self, job):
+            self.release.wait(10)
+            return {"findings": 1}
+
+    defaults = parse_arguments(["serve", "--source", "local_index"])
+    for options in ({"unknown": 1}, {"top_k": "5"}, {"format": "xml"}, {"columns": ["nope"]}, {"dedup": 1},
+                    {"query": "SELECT * FROM shield_alds_stg.t_solodit_findings"}):
+        try:
+            job_arguments(defaults, options)
+        except ValueError:
+            continue
+        raise AssertionError(f"options {options} were accepted")
+    assert job_arguments(defaults, {"top_k": 5}).rank
+    with contextlib.redirect_stderr(io.StringIO()):
+        try:
+            parse_arguments(["serve", "--query", "SELECT 1"])
+        except SystemExit:
+            pass
+        else:
+            raise AssertionError("serve accepted a custom query")
+
+    service = BlockingService(defaults, workers=1, queue_size=1)
+    service.start()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ServiceRequestHandler)
+    server.service = service
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    def post(payload):
+        connection = http.client.HTTPConnection("127.0.0.1", server.server_address[1], timeout=10)
+        try:
+            connection.request("POST", "/jobs", json.dumps(payload))
+            response = connection.getresponse()
+            return response.status, json.loads(response.read())
+        finally:
+            connection.close()
+
+    try:
+        running = service.submit("retrieve", "vesting", {"top_k": 5})
+        deadline = time.monotonic() + 10
+        while running.status != "running" and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert running.status == "running", running.status
+        assert service.submit("retrieve", " vesting ", {"top_k": 5}) is running
+        status, body = post({"command": "retrieve", "category": "vesting", "options": {"top_k": 5}})
+        assert status == 202 and body["id"] == running.id and body["requests"] == 3, (status, body)
+
+        queued = service.submit("retrieve", "oracle")
+        status, body = post({"command": "retrieve", "category": "reentrancy"})
+        assert status == 503, (status, body)
+        status, body = post({"command": "retrieve", "category": "reentrancy", "options": {"top_k": "5"}})
+        assert status == 400, (status, body)
+        status, body = post({"command": "destroy", "category": "reentrancy"})
+        assert status == 400, (status, body)
+
+        stopper = threading.Thread(target=service.stop)
+        stopper.start()
+        deadline = time.monotonic() + 10
+        while service.health()["status"] != "stopping" and time.monotonic() < deadline:
+            time.sleep(0.01)
+        try:
+            service.submit("retrieve", "pause")
+        except ServiceBusy:
+            pass
+        else:
+            raise AssertionError("a job was accepted while stopping")
+        service.release.set()
+        stopper.join(10)
+        assert not stopper.is_alive(), "stop() did not return"
+    finally:
+        service.release.set()
+        server.shutdown()
+        server.server_close()
+
+    assert running.status == "done" and running.result == {"findings": 1}, running.to_dict()
+    assert queued.status == "failed" and "stopped" in queued.error, queued.to_dict()
+
+
+def run_checks(names: List[str]) -> List[str]:
+    """
+    Run checks, each in its own temporary directory.
+
+    Args:
+        names: Names of the checks to run
+
+    Returns:
+        Failure messages of the checks that failed
+    """
+    from finding_retriever import store
+
+    failures = []
+    findings_dir = store.FINDINGS_DIR
+    for name in names:
+        with tempfile.TemporaryDirectory() as workdir:
+            # Findings files written by the check land in its working directory
+            store.FINDINGS_DIR = Path(workdir)
+            try:
+                CHECKS[name](Path(workdir))
+            except Exception:
+                failures.append(f"{name}: {traceback.format_exc()}")
+                print(f"FAIL {name}")
+            else:
+                print(f"ok   {name}")
+            finally:
+                store.FINDINGS_DIR = findings_dir
+    return failures
+
+
+def main():
+    """Main entry point of the regression checks"""
+    parser = argparse.ArgumentParser(description="Run offline regression checks")
+    parser.add_argument("checks", nargs="*", metavar="CHECK",
+                        help=f"Checks to run (default: all of {', '.join(CHECKS)})")
+    parser.add_argument("--verbose", action="store_true", help="Log progress of every check")
+    args = parser.parse_args()
+    unknown = sorted(set(args.checks) - set(CHECKS))
+    if unknown:
+        parser.error(f"unknown checks: {', '.join(unknown)}")
+
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.WARNING,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    )
+
+    failures = run_checks(args.checks or list(CHECKS))
+    if failures:
+        print(f"{len(failures)} checks failed:\n" + "\n".join(failures), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""
+Synthetic findings corpus module.
+Generates rows shaped like t_solodit_findings, with content lengths and
+markdown structure resembling real audit findings.
+"""
+
+import hashlib
+import logging
+from datetime import datetime, timedelta
+from typing import List, Dict, Any, Iterator
+
+import numpy as np
+
+from finding_retriever.query_builder import ALL_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+# Log-normal content length fitted to sampled findings (median ~3.4k characters)
+CONTENT_LENGTH_MEDIAN = 3400
+CONTENT_LENGTH_SIGMA = 0.92
+CONTENT_LENGTH_MAX = 60000
+
+# Share of findings mentioning each category term, the terms benchmarks query for
+CATEGORY_RATES = {
+    "vesting": 0.03,
+    "reentrancy": 0.05,
+    "oracle": 0.06,
+    "input validation": 0.02,
+    "front-run": 0.04,
+}
+IMPACTS = ("HIGH", "MEDIUM", "LOW", "GAS")
+IMPACT_WEIGHTS = (0.3, 0.4, 0.25, 0.05)
+AUDIT_COMPANIES = ("Code4rena", "Sherlock", "Halborn", "OpenZeppelin", "ConsenSys", "Cantina",
+                   "Immunefi", "Pashov Audit Group", "Trust Security", "Spearbit")
+TAGS = ("Vesting", "Oracle", "Reentrancy", "Access Control", "Rounding", "DOS", "Front-Running",
+        "Validation", "Business Logic", "Precision Loss")
+PROTOCOL_CATEGORIES = ("Dexes", "CDP", "Yield", "Services", "Yield Aggregator", "Liquid Staking",
+                       "Bridge", "Lending", "Derivatives", "NFT Marketplace")
+
+_WORDS = """
+the contract function user token amount balance transfer owner admin call value reward
+stake withdraw deposit claim release schedule price pool liquidity fee share vault
+protocol attacker funds loss state update storage mapping address check revert require
+allows can should would because when after before during which this that calculation
+collateral debt position liquidation borrow lend interest rate timestamp block epoch
+signature nonce approve allowance mint burn supply total limit overflow underflow
+rounding precision decimals external internal modifier access control permission role
+""".split()
+_CODE_LINES = [
+    "function withdraw(uint256 amount) external {",
+    "    require(balances[msg.sender] >= amount, \"insufficient\");",
+    "    (bool ok, ) = msg.sender.call{value: amount}(\"\");",
+    "    balances[msg.sender] -= amount;",
+    "    emit Withdraw(msg.sender, amount);",
+    "uint256 releasable = vestedAmount(block.timestamp) - released;",
+    "    _transfer(address(this), beneficiary, releasable);",
+    "if (expiry_ < block.timestamp) revert Teller_InvalidParams();",
+    "    uint256 price = oracle.latestAnswer();",
+    "    return amount * price / 1e18;",
+    "}",
+]
+
+
+class SyntheticCorpus:
+    """Deterministic generator of synthetic findings."""
+
+    def __init__(self, rows: int, seed: int = 42, paragraph_pool: int = 4096):
+        """
+        Args:
+            rows: Number of findings to generate
+            seed: Random seed; the same seed always yields the same corpus
+            paragraph_pool: Number of distinct paragraphs content is assembled from
+        """
+        self.rows = rows
+        self.seed = seed
+        rng = np.random.default_rng(seed)
+        words = np.array(_WORDS)
+        self._paragraphs = [
+            " ".join(words[rng.integers(0, len(words), size=rng.integers(25, 90))]).capitalize() + "."
+            for _ in range(paragraph_pool)
+        ]
+        self._paragraph_lengths = np.array([len(paragraph) for paragraph in self._paragraphs])
+
+    def iter_batches(self, batch_size: int = 10000) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Generate the corpus in batches.
+
+        Args:
+            batch_size: Number of findings per batch
+
+        Yields:
+            Lists of finding dictionaries with every t_solodit_findings column
+        """
+        rng = np.random.default_rng(self.seed + 1)
+        base_time = datetime(2023, 1, 1)
+        categories = list(CATEGORY_RATES)
+        rates = np.array([CATEGORY_RATES[category] for category in categories])
+
+        for start in range(0, self.rows, batch_size):
+            count = min(batch_size, self.rows - start)
+            lengths = np.minimum(
+                rng.lognormal(np.log(CONTENT_LENGTH_MEDIAN), CONTENT_LENGTH_SIGMA, size=count),
+                CONTENT_LENGTH_MAX,
+            ).astype(int)
+            impacts = rng.choice(len(IMPACTS), size=count, p=IMPACT_WEIGHTS)
+            companies = rng.integers(0, len(AUDIT_COMPANIES), size=count)
+            mentions = rng.random((count, len(categories))) < rates
+            has_code = rng.random(count) < 0.6
+            has_content_code = rng.random(count) < 0.3
+            publish_days = rng.integers(0, 3 * 365, size=count)
+            update_seconds = rng.integers(0, 365 * 24 * 3600, size=count)
+            invalid = rng.random(count) < 0.01
+
+            batch = []
+            for offset in range(count):
+                row_id = 700000 + start + offset
+                company = AUDIT_COMPANIES[companies[offset]]
+                terms = [category for category, mentioned in zip(categories, mentions[offset]) if mentioned]
+                content = self._content(rng, lengths[offset], company, terms, has_code[offset])
+                title_words = " ".join(rng.choice(_WORDS, size=6))
+                title = f"[H-{offset % 20 + 1:02d}] {title_words} {' '.join(terms)}".strip()
+                publish_date = base_time - timedelta(days=int(publish_days[offset]))
+                updated_time = base_time + timedelta(seconds=int(update_seconds[offset]))
+                row = {
+                    "id": row_id,
+                    "key_no": hashlib.md5(str(row_id).encode()).hexdigest(),
+                    "title": title,
+                    "audit_company": company,
+                    "publish_date": publish_date.strftime("%Y-%m-%d"),
+                    "content": content,
+                    "protocol": f"Protocol{row_id % 997}",
+                    "finder_list": "|".join(f"auditor{(row_id * 7 + i) % 5000}" for i in range(1 + row_id % 4)),
+                    "impact": IMPACTS[impacts[offset]],
+                    "tag_list": TAGS[row_id % len(TAGS)] if row_id % 3 else None,
+                    "contest_prize_txt": "$100,000 USDC" if company in ("Code4rena", "Sherlock") else None,
+                    "pdf_page_from": 0,
+                    "general_score": 4.0,
+                    "quality_score": 3.0,
+                    "github_link": f"https://github.com/example/{row_id}",
+                    "source_link": f"https://example.com/reports/{row_id}",
+                    "pdf_link": None,
+                    "contest_link": None,
+                    "spider_file": None,
+                    "report_key_no": hashlib.md5(f"report{row_id // 20}".encode()).hexdigest(),
+                    "created_time": updated_time.strftime("%Y-%m-%d %H:%M:%S"),
+                    "updated_time": updated_time.strftime("%Y-%m-%d %H:%M:%S"),
+                    "is_valid": 0 if invalid[offset] else 1,
+                    "content_code": "\n".join(_CODE_LINES[:6]) if has_content_code[offset] else None,
+                    "category_list": "|".join(PROTOCOL_CATEGORIES[(row_id + i) % len(PROTOCOL_CATEGORIES)]
+                                              for i in range(3)),
+                }
+                batch.append({column: row[column] for column in ALL_COLUMNS})
+            yield batch
+
+    def _content(self, rng: np.random.Generator, length: int, company: str, terms: List[str],
+                 with_code: bool) -> str:
+        """Assemble markdown content of roughly the given length."""
+        parts = []
+        if company == "Code4rena":
+            parts.append("_Submitted by auditor1, also found by auditor2 and auditor3_")
+        parts.append("## Vulnerability Detail")
+        size = sum(len(part) for part in parts)
+        # Draw a few more paragraphs than needed on average and stop at the target length
+        for index in rng.integers(0, len(self._paragraphs), size=max(2, length // 250)):
+            parts.append(self._paragraphs[index])
+            size += self._paragraph_lengths[index]
+            if size >= length:
+                break
+        for term in terms:
+            parts.insert(int(rng.integers(2, len(parts) + 1)), f"This is a {term} issue affecting the contract.")
+        if with_code:
+            start = int(rng.integers(0, len(_CODE_LINES) - 4))
+            parts.insert(min(3, len(parts)), "```solidity\n" + "\n".join(_CODE_LINES[start:start + 5]) + "\n```")
+        parts.append("## Recommendation\nValidate the input and update state before external calls.")
+        return "\n\n".join(parts)
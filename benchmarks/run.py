@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+"""
+Benchmark runner.
+Measures retrieval (into findings files and a partitioned dataset), findings
+file writing and checklist generation against a
+synthetic corpus served from a SQLite stand-in and an offline LLM backend,
+writes a JSON report and compares it against a baseline report.
+
+Usage:
+    poetry run python -m benchmarks.run --rows 100000 --output report.json
+    poetry run python -m benchmarks.run --rows 100000 --baseline report.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import platform
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from multiprocessing import get_context
+from pathlib import Path
+from typing import List, Dict, Any, Callable, Optional
+
+from benchmarks.corpus import SyntheticCorpus
+from finding_retriever.dataset import DEFAULT_CHUNK_ROWS
+from finding_retriever.query_builder import ALL_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = Path(__file__).parent / ".data"
+DEFAULT_TOLERANCE = 0.1
+
+# Metrics compared against the baseline, and whether lower values are better
+COMPARED_METRICS = {
+    "seconds": True,
+    "peak_rss_mb": True,
+    "rows_per_second": False,
+    "mb_per_second": False,
+}
+
+
+def _peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of the current process in MB."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in bytes on macOS and in kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _throughput(rows: int, size: int, seconds: float) -> Dict[str, Any]:
+    seconds = max(seconds, 1e-9)
+    return {
+        "rows": rows,
+        "seconds": round(seconds, 4),
+        "rows_per_second": round(rows / seconds, 1),
+        "bytes": size,
+        "mb_per_second": round(size / (1024 * 1024) / seconds, 2),
+    }
+
+
+def bench_retrieve(database: str, workdir: str, fmt: str, category: Optional[str]) -> Dict[str, Any]:
+    """
+    Retrieve findings from the stand-in database into a findings file.
+
+    Args:
+        database: SQLite stand-in database
+        workdir: Directory receiving the findings file
+        fmt: Output format
+        category: Category to query, or None to retrieve the whole table
+
+    Returns:
+        Benchmark metrics
+    """
+    from benchmarks.standin import DATABASE_NAME, TABLE_NAME, StandInRetriever
+    from finding_retriever import store
+
+    store.FINDINGS_DIR = Path(workdir)
+    retriever = StandInRetriever(Path(database))
+    custom_query = None if category else f"SELECT * FROM {DATABASE_NAME}.{TABLE_NAME}"
+    start = time.perf_counter()
+    rows = retriever.retrieve_findings(category, custom_query, output_format=fmt)
+    seconds = time.perf_counter() - start
+    path = store.findings_path(category or "custom", fmt)
+    return _throughput(rows, path.stat().st_size if path.exists() else 0, seconds)
+
+
+def bench_dataset(database: str, workdir: str, chunk_rows: int) -> Dict[str, Any]:
+    """
+    Page the whole stand-in table into a partitioned Parquet dataset.
+
+    Args:
+        database: SQLite stand-in database
+        workdir: Directory receiving the dataset
+        chunk_rows: Rows per keyset page and chunk
+
+    Returns:
+        Benchmark metrics
+    """
+    from benchmarks.standin import DATABASE_NAME, TABLE_NAME, StandInRetriever
+    from finding_retriever import store
+    from finding_retriever.dataset import dataset_path
+
+    store.FINDINGS_DIR = Path(workdir)
+    retriever = StandInRetriever(Path(database))
+    start = time.perf_counter()
+    rows = retriever.retrieve_dataset(f"SELECT * FROM {DATABASE_NAME}.{TABLE_NAME}", chunk_rows=chunk_rows,
+                                      restart=True)
+    seconds = time.perf_counter() - start
+    size = sum(path.stat().st_size for path in dataset_path("custom").rglob("*.parquet"))
+    return _throughput(rows, size, seconds)
+
+
+def bench_write(rows: int, seed: int, workdir: str, fmt: str, batch_size: int) -> Dict[str, Any]:
+    """
+    Write pre-generated findings batches with a findings writer.
+
+    Args:
+        rows: Number of findings
+        seed: Corpus seed
+        workdir: Directory receiving the findings file
+        fmt: Output format
+        batch_size: Findings per written batch
+
+    Returns:
+        Benchmark metrics
+    """
+    from finding_retriever.store import findings_path, open_writer
+
+    batches = list(SyntheticCorpus(rows, seed).iter_batches(batch_size))
+    path = findings_path(f"write_{fmt}", fmt, Path(workdir))
+    start = time.perf_counter()
+    with open_writer(path, fmt) as writer:
+        for batch in batches:
+            writer.write_batch(batch)
+    seconds = time.perf_counter() - start
+    return _throughput(writer.rows_written, path.stat().st_size, seconds)
+
+
+def bench_generator(rows: int, seed: int, category: str, max_findings: int) -> Dict[str, Any]:
+    """
+    Normalize, batch and prompt findings of a category, and parse and merge
+    the replies of an offline backend into the preset checklist.
+
+    Args:
+        rows: Number of findings in the corpus the category's findings are taken from
+        seed: Corpus seed
+        category: Category whose preset checklist is updated
+        max_findings: Maximum number of findings sent
+
+    Returns:
+        Benchmark metrics
+    """
+    import pandas as pd
+
+    from checklist_generator.batching import build_batches
+    from checklist_generator.generator import FINDING_COLUMNS, ChecklistGenerator
+    from checklist_generator.llm_client import AsyncLLMClient, FakeBackend
+    from checklist_generator.normalizer import FindingNormalizer
+
+    findings = []
+    for batch in SyntheticCorpus(rows, seed).iter_batches():
+        findings.extend(row for row in batch if category in row["title"].lower())
+        if len(findings) >= max_findings:
+            break
+    findings_df = pd.DataFrame(findings[:max_findings], columns=ALL_COLUMNS)[FINDING_COLUMNS]
+
+    def responder(messages: List[Dict[str, str]]) -> str:
+        # One new subitem per reply, so the merge has work to do
+        prompt = messages[-1]["content"]
+        return json.dumps({
+            "introduction": "",
+            "checklist": [{"text": "Benchmark findings",
+                           "items": [{"text": f"Check the issue in prompt of {len(prompt)} characters"}]}],
+        })
+
+    backend = FakeBackend(responder)
+    client = AsyncLLMClient(backend, max_concurrency=8)
+    normalizer = FindingNormalizer(processes=1)
+    generator = ChecklistGenerator(category, client=client, normalizer=normalizer)
+    existing_data = generator.load_existing_checklist()
+
+    start = time.perf_counter()
+    summaries = normalizer.normalize(findings_df.to_dict(orient="records"))
+    normalize_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    records = findings_df.to_dict(orient="records")
+    for record, summary in zip(records, summaries):
+        record["content"] = summary["summary"]
+    batches = build_batches(records, generator._batch_token_budget(existing_data), generator.model)
+    batching_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    updated_data = asyncio.run(generator._process_with_chatgpt(existing_data, findings_df))
+    seconds = time.perf_counter() - start
+
+    return {
+        "rows": len(findings_df),
+        "batches": len(batches),
+        "requests": backend.requests,
+        "checklist_items": len(updated_data["checklist"]),
+        "normalize_seconds": round(normalize_seconds, 4),
+        "batching_seconds": round(batching_seconds, 4),
+        "seconds": round(seconds, 4),
+        "rows_per_second": round(len(findings_df) / max(seconds, 1e-9), 1),
+    }
+
+
+def _measure(function: Callable[..., Dict[str, Any]], *args) -> Dict[str, Any]:
+    """Run a benchmark and add the peak memory of the process running it."""
+    result = function(*args)
+    result["peak_rss_mb"] = round(_peak_rss_mb() or 0.0, 1)
+    return result
+
+
+def run_isolated(function: Callable[..., Dict[str, Any]], *args) -> Dict[str, Any]:
+    """
+    Run a benchmark in a fresh process, so its peak memory and imports are its own.
+
+    Args:
+        function: Benchmark function
+        *args: Arguments of the benchmark
+
+    Returns:
+        Benchmark metrics including 'peak_rss_mb'
+    """
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as executor:
+        return executor.submit(_measure, function, *args).result()
+
+
+def prepare_database(rows: int, seed: int, rebuild: bool = False) -> Path:
+    """
+    Build the stand-in database for a corpus, reusing an earlier build.
+
+    Args:
+        rows: Number of findings
+        seed: Corpus seed
+        rebuild: Rebuild even if the database exists
+
+    Returns:
+        Path of the SQLite database
+    """
+    from benchmarks.standin import build_database
+
+    path = DATA_DIR / f"findings_{rows}_{seed}.sqlite"
+    if rebuild or not path.exists():
+        start = time.perf_counter()
+        build_database(path, SyntheticCorpus(rows, seed))
+        logger.info(f"Built stand-in database in {time.perf_counter() - start:.1f}s")
+    return path
+
+
+def run_benchmarks(args: argparse.Namespace) -> Dict[str, Dict[str, Any]]:
+    """
+    Run the selected benchmarks.
+
+    Args:
+        args: Parsed command line arguments
+
+    Returns:
+        Metrics of each benchmark by name
+    """
+    database = prepare_database(args.rows, args.seed, args.rebuild)
+    formats = [fmt.strip() for fmt in args.formats.split(",") if fmt.strip()]
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for fmt in formats:
+            name = f"retrieve_table_{fmt}"
+            results[name] = run_isolated(bench_retrieve, str(database), workdir, fmt, None)
+            logger.info(f"{name}: {results[name]}")
+            if fmt == "parquet":
+                name = "retrieve_table_dataset"
+                results[name] = run_isolated(bench_dataset, str(database), workdir, args.chunk_rows)
+                logger.info(f"{name}: {results[name]}")
+            name = f"retrieve_{args.category}_{fmt}"
+            results[name] = run_isolated(bench_retrieve, str(database), workdir, fmt, args.category)
+            logger.info(f"{name}: {results[name]}")
+            name = f"write_{fmt}"
+            results[name] = run_isolated(bench_write, args.rows, args.seed, workdir, fmt, args.batch_size)
+            logger.info(f"{name}: {results[name]}")
+        if not args.skip_generator:
+            name = f"generate_{args.category}"
+            results[name] = run_isolated(bench_generator, args.rows, args.seed, args.category,
+                                         args.generator_findings)
+            logger.info(f"{name}: {results[name]}")
+    return results
+
+
+def compare_reports(report: Dict[str, Any], baseline: Dict[str, Any],
+                    tolerance: float = DEFAULT_TOLERANCE) -> List[str]:
+    """
+    Compare a report against a baseline report.
+
+    Args:
+        report: Current report
+        baseline: Baseline report
+        tolerance: Relative change tolerated before a metric counts as a regression
+
+    Returns:
+        Descriptions of the regressed metrics
+    """
+    if baseline.get("meta", {}).get("rows") != report["meta"]["rows"]:
+        logger.warning(f"Baseline was measured on {baseline.get('meta', {}).get('rows')} rows, "
+                       f"this run on {report['meta']['rows']}; results are not directly comparable")
+
+    regressions = []
+    for name, metrics in report["results"].items():
+        baseline_metrics = baseline.get("results", {}).get(name)
+        if not baseline_metrics:
+            continue
+        for metric, lower_is_better in COMPARED_METRICS.items():
+            current, previous = metrics.get(metric), baseline_metrics.get(metric)
+            if not current or not previous:
+                continue
+            change = (current - previous) / previous
+            regressed = change > tolerance if lower_is_better else change < -tolerance
+            line = f"{name}.{metric}: {previous} -> {current} ({change:+.1%})"
+            if regressed:
+                regressions.append(line)
+                logger.warning(f"Regression {line}")
+            else:
+                logger.info(line)
+    return regressions
+
+
+def main():
+    """Main entry point of the benchmark runner"""
+    parser = argparse.ArgumentParser(description="Benchmark retrieval and checklist generation offline")
+    parser.add_argument("--rows", type=int, default=10000, help="Findings in the synthetic corpus (default: 10000)")
+    parser.add_argument("--seed", type=int, default=42, help="Corpus seed (default: 42)")
+    parser.add_argument("--category", type=str, default="vesting",
+                        help="Category queried and generated (default: vesting)")
+    parser.add_argument("--formats", type=str, default="parquet,arrow,csv",
+                        help="Comma-separated findings formats to benchmark (default: parquet,arrow,csv)")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Findings per written batch (default: 1000)")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS,
+                        help=f"Rows per page of the partitioned dataset benchmark (default: {DEFAULT_CHUNK_ROWS})")
+    parser.add_argument("--generator-findings", type=int, default=500,
+                        help="Maximum findings sent by the generator benchmark (default: 500)")
+    parser.add_argument("--skip-generator", action="store_true", help="Skip the generator benchmark")
+    parser.add_argument("--rebuild", action="store_true", help="Rebuild the stand-in database")
+    parser.add_argument("--output", type=str, help="Write the JSON report to this file")
+    parser.add_argument("--baseline", type=str, help="Compare against this JSON report and fail on regressions")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Relative change tolerated before a metric regresses (default: 0.1)")
+    parser.add_argument("--verbose", action="store_true", help="Log progress of every benchmark")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.WARNING,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    )
+
+    report = {
+        "meta": {
+            "rows": args.rows,
+            "seed": args.seed,
+            "category": args.category,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        },
+        "results": run_benchmarks(args),
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n")
+    print(output)
+
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            regressions = compare_reports(report, json.load(f), args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} metrics regressed:\n" + "\n".join(regressions), file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Local database stand-in module.
+Serves a synthetic findings corpus from SQLite through the connection and
+cursor calls the TiDB retriever makes, so retrieval can be benchmarked
+without a MySQL server.
+"""
+
+import logging
+import os
+import sqlite3
+from pathlib import Path
+from typing import Any, Optional, Tuple
+
+from benchmarks.corpus import SyntheticCorpus
+from finding_retriever.query_builder import ALL_COLUMNS
+from finding_retriever.solodit_tidb import SoloditTiDBRetriever
+
+logger = logging.getLogger(__name__)
+
+DATABASE_NAME = "shield_alds_stg"
+TABLE_NAME = "t_solodit_findings"
+
+
+def build_database(path: Path, corpus: SyntheticCorpus, batch_size: int = 10000) -> int:
+    """
+    Load a synthetic corpus into a SQLite database file.
+
+    Args:
+        path: Database file to (re)create
+        corpus: Corpus to load
+        batch_size: Rows generated and inserted per transaction
+
+    Returns:
+        Number of rows loaded
+    """
+    path = Path(path)
+    os.makedirs(path.parent, exist_ok=True)
+    if path.exists():
+        path.unlink()
+
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        conn.execute(f"CREATE TABLE {TABLE_NAME} ({', '.join(ALL_COLUMNS)}, PRIMARY KEY (id))")
+        insert = f"INSERT INTO {TABLE_NAME} VALUES ({', '.join('?' * len(ALL_COLUMNS))})"
+        rows = 0
+        for batch in corpus.iter_batches(batch_size):
+            conn.executemany(insert, [tuple(row[column] for column in ALL_COLUMNS) for row in batch])
+            conn.commit()
+            rows += len(batch)
+        conn.execute(f"CREATE INDEX idx_updated_time ON {TABLE_NAME} (updated_time)")
+        conn.commit()
+    finally:
+        conn.close()
+    logger.info(f"Loaded {rows} synthetic findings into {path}")
+    return rows
+
+
+class SQLiteCursor:
+    """Cursor translating MySQL-style statements for SQLite."""
+
+    def __init__(self, connection: sqlite3.Connection):
+        self._cursor = connection.cursor()
+
+    def execute(self, query: str, params: Optional[Tuple[Any, ...]] = None) -> None:
+        # Session settings such as max_execution_time have no SQLite equivalent
+        if query.lstrip().upper().startswith("SET "):
+            return
+        self._cursor.execute(query.replace("%s", "?").rstrip().rstrip(";"), tuple(params or ()))
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    def fetchmany(self, size: int):
+        return self._cursor.fetchmany(size)
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    def close(self) -> None:
+        self._cursor.close()
+
+
+class SQLiteConnection:
+    """Connection exposing the subset of the mysql.connector API used by the retriever."""
+
+    def __init__(self, path: Path):
+        self._connection = sqlite3.connect(":memory:", check_same_thread=False)
+        self._connection.execute(f"ATTACH DATABASE ? AS {DATABASE_NAME}", (str(path),))
+
+    def cursor(self, buffered: Optional[bool] = None, prepared: Optional[bool] = None) -> SQLiteCursor:
+        return SQLiteCursor(self._connection)
+
+    def is_connected(self) -> bool:
+        return True
+
+    def disconnect(self) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._connection.close()
+
+
+class StandInRetriever(SoloditTiDBRetriever):
+    """TiDB retriever reading from a SQLite stand-in database."""
+
+    source_name = "SQLite stand-in"
+
+    def __init__(self, path: Path, **kwargs):
+        """
+        Args:
+            path: SQLite database built by build_database()
+            **kwargs: Further SoloditTiDBRetriever options, e.g. base_query
+        """
+        super().__init__(host="localhost", user="", password="", **kwargs)
+        self.path = Path(path)
+
+    def connect_to_database(self) -> SQLiteConnection:
+        return SQLiteConnection(self.path)
+
+    def close(self) -> None:
+        """Nothing is pooled; every connection is closed after its query."""
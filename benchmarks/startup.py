@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark.
+Times how long main.py takes to start for each command, and the service
+modules to import, and checks that heavy dependencies are not imported
+before a code path needs them.
+
+Usage:
+    poetry run python -m benchmarks.startup --budget-ms 250
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import List, Dict, Any
+
+MAIN_SCRIPT = Path(__file__).parent.parent / "main.py"
+DEFAULT_BUDGET_MS = 250.0
+DEFAULT_RUNS = 5
+
+# Command lines whose startup is measured
+STARTUP_COMMANDS = (
+    ("--help",),
+    ("retrieve", "--help"),
+    ("generate", "--help"),
+    ("run", "--help"),
+    ("index", "--help"),
+    ("serve", "--help"),
+)
+
+# Modules imported after argument parsing, before the first request is served;
+# 'serve --help' exits before importing them, so they are timed on their own
+STARTUP_MODULES = ("service",)
+
+# Packages that must not be imported just to parse arguments
+HEAVY_MODULES = ("pandas", "numpy", "scipy", "pyarrow", "mysql", "openai", "tiktoken")
+
+
+def imported_modules(argv: List[str]) -> Dict[str, int]:
+    """
+    Run the interpreter with -X importtime and collect the modules it imports.
+
+    Args:
+        argv: Interpreter arguments, e.g. main.py and its arguments
+
+    Returns:
+        Mapping of module name to cumulative import time in microseconds
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", *argv],
+                            capture_output=True, text=True, cwd=MAIN_SCRIPT.parent)
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|", 2)
+        try:
+            modules[name.strip()] = int(cumulative)
+        except ValueError:
+            # Header line
+            continue
+    return modules
+
+
+def measure_startup(argv: List[str], runs: int = DEFAULT_RUNS) -> Dict[str, Any]:
+    """
+    Time the interpreter from process start to exit.
+
+    Args:
+        argv: Interpreter arguments, e.g. main.py and its arguments
+        runs: Number of timed runs
+
+    Returns:
+        Metrics with the best and median 'seconds' and the heavy modules imported
+    """
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, *argv], capture_output=True, cwd=MAIN_SCRIPT.parent)
+        timings.append(time.perf_counter() - start)
+
+    modules = imported_modules(argv)
+    heavy = sorted(name for name in modules if name in HEAVY_MODULES)
+    return {
+        "seconds": round(min(timings), 4),
+        "median_seconds": round(statistics.median(timings), 4),
+        "heavy_imports": heavy,
+    }
+
+
+def check_startup(runs: int = DEFAULT_RUNS, budget_ms: float = DEFAULT_BUDGET_MS) -> Dict[str, Any]:
+    """
+    Measure every startup command and module and check them against the budget.
+
+    Args:
+        runs: Number of timed runs per command
+        budget_ms: Maximum best-of-runs startup time in milliseconds
+
+    Returns:
+        Dictionary with the metrics of each command and module and the list of 'violations'
+    """
+    measured = [(" ".join(argv), f"main.py {' '.join(argv)}", [str(MAIN_SCRIPT), *argv])
+                for argv in STARTUP_COMMANDS]
+    measured += [(f"import {module}", f"import {module}", ["-c", f"import {module}"])
+                 for module in STARTUP_MODULES]
+    results = {}
+    violations = []
+    for name, label, argv in measured:
+        metrics = measure_startup(argv, runs)
+        results[name] = metrics
+        if metrics["seconds"] * 1000 > budget_ms:
+            violations.append(f"'{label}' took {metrics['seconds'] * 1000:.0f} ms "
+                              f"(budget {budget_ms:.0f} ms)")
+        if metrics["heavy_imports"]:
+            violations.append(f"'{label}' imported {', '.join(metrics['heavy_imports'])}")
+    return {"results": results, "violations": violations}
+
+
+def main():
+    """Main entry point of the startup benchmark"""
+    parser = argparse.ArgumentParser(description="Check the startup time and imports of main.py")
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS,
+                        help=f"Timed runs per command (default: {DEFAULT_RUNS})")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS,
+                        help=f"Maximum startup time per command in milliseconds (default: {DEFAULT_BUDGET_MS:.0f})")
+    args = parser.parse_args()
+
+    report = check_startup(args.runs, args.budget_ms)
+    print(json.dumps(report, indent=2))
+    if report["violations"]:
+        print("Startup budget exceeded:\n" + "\n".join(report["violations"]), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""
+Prompt batching module.
+Compacts findings and packs them into token-budgeted batches for the map stage
+of checklist generation.
+"""
+
+import logging
+import json
+import re
+from functools import lru_cache
+from typing import List, Dict, Any, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Finding fields the model needs; everything else is dropped from prompts
+PROMPT_FIELDS = ("id", "title", "content", "protocol", "tag_list")
+
+# Text fields shortened, in this order, when a finding exceeds the batch budget on its own
+SHRINK_FIELDS = ("content", "tag_list", "protocol", "title")
+
+TRUNCATION_MARKER = " ...[truncated]"
+
+
+@lru_cache(maxsize=None)
+def _get_encoding(model: str):
+    """Load the tiktoken encoding of a model, or None if tiktoken is not installed."""
+    try:
+        import tiktoken
+    except ImportError:
+        logger.debug("tiktoken not installed, estimating tokens from text length")
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+
+def estimate_tokens(text: str, model: str = "gpt-4") -> int:
+    """
+    Estimate the number of tokens in a text.
+
+    Uses the model's tiktoken encoding when available, otherwise the
+    common approximation of four characters per token.
+
+    Args:
+        text: Text to measure
+        model: Model whose tokenizer is used
+
+    Returns:
+        Estimated token count
+    """
+    encoding = _get_encoding(model)
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
+
+
+def compact_text(text: Any) -> str:
+    """
+    Collapse runs of whitespace so indentation and blank lines do not cost tokens.
+
+    Args:
+        text: Raw text (non-strings and NaN become empty strings)
+
+    Returns:
+        Compacted text
+    """
+    if not isinstance(text, str):
+        return ""
+    text = re.sub(r"[ \t]+", " ", text)
+    text = re.sub(r"\n\s*\n+", "\n", text)
+    return text.strip()
+
+
+def compact_finding(finding: Dict[str, Any], max_content_chars: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Keep only the prompt fields of a finding and compact their text.
+
+    Args:
+        finding: Finding dictionary
+        max_content_chars: Truncate content to this many characters (None for no limit)
+
+    Returns:
+        Compact finding dictionary without empty fields
+    """
+    compact = {}
+    for field in PROMPT_FIELDS:
+        value = finding.get(field)
+        if field == "id":
+            if value is not None:
+                compact[field] = int(value) if isinstance(value, float) and value.is_integer() else value
+            continue
+        value = compact_text(value)
+        if field == "content" and max_content_chars and len(value) > max_content_chars:
+            value = value[:max_content_chars] + TRUNCATION_MARKER
+        if value:
+            compact[field] = value
+    return compact
+
+
+def to_prompt_json(value: Any) -> str:
+    """
+    Serialize a value for a prompt without indentation or spaces after separators.
+
+    Args:
+        value: JSON-serializable value
+
+    Returns:
+        Compact JSON string
+    """
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def fit_finding(compact: Dict[str, Any], token_budget: int, model: str = "gpt-4") -> Tuple[Dict[str, Any], int]:
+    """
+    Shorten a compact finding until its serialized size fits a token budget.
+
+    The text fields are shortened in SHRINK_FIELDS order, each by about the
+    share of tokens still over budget, and dropped if that leaves nothing of
+    them. The id is always kept, so a budget too small for it alone is still
+    exceeded.
+
+    Args:
+        compact: Compact finding dictionary from compact_finding()
+        token_budget: Maximum tokens of the serialized finding
+        model: Model whose tokenizer is used for estimates
+
+    Returns:
+        Tuple of the shortened finding and its estimated tokens
+    """
+    compact = dict(compact)
+    tokens = estimate_tokens(to_prompt_json(compact), model) + 1
+    for field in SHRINK_FIELDS:
+        value = compact.get(field)
+        if tokens <= token_budget or not value:
+            continue
+        field_tokens = estimate_tokens(value, model)
+        # Keep the share of the field that fits, with a margin for the marker and estimation error
+        keep = int(len(value) * (field_tokens - (tokens - token_budget)) / field_tokens * 0.9)
+        if keep > len(TRUNCATION_MARKER):
+            compact[field] = value[:keep - len(TRUNCATION_MARKER)] + TRUNCATION_MARKER
+        else:
+            del compact[field]
+        tokens = estimate_tokens(to_prompt_json(compact), model) + 1
+    return compact, tokens
+
+
+def build_batches(findings: Iterable[Dict[str, Any]], token_budget: int,
+                  model: str = "gpt-4") -> List[List[Dict[str, Any]]]:
+    """
+    Pack compacted findings into batches whose serialized size stays within a token budget.
+
+    Findings are packed greedily in order. A finding that does not fit into
+    an empty batch on its own is shortened with fit_finding(); one that still
+    does not fit is sent in a batch of its own and logged as over budget.
+
+    Args:
+        findings: Finding dictionaries
+        token_budget: Maximum tokens of serialized findings per batch
+        model: Model whose tokenizer is used for estimates
+
+    Returns:
+        List of batches of compact finding dictionaries
+    """
+    if token_budget <= 0:
+        raise ValueError("token_budget must be positive")
+
+    batches: List[List[Dict[str, Any]]] = []
+    current: List[Dict[str, Any]] = []
+    current_tokens = 0
+
+    for finding in findings:
+        compact = compact_finding(finding)
+        tokens = estimate_tokens(to_prompt_json(compact), model) + 1
+        if tokens > token_budget:
+            compact, tokens = fit_finding(compact, token_budget, model)
+            if tokens > token_budget:
+                logger.warning(f"Finding {compact.get('id')} needs {tokens} tokens even when shortened, "
+                               f"over the batch budget of {token_budget}")
+            else:
+                logger.debug(f"Truncated finding {compact.get('id')} to fit the batch token budget")
+
+        if current and current_tokens + tokens > token_budget:
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(compact)
+        current_tokens += tokens
+
+    if current:
+        batches.append(current)
+    return batches
@@ -0,0 +1,338 @@
+"""
+Checklist model module.
+Parses markdown checklists of any nesting depth and indentation width into a
+compact tree, renders it back byte for byte, and diffs and merges checklist
+versions structurally.
+"""
+
+import logging
+import re
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INDENT_WIDTH = 4
+DEFAULT_MARKER = "-"
+
+_LIST_ITEM_RE = re.compile(r"^([ \t]*)([-*+]|\d+[.)])[ \t]+(.*?)[ \t]*$")
+_HEADING_RE = re.compile(r"^(#{1,6})[ \t]+(.*?)[ \t]*$")
+# Headings get negative indentation below every list item, deeper levels closer to zero
+_HEADING_BASE = -100
+
+
+def normalize_text(text: str) -> str:
+    """Normalize item text for matching: collapsed whitespace, lowercase."""
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+
+class ChecklistNode:
+    """A heading or list item of a checklist, with the lines needed to render it unchanged."""
+
+    __slots__ = ("text", "marker", "indent", "children", "leading", "raw", "raw_text")
+
+    def __init__(self, text: str, marker: str = DEFAULT_MARKER, indent: int = 0,
+                 leading: Optional[List[str]] = None, raw: Optional[str] = None):
+        """
+        Args:
+            text: Item text without the list marker
+            marker: List marker ('-', '*', '1.') or heading marker ('#', '##')
+            indent: Indentation in columns (negative for headings)
+            leading: Raw lines (blank lines, prose) between the previous node and this one
+            raw: Source line including its line ending, rendered while the text is unchanged
+        """
+        self.text = text
+        self.marker = marker
+        self.indent = indent
+        self.children: List["ChecklistNode"] = []
+        self.leading = leading or []
+        self.raw = raw
+        self.raw_text = text if raw is not None else None
+
+    @property
+    def is_heading(self) -> bool:
+        return self.marker.startswith("#")
+
+    def render_line(self, newline: str = "\n") -> str:
+        """Render the node's own line, reusing the source line if the node is unchanged."""
+        if self.raw is not None and self.text == self.raw_text:
+            return self.raw
+        if self.is_heading:
+            return f"{self.marker} {self.text}{newline}"
+        return f"{' ' * self.indent}{self.marker} {self.text}{newline}"
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert the subtree to {'text': ..., 'items': [...]}, omitting empty item lists."""
+        if not self.children:
+            return {"text": self.text}
+        return {"text": self.text, "items": [child.to_dict() for child in self.children]}
+
+    def __repr__(self) -> str:
+        return f"ChecklistNode({self.text!r}, children={len(self.children)})"
+
+
+class Checklist:
+    """A parsed markdown checklist."""
+
+    def __init__(self):
+        self.children: List[ChecklistNode] = []
+        # Raw lines after the last node
+        self.trailing: List[str] = []
+        self.newline = "\n"
+        self.indent_width = DEFAULT_INDENT_WIDTH
+
+    @classmethod
+    def parse(cls, markdown_content: str) -> "Checklist":
+        """
+        Parse markdown in a single pass over its lines.
+
+        List items nest by indentation, whatever its width or depth; '#'
+        headings are nodes that contain the list items below them. Every
+        other line is kept verbatim in front of the next node.
+
+        Args:
+            markdown_content: Raw markdown content
+
+        Returns:
+            Checklist instance
+        """
+        checklist = cls()
+        lines = markdown_content.splitlines(keepends=True)
+        if lines and lines[0].endswith("\r\n"):
+            checklist.newline = "\r\n"
+
+        # Nodes whose subtree is still open, with the root as sentinel
+        stack: List[Tuple[int, Any]] = [(_HEADING_BASE - 1, checklist)]
+        pending: List[str] = []
+        indent_steps: List[int] = []
+        for line in lines:
+            content = line.rstrip("\r\n")
+            match = _HEADING_RE.match(content)
+            if match:
+                marker, text = match.group(1), match.group(2)
+                indent = _HEADING_BASE + len(marker)
+            else:
+                match = _LIST_ITEM_RE.match(content)
+                if not match:
+                    pending.append(line)
+                    continue
+                indent = len(match.group(1).expandtabs(4))
+                marker, text = match.group(2), match.group(3)
+
+            while stack[-1][0] >= indent:
+                stack.pop()
+            parent_indent, parent = stack[-1]
+            if indent >= 0 and parent_indent >= 0:
+                indent_steps.append(indent - parent_indent)
+            node = ChecklistNode(text, marker=marker, indent=indent, leading=pending, raw=line)
+            parent.children.append(node)
+            stack.append((indent, node))
+            pending = []
+
+        checklist.trailing = pending
+        if indent_steps:
+            checklist.indent_width = min(indent_steps)
+        return checklist
+
+    @classmethod
+    def from_dicts(cls, items: List[Dict[str, Any]]) -> "Checklist":
+        """
+        Build a checklist from {'text': ..., 'items': [...]} dictionaries.
+
+        Args:
+            items: Top-level item dictionaries
+
+        Returns:
+            Checklist instance
+        """
+        checklist = cls()
+        merge(checklist, items)
+        return checklist
+
+    def render(self) -> str:
+        """
+        Render the checklist as markdown.
+
+        Unchanged nodes and all other lines are reproduced exactly as parsed,
+        so parse(text).render() == text.
+
+        Returns:
+            Markdown string
+        """
+        parts: List[str] = []
+
+        def emit(line: str) -> None:
+            # A line that ended the source file gains a line ending once more lines follow it
+            if parts and not parts[-1].endswith(("\n", "\r")):
+                parts[-1] += self.newline
+            parts.append(line)
+
+        def walk(nodes: List[ChecklistNode]) -> None:
+            for node in nodes:
+                for line in node.leading:
+                    emit(line)
+                emit(node.render_line(self.newline))
+                walk(node.children)
+
+        walk(self.children)
+        for line in self.trailing:
+            emit(line)
+        return "".join(parts)
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """Convert the checklist to a list of {'text': ..., 'items': [...]} dictionaries."""
+        return [node.to_dict() for node in self.children]
+
+    def walk(self) -> Iterator[Tuple[List[str], ChecklistNode]]:
+        """
+        Iterate over all nodes depth-first.
+
+        Yields:
+            Tuples of (texts of the ancestors and the node, node)
+        """
+        stack = [([node.text], node) for node in reversed(self.children)]
+        while stack:
+            path, node = stack.pop()
+            yield path, node
+            stack.extend((path + [child.text], child) for child in reversed(node.children))
+
+    def copy(self) -> "Checklist":
+        """Copy the checklist; merging into the copy leaves the original untouched."""
+        def copy_node(node: ChecklistNode) -> ChecklistNode:
+            clone = ChecklistNode(node.text, marker=node.marker, indent=node.indent,
+                                  leading=list(node.leading), raw=node.raw)
+            clone.raw_text = node.raw_text
+            clone.children = [copy_node(child) for child in node.children]
+            return clone
+
+        checklist = Checklist()
+        checklist.children = [copy_node(node) for node in self.children]
+        checklist.trailing = list(self.trailing)
+        checklist.newline = self.newline
+        checklist.indent_width = self.indent_width
+        return checklist
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self.walk())
+
+
+def _new_child(checklist: Checklist, parent: Any, text: str) -> ChecklistNode:
+    """Create a child node formatted like its siblings, or nested one level below its parent."""
+    siblings = parent.children
+    if siblings:
+        template = siblings[-1]
+        indent, marker = template.indent, template.marker
+        # Keep the blank-line spacing between siblings, but not their prose
+        leading = [checklist.newline for line in template.leading if not line.strip()] if len(siblings) > 1 else []
+    elif isinstance(parent, ChecklistNode) and not parent.is_heading:
+        indent, marker, leading = parent.indent + checklist.indent_width, DEFAULT_MARKER, []
+    else:
+        indent, marker, leading = 0, DEFAULT_MARKER, []
+    if marker.startswith("#"):
+        indent = _HEADING_BASE + len(marker)
+    elif marker[0].isdigit():
+        marker = f"{len(siblings) + 1}{marker[-1]}"
+    return ChecklistNode(text, marker=marker, indent=indent, leading=leading)
+
+
+def merge(checklist: Checklist, items: List[Dict[str, Any]],
+          added_paths: Optional[List[List[str]]] = None) -> int:
+    """
+    Merge item dictionaries into a checklist in place.
+
+    Items are matched to existing nodes by their text at each level
+    (ignoring case and whitespace); unmatched items are appended with their
+    subtree, formatted like their new siblings. Merging the same items again
+    changes nothing, and the result only depends on the order of the items.
+
+    Args:
+        checklist: Checklist to update
+        items: {'text': ..., 'items': [...]} dictionaries, e.g. from an LLM
+            delta or Checklist.to_dicts()
+        added_paths: List to which the path (ancestor texts followed by the
+            node's own) of each added node is appended
+
+    Returns:
+        Number of nodes added
+    """
+    added = 0
+    # Children of each parent by normalized text, built once per parent
+    indexes: Dict[int, Dict[str, ChecklistNode]] = {}
+
+    def index_of(parent: Any) -> Dict[str, ChecklistNode]:
+        index = indexes.get(id(parent))
+        if index is None:
+            index = {}
+            for child in parent.children:
+                index.setdefault(normalize_text(child.text), child)
+            indexes[id(parent)] = index
+        return index
+
+    stack = [(checklist, [], item) for item in reversed(items or [])]
+    while stack:
+        parent, parent_path, item = stack.pop()
+        if isinstance(item, str):
+            item = {"text": item}
+        if not isinstance(item, dict):
+            continue
+        # Also accept the older {'title', 'items': [{'text', 'subitems'}]} delta shape
+        text = str(item.get("text") or item.get("title") or "").strip()
+        if not text:
+            continue
+        index = index_of(parent)
+        node = index.get(normalize_text(text))
+        if node is None:
+            node = _new_child(checklist, parent, text)
+            parent.children.append(node)
+            index[normalize_text(text)] = node
+            added += 1
+            if added_paths is not None:
+                added_paths.append(parent_path + [node.text])
+        children = item.get("items") or item.get("subitems") or []
+        stack.extend((node, parent_path + [node.text], child) for child in reversed(children))
+    return added
+
+
+def diff(old: Checklist, new: Checklist) -> Dict[str, List[List[str]]]:
+    """
+    Compare two checklist versions structurally.
+
+    Nodes are identified by the normalized texts of their path, so moved
+    lines count as removed and added while reformatting does not count.
+
+    Args:
+        old: Previous checklist
+        new: Updated checklist
+
+    Returns:
+        Dictionary with the 'added' and 'removed' node paths, in document order
+    """
+    old_paths = {tuple(normalize_text(text) for text in path): path for path, _ in old.walk()}
+    new_paths = {tuple(normalize_text(text) for text in path): path for path, _ in new.walk()}
+    return {
+        "added": [path for key, path in new_paths.items() if key not in old_paths],
+        "removed": [path for key, path in old_paths.items() if key not in new_paths],
+    }
+
+
+def diff_to_dicts(changes: List[List[str]]) -> List[Dict[str, Any]]:
+    """
+    Turn node paths from diff() into nested item dictionaries for merge().
+
+    Args:
+        changes: Node paths, e.g. diff(old, new)['added']
+
+    Returns:
+        Nested {'text': ..., 'items': [...]} dictionaries
+    """
+    root: Dict[str, Any] = {"items": []}
+    for path in changes:
+        node = root
+        for text in path:
+            children = node.setdefault("items", [])
+            match = next((child for child in children
+                          if normalize_text(child["text"]) == normalize_text(text)), None)
+            if match is None:
+                match = {"text": text}
+                children.append(match)
+            node = match
+    return root["items"]
@@ -0,0 +1,192 @@
+"""
+Checklist coverage module.
+Matches findings against the items and subitems of a checklist, so findings
+already covered by an item are not sent to the model again.
+"""
+
+import logging
+from pathlib import Path
+from typing import TYPE_CHECKING, List, Dict, Any
+
+from checklist_generator.checklist_model import Checklist
+from checklist_generator.normalizer import normalize_content
+from finding_retriever.ranking import tfidf_matrix
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_COVERAGE_THRESHOLD = 0.25
+
+# Characters of normalized content compared with the checklist items
+CONTENT_CHARS = 1000
+
+# Share of a finding's score that comes from its title; the rest from its content
+TITLE_WEIGHT = 0.7
+
+def extract_checklist_items(markdown_content: str) -> List[Dict[str, Any]]:
+    """
+    Extract the items of a markdown checklist with their ancestors.
+
+    Args:
+        markdown_content: Raw markdown content
+
+    Returns:
+        List of dictionaries with the item 'text', its 'path' (ancestor texts
+        followed by the item itself), its 'depth' and whether it 'has_children'
+    """
+    return [
+        {"text": node.text, "path": path, "depth": len(path) - 1, "has_children": bool(node.children)}
+        for path, node in Checklist.parse(markdown_content).walk()
+    ]
+
+
+class CoverageIndex:
+    """TF-IDF index over checklist items that labels findings as covered or uncovered."""
+
+    def __init__(self, items: List[Dict[str, Any]], threshold: float = DEFAULT_COVERAGE_THRESHOLD):
+        """
+        Initialize the index.
+
+        Args:
+            items: Checklist items from extract_checklist_items()
+            threshold: Cosine similarity at which a finding counts as covered by an item
+        """
+        # Top-level items with children name a section and would match any finding of it
+        self.items = [item for item in items if item["depth"] > 0 or not item.get("has_children")]
+        self.threshold = threshold
+        self.labels = [" > ".join(item["path"]) for item in self.items]
+
+    @classmethod
+    def from_markdown(cls, markdown_content: str,
+                      threshold: float = DEFAULT_COVERAGE_THRESHOLD) -> "CoverageIndex":
+        """
+        Build the index from a markdown checklist.
+
+        Args:
+            markdown_content: Raw markdown content
+            threshold: Cosine similarity at which a finding counts as covered by an item
+
+        Returns:
+            CoverageIndex instance
+        """
+        return cls(extract_checklist_items(markdown_content), threshold=threshold)
+
+    def scores(self, findings_df: "pd.DataFrame") -> "np.ndarray":
+        """
+        Score every finding against every checklist item.
+
+        An item is represented by its own text and its ancestors', so a
+        subitem keeps the context of its section. A finding's score blends
+        the similarity of its title, which names the issue like a checklist
+        item does, with that of the start of its normalized content (code
+        dropped), which describes what the title leaves out. Findings without
+        a title are scored by their content alone.
+
+        Args:
+            findings_df: Findings with title and content columns
+
+        Returns:
+            Array of cosine similarities with one row per finding and one column per item
+        """
+        import numpy as np
+
+        if findings_df.empty or not self.items:
+            return np.zeros((len(findings_df), len(self.items)))
+        titles = findings_df["title"].fillna("").astype(str).tolist()
+        contents = [normalize_content(content, max_code_lines=0)[:CONTENT_CHARS]
+                    for content in findings_df["content"].tolist()]
+        item_texts = ["\n".join(item["path"]) for item in self.items]
+
+        # One vocabulary and idf over all texts, so the vectors are comparable
+        vectors = tfidf_matrix(titles + contents + item_texts)
+        count = len(titles)
+        item_vectors = vectors[2 * count:].T
+        title_scores = (vectors[:count] @ item_vectors).toarray()
+        content_scores = (vectors[count:2 * count] @ item_vectors).toarray()
+        title_weight = np.array([TITLE_WEIGHT if title.strip() else 0.0 for title in titles])[:, None]
+        return title_weight * title_scores + (1 - title_weight) * content_scores
+
+    def label(self, findings_df: "pd.DataFrame") -> "pd.DataFrame":
+        """
+        Label each finding with the checklist item covering it best.
+
+        Args:
+            findings_df: Findings with id, title and content columns
+
+        Returns:
+            Copy of the findings with 'covered_by' (item label, empty if
+            uncovered) and 'coverage_score' columns
+        """
+        import numpy as np
+
+        scores = self.scores(findings_df)
+        if scores.size:
+            best = scores.argmax(axis=1)
+            best_scores = scores[np.arange(len(best)), best]
+        else:
+            best = np.zeros(len(findings_df), dtype=int)
+            best_scores = np.zeros(len(findings_df))
+        covered = best_scores >= self.threshold
+        labels = np.array(self.labels + [""], dtype=object)
+        result = findings_df.copy()
+        result["covered_by"] = labels[np.where(covered, best, len(self.labels))]
+        result["coverage_score"] = best_scores
+        logger.info(f"{int(covered.sum())} of {len(findings_df)} findings are covered by "
+                    f"{len(self.items)} checklist items (threshold {self.threshold})")
+        return result
+
+    def report(self, labelled_df: "pd.DataFrame", title: str = "Checklist coverage") -> str:
+        """
+        Render a markdown coverage report from labelled findings.
+
+        Args:
+            labelled_df: Findings returned by label()
+            title: Heading of the report
+
+        Returns:
+            Markdown listing the findings covering each item and the uncovered findings
+        """
+        lines = [f"# {title}", ""]
+        covered = labelled_df[labelled_df["covered_by"] != ""]
+        uncovered = labelled_df[labelled_df["covered_by"] == ""]
+        lines.append(f"{len(covered)} of {len(labelled_df)} findings are covered by an existing item; "
+                     f"{len(uncovered)} are uncovered.")
+        lines.append("")
+
+        lines.append("## Covered items")
+        lines.append("")
+        lines.append("| Item | Findings | Finding ids |")
+        lines.append("| --- | --- | --- |")
+        groups = covered.groupby("covered_by", sort=False)["id"].apply(list).to_dict()
+        for label in self.labels:
+            ids = groups.get(label, [])
+            cell = label.replace("|", "\\|")
+            lines.append(f"| {cell} | {len(ids)} | {', '.join(str(i) for i in ids)} |")
+        lines.append("")
+
+        lines.append("## Uncovered findings")
+        lines.append("")
+        for finding in uncovered.sort_values("coverage_score", ascending=False).to_dict(orient="records"):
+            lines.append(f"- {finding['id']}: {finding.get('title') or ''} "
+                         f"(best score {finding['coverage_score']:.2f})")
+        return "\n".join(lines) + "\n"
+
+
+def write_coverage_report(index: CoverageIndex, labelled_df: "pd.DataFrame", path: Path,
+                          title: str = "Checklist coverage") -> None:
+    """
+    Write the coverage report of labelled findings to a markdown file.
+
+    Args:
+        index: Index the findings were labelled with
+        labelled_df: Findings returned by index.label()
+        path: Output markdown file
+        title: Heading of the report
+    """
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as f:
+        f.write(index.report(labelled_df, title=title))
+    logger.info(f"Coverage report saved to {path}")
@@ -1,331 +1,635 @@
-# """
-# Checklist Generator module.
-# Generates checklists by processing findings and existing templates using ChatGPT.
-# """
-
-# import logging
-# import pandas as pd
-# import json
-# import os
-# from pathlib import Path
-# from typing import Dict, List, Any, Optional
-# import openai
-
-# logger = logging.getLogger(__name__)
-
-# class ChecklistGenerator:
-#     """Component to generate checklists from findings using ChatGPT."""
-    
-#     def __init__(self, category: str, api_key: str):
-#         """
-#         Initialize the checklist generator.
-        
-#         Args:
-#             category: Category of findings being processed
-#             api_key: OpenAI API key for ChatGPT
-#         """
-#         self.category = category
-#         openai.api_key = api_key
-#         self.checklist_dir = Path(__file__).parent.parent / "checklist"
-        
-#     def load_existing_checklist(self) -> Dict[str, Any]:
-#         """
-#         Load and parse existing checklist from markdown file.
-        
-#         Returns:
-#             Dictionary containing parsed checklist data
-#         """
-#         checklist_path = self.checklist_dir / self.category / "preset_checklist.md"
-#         intro_path = self.checklist_dir / self.category / "introduction.md"
-        
-#         try:
-#             # Load introduction
-#             if intro_path.exists():
-#                 logger.info(f"Loading introduction from {intro_path}")
-#                 with open(intro_path, 'r') as f:
-#                     introduction = f.read().strip()
-#             else:
-#                 logger.warning(f"No introduction file found at {intro_path}")
-#                 introduction = ""
-            
-#             # Load and parse checklist
-#             if checklist_path.exists():
-#                 logger.info(f"Loading checklist from {checklist_path}")
-#                 with open(checklist_path, 'r') as f:
-#                     markdown_content = f.read()
-                
-#                 # Parse markdown into JSON structure
-#                 checklist_data = self._parse_markdown_to_json(markdown_content)
-#             else:
-#                 logger.warning(f"No checklist template found at {checklist_path}")
-#                 checklist_data = []
-#             return {
-#                 "introduction": introduction,
-#                 "checklist": checklist_data
-#             }
-                
-#         except Exception as e:
-#             logger.error(f"Error loading existing checklist: {e}")
-#             raise
-    
-#     def _parse_markdown_to_json(self, markdown_content: str) -> List[Dict[str, Any]]:
-#         """
-#         Parse markdown checklist into JSON structure.
-        
-#         Args:
-#             markdown_content: Raw markdown content
-            
-#         Returns:
-#             List of checklist items with their structure
-#         """
-#         lines = markdown_content.split('\n')
-#         checklist = []
-#         current_item = None
-#         current_sublist = None
-        
-#         for line in lines:
-#             if not line.strip():
-#                 continue
-                
-#             # Count leading spaces to determine level
-#             leading_spaces = len(line) - len(line.lstrip())
-#             level = leading_spaces // 2
-#             content = line.strip()
-            
-#             # Handle different levels
-#             if level == 0 and content.startswith('# '):
-#                 # Main section
-#                 if current_item:
-#                     checklist.append(current_item)
-#                 current_item = {
-#                     "title": content[2:].strip(),
-#                     "items": []
-#                 }
-#             elif level == 1 and content.startswith('- '):
-#                 # Checklist item
-#                 if current_item:
-#                     item = {
-#                         "text": content[2:].strip(),
-#                         "subitems": []
-#                     }
-#                     current_item["items"].append(item)
-#                     current_sublist = item["subitems"]
-#             elif level == 2 and content.startswith('- '):
-#                 # Sub-item
-#                 if current_sublist is not None:
-#                     current_sublist.append(content[2:].strip())
-        
-#         # Add the last item
-#         if current_item:
-#             checklist.append(current_item)
-            
-#         return checklist
-    
-#     def process_findings(self) -> Dict[str, Any]:
-#         """
-#         Process findings from CSV and generate updated checklist.
-        
-#         Returns:
-#             Updated checklist data
-#         """
-#         # Load existing checklist
-#         existing_data = self.load_existing_checklist()
-        
-#         # Load findings
-#         findings_path = self.base_path / "findings" / f"solodit_findings_{self.category}.csv"
-#         if not findings_path.exists():
-#             logger.error(f"Findings file not found at {findings_path}")
-#             raise FileNotFoundError(f"Findings file not found at {findings_path}")
-        
-#         logger.info(f"Loading findings from {findings_path}")
-#         findings_df = pd.read_csv(findings_path)
-        
-#         # Process each finding with ChatGPT
-#         updated_checklist = self._process_with_chatgpt(
-#             existing_data,
-#             findings_df
-#         )
-        
-#         return updated_checklist
-    
-#     def _process_with_chatgpt(self, existing_data: Dict[str, Any], 
-#                              findings_df: pd.DataFrame) -> Dict[str, Any]:
-#         """
-#         Process findings using ChatGPT to update the checklist.
-        
-#         Args:
-#             existing_data: Existing checklist data
-#             findings_df: DataFrame containing findings
-            
-#         Returns:
-#             Updated checklist data
-#         """
-#         try:
-#             # Prepare the context for ChatGPT
-#             context = {
-#                 "category": self.category,
-#                 "existing_checklist": existing_data["checklist"],
-#                 "introduction": existing_data["introduction"],
-#                 "findings": findings_df.to_dict(orient='records')
-#             }
-            
-#             # Format the prompt
-#             prompt = self._create_prompt(context)
-            
-#             # Call ChatGPT API
-#             logger.info("Calling ChatGPT API to process findings")
-#             response = openai.ChatCompletion.create(
-#                 model="gpt-4",
-#                 messages=[
-#                     {"role": "system", "content": "You are a security expert helping to generate and update security checklists based on findings."},
-#                     {"role": "user", "content": prompt}
-#                 ],
-#                 temperature=0.7,
-#                 max_tokens=2000
-#             )
-            
-#             # Parse and validate the response
-#             updated_data = self._parse_chatgpt_response(response.choices[0].message.content)
-            
-#             logger.info("Successfully processed findings with ChatGPT")
-#             return updated_data
-            
-#         except Exception as e:
-#             logger.error(f"Error processing with ChatGPT: {e}")
-#             raise
-    
-#     def _create_prompt(self, context: Dict[str, Any]) -> str:
-#         """
-#         Create the prompt for ChatGPT.
-        
-#         Args:
-#             context: Context information for the prompt
-            
-#         Returns:
-#             Formatted prompt string
-#         """
-#         prompt = f"""
-# Please analyze the following security findings related to {context['category']} and help update the security checklist.
-
-# EXISTING INTRODUCTION:
-# {context['introduction']}
-
-# EXISTING CHECKLIST:
-# {json.dumps(context['existing_checklist'], indent=2)}
-
-# NEW FINDINGS:
-# {json.dumps(context['findings'], indent=2)}
-
-# Please:
-# 1. Review the existing checklist and introduction
-# 2. Analyze the new findings
-# 3. Update or add checklist items based on the findings
-# 4. Return the updated checklist in the same JSON format
-
-# The response should be valid JSON with the following structure:
-# {{
-#     "introduction": "updated introduction text",
-#     "checklist": [
-#         {{
-#             "title": "section title",
-#             "items": [
-#                 {{
-#                     "text": "checklist item",
-#                     "subitems": ["subitem 1", "subitem 2"]
-#                 }}
-#             ]
-#         }}
-#     ]
-# }}
-# """
-#         return prompt
-    
-#     def _parse_chatgpt_response(self, response_text: str) -> Dict[str, Any]:
-#         """
-#         Parse and validate ChatGPT's response.
-        
-#         Args:
-#             response_text: Raw response from ChatGPT
-            
-#         Returns:
-#             Parsed and validated checklist data
-#         """
-#         try:
-#             # Extract JSON from response (in case there's additional text)
-#             start_idx = response_text.find('{')
-#             end_idx = response_text.rindex('}') + 1
-#             json_str = response_text[start_idx:end_idx]
-            
-#             # Parse JSON
-#             updated_data = json.loads(json_str)
-            
-#             # Validate structure
-#             if not isinstance(updated_data, dict):
-#                 raise ValueError("Response is not a dictionary")
-#             if "introduction" not in updated_data:
-#                 raise ValueError("Response missing 'introduction' field")
-#             if "checklist" not in updated_data:
-#                 raise ValueError("Response missing 'checklist' field")
-                
-#             return updated_data
-            
-#         except Exception as e:
-#             logger.error(f"Error parsing ChatGPT response: {e}")
-#             logger.debug(f"Raw response: {response_text}")
-#             raise
-    
-#     def save_checklist(self, checklist_data: Dict[str, Any]) -> None:
-#         """
-#         Save the updated checklist back to files.
-        
-#         Args:
-#             checklist_data: Updated checklist data to save
-#         """
-#         try:
-#             output_dir = self.base_path / "output"
-#             os.makedirs(output_dir, exist_ok=True)
-            
-#             # Save introduction
-#             intro_path = output_dir / f"{self.category}_intro_updated.md"
-#             with open(intro_path, 'w') as f:
-#                 f.write(checklist_data["introduction"])
-            
-#             # Save checklist
-#             checklist_path = output_dir / f"{self.category}_checklist_updated.md"
-#             with open(checklist_path, 'w') as f:
-#                 f.write(self._convert_to_markdown(checklist_data["checklist"]))
-                
-#             logger.info(f"Updated checklist saved to {checklist_path}")
-#             logger.info(f"Updated introduction saved to {intro_path}")
-            
-#         except Exception as e:
-#             logger.error(f"Error saving updated checklist: {e}")
-#             raise
-    
-#     def _convert_to_markdown(self, checklist: List[Dict[str, Any]]) -> str:
-#         """
-#         Convert checklist data back to markdown format.
-        
-#         Args:
-#             checklist: Checklist data in JSON format
-            
-#         Returns:
-#             Formatted markdown string
-#         """
-#         markdown_lines = []
-        
-#         for section in checklist:
-#             # Add section title
-#             markdown_lines.append(f"# {section['title']}\n")
-            
-#             # Add items
-#             for item in section['items']:
-#                 markdown_lines.append(f"- {item['text']}")
-#                 # Add subitems
-#                 for subitem in item['subitems']:
-#                     markdown_lines.append(f"  - {subitem}")
-#                 markdown_lines.append("")  # Empty line between items
-                
-#             markdown_lines.append("")  # Empty line between sections
-            
-#         return "\n".join(markdown_lines)
\ No newline at end of file
+"""
+Checklist Generator module.
+Generates checklists by processing findings and existing templates using ChatGPT.
+Findings are split into token-budgeted batches (map), each batch yields a
+checklist delta, and the deltas are merged into the existing checklist (reduce).
+"""
+
+import asyncio
+import logging
+import pandas as pd
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Tuple
+
+from checklist_generator.batching import build_batches, estimate_tokens, to_prompt_json
+from checklist_generator.checklist_model import Checklist, merge, normalize_text
+from checklist_generator.coverage import CoverageIndex, write_coverage_report
+from checklist_generator.llm_client import AsyncLLMClient, OpenAIBackend
+from checklist_generator.normalizer import FindingNormalizer
+from checklist_generator.manifest import ChecklistManifest, checklist_fingerprint
+from checklist_generator.response_cache import LLMResponseCache
+from finding_retriever.instrumentation import span
+from finding_retriever.store import load_findings
+
+logger = logging.getLogger(__name__)
+
+SYSTEM_PROMPT = "You are a security expert helping to generate and update security checklists based on findings."
+
+# Columns of the findings store read by the generator; missing ones are skipped
+FINDING_COLUMNS = ["id", "title", "content", "content_code", "protocol", "tag_list", "updated_time"]
+
+
+class ChecklistCache:
+    """In-memory cache of parsed checklists, reloaded when their files change."""
+
+    def __init__(self):
+        self._entries: Dict[Tuple[Path, Path], Tuple[tuple, Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _signature(paths: Tuple[Path, Path]) -> tuple:
+        signature = []
+        for path in paths:
+            try:
+                stat = path.stat()
+                signature.append((stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                signature.append(None)
+        return tuple(signature)
+
+    def get(self, paths: Tuple[Path, Path]) -> Optional[Dict[str, Any]]:
+        """
+        Get the parsed checklist of an introduction and checklist file pair.
+
+        Args:
+            paths: Tuple of (introduction path, checklist path)
+
+        Returns:
+            Checklist data, or None if not cached or the files changed since.
+            The Checklist is shared and must not be modified.
+        """
+        with self._lock:
+            entry = self._entries.get(paths)
+        if entry is None or entry[0] != self._signature(paths):
+            return None
+        return entry[1]
+
+    def put(self, paths: Tuple[Path, Path], checklist_data: Dict[str, Any]) -> None:
+        """
+        Cache the parsed checklist of an introduction and checklist file pair.
+
+        Args:
+            paths: Tuple of (introduction path, checklist path)
+            checklist_data: Checklist data loaded from the files
+        """
+        signature = self._signature(paths)
+        with self._lock:
+            self._entries[paths] = (signature, checklist_data)
+
+
+class ChecklistGenerator:
+    """Component to generate checklists from findings using ChatGPT."""
+
+    def __init__(self, category: str, api_key: Optional[str] = None, model: str = "gpt-4",
+                 context_window: int = 8192, max_output_tokens: int = 2000,
+                 max_concurrency: int = 4, temperature: float = 0.7,
+                 client: Optional[AsyncLLMClient] = None,
+                 response_cache: Optional[LLMResponseCache] = None,
+                 coverage_threshold: Optional[float] = None,
+                 normalizer: Optional[FindingNormalizer] = None,
+                 checklist_cache: Optional[ChecklistCache] = None):
+        """
+        Initialize the checklist generator.
+
+        Args:
+            category: Category of findings being processed
+            api_key: OpenAI API key for ChatGPT, used when no client is given
+            model: Chat model used for generation (default: gpt-4)
+            context_window: Context window of the model in tokens (default: 8192)
+            max_output_tokens: Maximum tokens generated per batch (default: 2000)
+            max_concurrency: Maximum number of batches processed at once (default: 4)
+            temperature: Sampling temperature (default: 0.7)
+            client: LLM client, e.g. one shared by several generators so they
+                share its rate limits (default: an OpenAI client for this generator)
+            response_cache: Cache of model responses; None to always call the model
+            coverage_threshold: Skip findings whose similarity to an existing checklist
+                item reaches this score; None to send every finding
+            normalizer: Normalizer shortening finding content before prompting;
+                None to send the raw content
+            checklist_cache: Cache of parsed checklists shared by generators;
+                None to parse the checklist files on every load
+        """
+        self.category = category
+        self.api_key = api_key
+        self.model = client.model if client else model
+        self.context_window = context_window
+        self.max_output_tokens = client.max_tokens if client else max_output_tokens
+        self.max_concurrency = max_concurrency
+        self.temperature = temperature
+        self.base_path = Path(__file__).parent.parent
+        self.checklist_dir = self.base_path / "checklist"
+        self.output_dir = self.base_path / "output"
+        self._client = client
+        self.response_cache = response_cache
+        self.coverage_threshold = coverage_threshold
+        self.normalizer = normalizer
+        self.checklist_cache = checklist_cache
+
+    def _checklist_paths(self, updated: bool = False) -> Tuple[Path, Path]:
+        """
+        Get the introduction and checklist files of the category.
+
+        Args:
+            updated: Use the generated files in output/ instead of the preset
+
+        Returns:
+            Tuple of (introduction path, checklist path)
+        """
+        if updated:
+            return (self.output_dir / f"{self.category}_intro_updated.md",
+                    self.output_dir / f"{self.category}_checklist_updated.md")
+        return (self.checklist_dir / self.category / "introduction.md",
+                self.checklist_dir / self.category / "preset_checklist.md")
+
+    def load_existing_checklist(self, updated: bool = False) -> Dict[str, Any]:
+        """
+        Load and parse existing checklist from markdown file.
+
+        Args:
+            updated: Load the previously generated checklist from output/ instead of the preset
+
+        Returns:
+            Dictionary with the introduction text and the parsed Checklist
+        """
+        paths = self._checklist_paths(updated)
+        if self.checklist_cache is not None:
+            cached = self.checklist_cache.get(paths)
+            if cached is not None:
+                logger.debug(f"Using cached checklist for {self.category}")
+                return cached
+        intro_path, checklist_path = paths
+
+        try:
+            # Load introduction
+            if intro_path.exists():
+                logger.info(f"Loading introduction from {intro_path}")
+                with open(intro_path, 'r') as f:
+                    introduction = f.read().strip()
+            else:
+                logger.warning(f"No introduction file found at {intro_path}")
+                introduction = ""
+
+            # Load and parse checklist
+            if checklist_path.exists():
+                logger.info(f"Loading checklist from {checklist_path}")
+                with open(checklist_path, 'r') as f:
+                    markdown_content = f.read()
+
+                # Parse markdown into the checklist tree
+                checklist_data = Checklist.parse(markdown_content)
+            else:
+                logger.warning(f"No checklist template found at {checklist_path}")
+                checklist_data = Checklist()
+            loaded = {
+                "introduction": introduction,
+                "checklist": checklist_data
+            }
+            if self.checklist_cache is not None:
+                self.checklist_cache.put(paths, loaded)
+            return loaded
+
+        except Exception as e:
+            logger.error(f"Error loading existing checklist: {e}")
+            raise
+
+    @property
+    def client(self) -> AsyncLLMClient:
+        """LLM client used for the batches, created on first use."""
+        if self._client is None:
+            self._client = AsyncLLMClient(
+                OpenAIBackend(api_key=self.api_key),
+                model=self.model,
+                temperature=self.temperature,
+                max_tokens=self.max_output_tokens,
+                max_concurrency=self.max_concurrency
+            )
+        return self._client
+
+    def process_findings(self, findings_name: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Process stored findings and generate updated checklist.
+
+        Args:
+            findings_name: Name of the stored findings to use, e.g. '<category>_dedup'
+                (default: the category)
+
+        Returns:
+            Updated checklist data
+        """
+        return asyncio.run(self.process_findings_async(findings_name))
+
+    async def process_findings_async(self, findings_name: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Process stored findings and generate updated checklist within a running event loop.
+
+        Args:
+            findings_name: Name of the stored findings to use (default: the category)
+
+        Returns:
+            Updated checklist data
+        """
+        # Load existing checklist
+        existing_data = self.load_existing_checklist()
+
+        # Load findings, reading only the columns that end up in prompts
+        findings_df = load_findings(findings_name or self.category, columns=FINDING_COLUMNS)
+
+        # Process the findings with ChatGPT
+        updated_checklist = await self._process_with_chatgpt(
+            existing_data,
+            findings_df
+        )
+
+        return updated_checklist
+
+    def update_checklist(self, findings_name: Optional[str] = None, incremental: bool = False) -> int:
+        """
+        Fold stored findings into the checklist and save it.
+
+        Args:
+            findings_name: Name of the stored findings to use (default: the category)
+            incremental: Only send findings not yet incorporated into the
+                previously generated checklist
+
+        Returns:
+            Number of findings processed
+        """
+        return asyncio.run(self.update_checklist_async(findings_name, incremental))
+
+    async def update_checklist_async(self, findings_name: Optional[str] = None,
+                                     incremental: bool = False) -> int:
+        """
+        Fold stored findings into the checklist and save it within a running event loop.
+
+        The category's manifest records the findings incorporated into the
+        generated checklist, the findings behind each item the model added and
+        a fingerprint of the checklist files. Incremental runs
+        build on the generated checklist and only send findings that are new
+        or changed since; if the checklist files no longer match the
+        fingerprint, all findings are sent again.
+
+        Args:
+            findings_name: Name of the stored findings to use (default: the category)
+            incremental: Only send findings not yet incorporated into the
+                previously generated checklist
+
+        Returns:
+            Number of findings sent to the model (0 if the checklist was up to date)
+        """
+        manifest = ChecklistManifest(self.output_dir / ".manifests" / f"{self.category}.json")
+        use_updated = incremental and self._checklist_paths(updated=True)[1].exists()
+        fingerprint = checklist_fingerprint(self._checklist_paths(updated=use_updated))
+
+        findings_df = load_findings(findings_name or self.category, columns=FINDING_COLUMNS)
+        if incremental:
+            pending_df = manifest.pending(findings_df, fingerprint)
+            reset = fingerprint != manifest.fingerprint
+        else:
+            pending_df = findings_df
+            reset = True
+
+        if pending_df.empty:
+            logger.info(f"Checklist for {self.category} is up to date with {len(findings_df)} findings")
+            return 0
+        logger.info(f"Processing {len(pending_df)} of {len(findings_df)} findings for {self.category}")
+
+        uncovered_df = pending_df
+        if self.coverage_threshold is not None:
+            with span("generator.coverage", category=self.category) as coverage_span:
+                uncovered_df = self._uncovered_findings(pending_df, updated=use_updated)
+                coverage_span.add(rows=len(pending_df))
+            if uncovered_df.empty:
+                # Covered findings count as incorporated; the checklist itself is unchanged
+                logger.info(f"All pending findings are covered by the checklist for {self.category}")
+                manifest.update(pending_df, fingerprint, reset=reset)
+                return 0
+
+        with span("generator.load_checklist", category=self.category):
+            existing_data = self.load_existing_checklist(updated=use_updated)
+        updated_data = await self._process_with_chatgpt(existing_data, uncovered_df)
+        with span("generator.save", category=self.category):
+            self.save_checklist(updated_data)
+        manifest.update(pending_df, checklist_fingerprint(self._checklist_paths(updated=True)), reset=reset,
+                        sources=updated_data.get("sources"))
+        return len(uncovered_df)
+
+    def _uncovered_findings(self, findings_df: pd.DataFrame, updated: bool = False) -> pd.DataFrame:
+        """
+        Label findings with the checklist items covering them, write the
+        coverage report and keep the uncovered findings.
+
+        Args:
+            findings_df: Findings to label
+            updated: Match against the generated checklist in output/ instead of the preset
+
+        Returns:
+            Findings not covered by any checklist item
+        """
+        checklist_path = self._checklist_paths(updated)[1]
+        markdown_content = checklist_path.read_text() if checklist_path.exists() else ""
+        index = CoverageIndex.from_markdown(markdown_content, threshold=self.coverage_threshold)
+        labelled_df = index.label(findings_df)
+        write_coverage_report(index, labelled_df, self.output_dir / f"{self.category}_coverage.md",
+                              title=f"{self.category} checklist coverage")
+        return labelled_df[labelled_df["covered_by"] == ""]
+
+    def _batch_token_budget(self, existing_data: Dict[str, Any]) -> int:
+        """
+        Compute how many tokens of findings fit into one batch prompt.
+
+        The context window has to hold the system message, the prompt
+        template with the existing checklist, the findings and the response.
+
+        Args:
+            existing_data: Existing checklist data
+
+        Returns:
+            Token budget for the serialized findings of one batch
+        """
+        fixed_prompt = self._create_prompt({
+            "category": self.category,
+            "existing_checklist": existing_data["checklist"],
+            "introduction": existing_data["introduction"],
+            "findings": [],
+        })
+        fixed_tokens = estimate_tokens(SYSTEM_PROMPT + fixed_prompt, self.model)
+        # Leave a small margin for message framing and estimation error
+        budget = int((self.context_window - self.max_output_tokens - fixed_tokens) * 0.9)
+        if budget <= 0:
+            raise ValueError(
+                f"Existing checklist ({fixed_tokens} tokens) leaves no room for findings "
+                f"in a {self.context_window}-token context window"
+            )
+        return budget
+
+    async def _process_with_chatgpt(self, existing_data: Dict[str, Any],
+                             findings_df: pd.DataFrame) -> Dict[str, Any]:
+        """
+        Process findings using ChatGPT to update the checklist.
+
+        Findings are split into batches that fit the model's context window;
+        the batches are processed concurrently and their checklist deltas are
+        merged into the existing checklist in batch order.
+
+        Args:
+            existing_data: Existing checklist data
+            findings_df: DataFrame containing findings
+
+        Returns:
+            Updated checklist data
+        """
+        try:
+            budget = self._batch_token_budget(existing_data)
+            findings = findings_df.to_dict(orient='records')
+            if self.normalizer:
+                with span("generator.normalize", category=self.category) as normalize_span:
+                    # Runs a process pool, so keep it off the event loop
+                    summaries = await asyncio.get_running_loop().run_in_executor(
+                        None, self.normalizer.normalize, findings
+                    )
+                    normalize_span.add(rows=len(findings))
+                for finding, summary in zip(findings, summaries):
+                    finding["content"] = summary["summary"]
+            with span("generator.batch", category=self.category) as batch_span:
+                batches = build_batches(findings, budget, self.model)
+                batch_span.add(rows=len(findings))
+                batch_span.set(batches=len(batches))
+            if not batches:
+                logger.warning("No findings to process")
+                return existing_data
+            logger.info(f"Processing {len(findings_df)} findings in {len(batches)} batches "
+                        f"of up to {budget} tokens")
+
+            # Map: one checklist delta per batch, concurrency and rate limited by the client
+            deltas = await asyncio.gather(
+                *(self._process_batch(existing_data, batch) for batch in batches)
+            )
+
+            # Reduce: merge the deltas into the existing checklist
+            with span("generator.merge", category=self.category):
+                updated_data = self._merge_deltas(
+                    existing_data, deltas, [[finding.get("id") for finding in batch] for batch in batches]
+                )
+
+            logger.info("Successfully processed findings with ChatGPT")
+            return updated_data
+
+        except Exception as e:
+            logger.error(f"Error processing with ChatGPT: {e}")
+            raise
+
+    async def _process_batch(self, existing_data: Dict[str, Any],
+                       batch: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Ask ChatGPT for the checklist changes suggested by one batch of findings.
+
+        Args:
+            existing_data: Existing checklist data
+            batch: Compact finding dictionaries
+
+        Returns:
+            Checklist delta with 'introduction' and 'checklist' fields
+        """
+        context = {
+            "category": self.category,
+            "existing_checklist": existing_data["checklist"],
+            "introduction": existing_data["introduction"],
+            "findings": batch,
+        }
+        with span("generator.prompt") as prompt_span:
+            prompt = self._create_prompt(context)
+            prompt_span.add(rows=len(batch))
+
+        messages = [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ]
+
+        cache_key = None
+        if self.response_cache:
+            cache_key = self.response_cache.key(
+                self.client.model, messages,
+                temperature=self.client.temperature, max_tokens=self.client.max_tokens
+            )
+            with span("llm.cache") as cache_span:
+                cached = self.response_cache.get(cache_key)
+                cache_span.set(hit=cached is not None)
+            if cached is not None:
+                logger.info(f"Using cached response for a batch of {len(batch)} findings")
+                if cached.get("parsed") is not None:
+                    return cached["parsed"]
+                return self._parse_chatgpt_response(cached["response"])
+
+        logger.info(f"Calling ChatGPT API for a batch of {len(batch)} findings")
+        response_text = await self._call_model(messages)
+        with span("generator.parse"):
+            parsed = self._parse_chatgpt_response(response_text)
+        if cache_key:
+            # Only responses that parsed are cached, so a malformed reply is retried next run
+            self.response_cache.put(cache_key, self.client.model, response_text, parsed)
+        return parsed
+
+    async def _call_model(self, messages: List[Dict[str, str]]) -> str:
+        """
+        Send a chat completion request.
+
+        Args:
+            messages: Chat messages
+
+        Returns:
+            Text of the model's reply
+        """
+        return await self.client.complete(messages)
+
+    def _create_prompt(self, context: Dict[str, Any]) -> str:
+        """
+        Create the prompt for one batch of findings.
+
+        Args:
+            context: Context information for the prompt
+
+        Returns:
+            Formatted prompt string
+        """
+        prompt = f"""
+Please analyze the following security findings related to {context['category']} and suggest changes to the security checklist.
+
+EXISTING INTRODUCTION:
+{context['introduction']}
+
+EXISTING CHECKLIST:
+{context['existing_checklist'].render()}
+
+NEW FINDINGS:
+{to_prompt_json(context['findings'])}
+
+Please:
+1. Review the existing checklist and introduction
+2. Analyze the new findings
+3. Return ONLY the additions the findings call for, not the whole checklist
+4. To extend an existing section or item, repeat its text exactly and list only the new entries below it
+
+The response should be valid JSON with the following structure, nesting "items" as deep as needed:
+{{
+    "introduction": "text to add to the introduction, or an empty string",
+    "checklist": [
+        {{
+            "text": "section",
+            "items": [
+                {{
+                    "text": "checklist item",
+                    "items": [{{"text": "subitem"}}]
+                }}
+            ]
+        }}
+    ]
+}}
+"""
+        return prompt
+
+    def _parse_chatgpt_response(self, response_text: str) -> Dict[str, Any]:
+        """
+        Parse and validate ChatGPT's response.
+
+        Args:
+            response_text: Raw response from ChatGPT
+
+        Returns:
+            Parsed and validated checklist data
+        """
+        try:
+            # Extract JSON from response (in case there's additional text)
+            start_idx = response_text.find('{')
+            end_idx = response_text.rindex('}') + 1
+            json_str = response_text[start_idx:end_idx]
+
+            # Parse JSON
+            updated_data = json.loads(json_str)
+
+            # Validate structure
+            if not isinstance(updated_data, dict):
+                raise ValueError("Response is not a dictionary")
+            if "introduction" not in updated_data:
+                raise ValueError("Response missing 'introduction' field")
+            if "checklist" not in updated_data:
+                raise ValueError("Response missing 'checklist' field")
+
+            return updated_data
+
+        except Exception as e:
+            logger.error(f"Error parsing ChatGPT response: {e}")
+            logger.debug(f"Raw response: {response_text}")
+            raise
+
+    def _merge_deltas(self, existing_data: Dict[str, Any], deltas: List[Dict[str, Any]],
+                      batch_ids: Optional[List[List[Any]]] = None) -> Dict[str, Any]:
+        """
+        Merge checklist deltas into a copy of the existing checklist.
+
+        Items are matched by their text at each level (ignoring case and
+        whitespace) and new ones are appended in order, so the result only
+        depends on the order of the deltas. Unchanged lines keep their
+        original formatting.
+
+        Args:
+            existing_data: Existing checklist data
+            deltas: Checklist deltas, one per batch
+            batch_ids: Finding ids of each delta's batch
+
+        Returns:
+            Merged checklist data, with 'sources' mapping the label of each
+            added item (its path joined by ' > ') to the finding ids of the
+            batch that added it
+        """
+        checklist = existing_data["checklist"].copy()
+        introduction_parts = [existing_data["introduction"]] if existing_data["introduction"] else []
+        seen_introductions = {normalize_text(part) for part in introduction_parts}
+
+        added = 0
+        sources: Dict[str, List[Any]] = {}
+        for position, delta in enumerate(deltas):
+            addition = (delta.get("introduction") or "").strip()
+            if addition and normalize_text(addition) not in seen_introductions:
+                introduction_parts.append(addition)
+                seen_introductions.add(normalize_text(addition))
+            added_paths: List[List[str]] = []
+            added += merge(checklist, delta.get("checklist") or [], added_paths)
+            ids = batch_ids[position] if batch_ids else []
+            for path in added_paths:
+                sources[" > ".join(path)] = ids
+        logger.info(f"Merged {len(deltas)} deltas adding {added} checklist items")
+
+        return {
+            "introduction": "\n\n".join(introduction_parts),
+            "checklist": checklist,
+            "sources": sources,
+        }
+
+    def save_checklist(self, checklist_data: Dict[str, Any]) -> None:
+        """
+        Save the updated checklist back to files.
+
+        Args:
+            checklist_data: Updated checklist data to save
+        """
+        try:
+            os.makedirs(self.output_dir, exist_ok=True)
+            intro_path, checklist_path = self._checklist_paths(updated=True)
+
+            # Save introduction
+            with open(intro_path, 'w') as f:
+                f.write(checklist_data["introduction"])
+
+            # Save checklist
+            with open(checklist_path, 'w') as f:
+                f.write(checklist_data["checklist"].render())
+
+            logger.info(f"Updated checklist saved to {checklist_path}")
+            logger.info(f"Updated introduction saved to {intro_path}")
+
+        except Exception as e:
+            logger.error(f"Error saving updated checklist: {e}")
+            raise
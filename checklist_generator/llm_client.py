@@ -0,0 +1,325 @@
+"""
+LLM client module.
+Asynchronous chat completion client with a limit on in-flight requests,
+token-bucket rate limiting and retries, on top of pluggable backends.
+"""
+
+import asyncio
+import logging
+import random
+import time
+from typing import List, Dict, Any, Callable, Optional
+
+from checklist_generator.batching import estimate_tokens
+from finding_retriever.instrumentation import span
+
+logger = logging.getLogger(__name__)
+
+# HTTP statuses worth retrying: rate limited, or a server-side failure
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+
+class LLMRequestError(Exception):
+    """A failed chat completion request."""
+
+    def __init__(self, message: str, status_code: Optional[int] = None,
+                 retry_after: Optional[float] = None):
+        """
+        Args:
+            message: Error message
+            status_code: HTTP status of the response (None for connection failures)
+            retry_after: Seconds the provider asked to wait before retrying
+        """
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+def is_retryable_error(err: Exception) -> bool:
+    """
+    Check whether a failed chat completion request is likely to succeed when retried.
+
+    Args:
+        err: Exception raised by a backend
+
+    Returns:
+        True if the request should be retried
+    """
+    if isinstance(err, LLMRequestError):
+        return err.status_code is None or err.status_code in RETRYABLE_STATUS_CODES
+    return isinstance(err, (ConnectionError, asyncio.TimeoutError))
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at a fixed rate per minute."""
+
+    def __init__(self, per_minute: float, capacity: Optional[float] = None):
+        """
+        Args:
+            per_minute: Tokens added per minute
+            capacity: Maximum burst size (default: one minute's worth)
+        """
+        if per_minute <= 0:
+            raise ValueError("per_minute must be positive")
+        self.rate = per_minute / 60.0
+        self.capacity = capacity or per_minute
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock: Optional[asyncio.Lock] = None
+        self._loop = None
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, amount: float = 1.0) -> None:
+        """
+        Wait until the bucket holds enough tokens, then take them.
+
+        Requests larger than the capacity wait for a full bucket instead of
+        blocking forever. Waiters are served in arrival order.
+
+        Args:
+            amount: Number of tokens to take
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._lock, self._loop = asyncio.Lock(), loop
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            self._refill()
+            while self._tokens < amount:
+                await asyncio.sleep((amount - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= amount
+
+    def refund(self, amount: float) -> None:
+        """
+        Return tokens that were reserved but not used.
+
+        Args:
+            amount: Number of tokens to give back
+        """
+        self._refill()
+        self._tokens = min(self.capacity, self._tokens + amount)
+
+
+class LLMBackend:
+    """Base class of chat completion backends."""
+
+    async def complete(self, messages: List[Dict[str, str]], model: str, temperature: float,
+                       max_tokens: int) -> Dict[str, Any]:
+        """
+        Send one chat completion request.
+
+        Args:
+            messages: Chat messages
+            model: Model name
+            temperature: Sampling temperature
+            max_tokens: Maximum tokens to generate
+
+        Returns:
+            Dictionary with the reply 'text' and the 'total_tokens' used, and
+            optionally its 'prompt_tokens' and 'completion_tokens' (None if unknown)
+
+        Raises:
+            LLMRequestError: If the request failed
+        """
+        raise NotImplementedError("Subclasses must implement complete")
+
+    async def close(self) -> None:
+        """Release the resources held by the backend."""
+
+
+class OpenAIBackend(LLMBackend):
+    """Backend using the OpenAI API or any server implementing it."""
+
+    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None,
+                 timeout: float = 600.0):
+        """
+        Args:
+            api_key: OpenAI API key
+            base_url: API base URL, e.g. a local stub server (default: OPENAI_BASE_URL or api.openai.com)
+            timeout: Request timeout in seconds
+        """
+        from openai import AsyncOpenAI
+
+        # Retries are handled by AsyncLLMClient so they share its rate limits
+        self._client = AsyncOpenAI(api_key=api_key, base_url=base_url, timeout=timeout, max_retries=0)
+
+    async def complete(self, messages: List[Dict[str, str]], model: str, temperature: float,
+                       max_tokens: int) -> Dict[str, Any]:
+        import openai
+
+        try:
+            response = await self._client.chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens
+            )
+        except openai.APIStatusError as e:
+            retry_after = e.response.headers.get("retry-after")
+            try:
+                retry_after = float(retry_after) if retry_after else None
+            except ValueError:
+                retry_after = None
+            raise LLMRequestError(str(e), status_code=e.status_code, retry_after=retry_after) from e
+        except openai.APIConnectionError as e:
+            raise LLMRequestError(str(e)) from e
+
+        usage = response.usage
+        return {
+            "text": response.choices[0].message.content,
+            "total_tokens": usage.total_tokens if usage else None,
+            "prompt_tokens": usage.prompt_tokens if usage else None,
+            "completion_tokens": usage.completion_tokens if usage else None,
+        }
+
+    async def close(self) -> None:
+        await self._client.close()
+
+
+class FakeBackend(LLMBackend):
+    """Offline backend answering from a function, for tests and benchmarks."""
+
+    def __init__(self, responder: Optional[Callable[[List[Dict[str, str]]], str]] = None,
+                 latency: float = 0.0, failures: Optional[List[int]] = None):
+        """
+        Args:
+            responder: Function mapping the messages to the reply text
+                (default: a reply suggesting no checklist changes)
+            latency: Seconds each request takes
+            failures: HTTP statuses returned by the first requests before answering, e.g. [429, 503]
+        """
+        self.responder = responder or (lambda messages: '{"introduction": "", "checklist": []}')
+        self.latency = latency
+        self.failures = list(failures or [])
+        self.requests = 0
+
+    async def complete(self, messages: List[Dict[str, str]], model: str, temperature: float,
+                       max_tokens: int) -> Dict[str, Any]:
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.failures:
+            status_code = self.failures.pop(0)
+            raise LLMRequestError(f"Fake error {status_code}", status_code=status_code)
+        return {"text": self.responder(messages), "total_tokens": None}
+
+
+class AsyncLLMClient:
+    """Chat completion client limiting concurrency and request/token rates, with retries."""
+
+    def __init__(self, backend: LLMBackend, model: str = "gpt-4", temperature: float = 0.7,
+                 max_tokens: int = 2000, max_concurrency: int = 4,
+                 requests_per_minute: Optional[float] = None, tokens_per_minute: Optional[float] = None,
+                 max_retries: int = 5, backoff: float = 1.0, max_backoff: float = 60.0):
+        """
+        Initialize the client.
+
+        Args:
+            backend: Backend sending the requests
+            model: Model name (default: gpt-4)
+            temperature: Sampling temperature (default: 0.7)
+            max_tokens: Maximum tokens generated per request (default: 2000)
+            max_concurrency: Maximum number of requests in flight (default: 4)
+            requests_per_minute: Request rate limit (None for no limit)
+            tokens_per_minute: Prompt plus completion token rate limit (None for no limit)
+            max_retries: Number of retries after the first attempt (default: 5)
+            backoff: Base delay in seconds before the first retry (default: 1.0)
+            max_backoff: Upper bound of the delay between retries in seconds (default: 60)
+        """
+        self.backend = backend
+        self.model = model
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.max_concurrency = max_concurrency
+        self.request_bucket = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.token_bucket = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.stats = {"requests": 0, "retries": 0, "tokens": 0}
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop = None
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # asyncio primitives belong to one event loop; the client may be reused across asyncio.run calls
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._semaphore, self._loop = asyncio.Semaphore(self.max_concurrency), loop
+        return self._semaphore
+
+    async def complete(self, messages: List[Dict[str, str]]) -> str:
+        """
+        Send a chat completion request, waiting for capacity and retrying
+        rate-limited and server errors with exponential backoff and jitter.
+
+        Args:
+            messages: Chat messages
+
+        Returns:
+            Text of the model's reply
+        """
+        prompt_tokens = estimate_tokens("".join(message["content"] for message in messages), self.model)
+        estimated_tokens = prompt_tokens + self.max_tokens
+
+        attempt = 0
+        while True:
+            semaphore = self._get_semaphore()
+            with span("llm.wait"):
+                if self.request_bucket:
+                    await self.request_bucket.acquire(1)
+                if self.token_bucket:
+                    await self.token_bucket.acquire(estimated_tokens)
+                await semaphore.acquire()
+            try:
+                try:
+                    with span("llm.request", model=self.model, attempt=attempt) as request_span:
+                        self.stats["requests"] += 1
+                        result = await self.backend.complete(messages, self.model, self.temperature,
+                                                             self.max_tokens)
+                        if request_span.enabled:
+                            request_span.add(
+                                tokens_in=result.get("prompt_tokens") or prompt_tokens,
+                                tokens_out=result.get("completion_tokens")
+                                or estimate_tokens(result.get("text") or "", self.model),
+                            )
+                finally:
+                    semaphore.release()
+            except Exception as e:
+                if attempt >= self.max_retries or not is_retryable_error(e):
+                    raise
+                delay = min(self.max_backoff, self.backoff * (2 ** attempt)) * (0.5 + random.random())
+                if getattr(e, "retry_after", None):
+                    delay = max(delay, e.retry_after)
+                attempt += 1
+                self.stats["retries"] += 1
+                logger.warning(f"LLM request failed ({e}); retry {attempt}/{self.max_retries} in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                continue
+
+            used_tokens = result.get("total_tokens")
+            if self.token_bucket and used_tokens is not None and used_tokens < estimated_tokens:
+                # The reservation assumed a full-length reply
+                self.token_bucket.refund(estimated_tokens - used_tokens)
+            self.stats["tokens"] += used_tokens if used_tokens is not None else estimated_tokens
+            return result["text"]
+
+    async def complete_many(self, requests: List[List[Dict[str, str]]]) -> List[str]:
+        """
+        Send several chat completion requests concurrently.
+
+        Args:
+            requests: Chat messages of each request
+
+        Returns:
+            Reply texts in request order
+        """
+        return list(await asyncio.gather(*(self.complete(messages) for messages in requests)))
+
+    async def close(self) -> None:
+        """Close the backend."""
+        await self.backend.close()
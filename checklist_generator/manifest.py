@@ -0,0 +1,132 @@
+"""
+Checklist manifest module.
+Records which findings have been folded into a category's checklist, so
+later runs only send new or changed findings.
+"""
+
+import hashlib
+import json
+import logging
+import os
+from typing import Dict, Any, Iterable, List, Optional
+from pathlib import Path
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Finding fields whose changes make an incorporated finding pending again
+HASHED_FIELDS = ("title", "content", "protocol", "tag_list")
+
+
+def checklist_fingerprint(paths: Iterable[Path]) -> Optional[str]:
+    """
+    Fingerprint the files a checklist is loaded from.
+
+    Args:
+        paths: Introduction and checklist markdown files
+
+    Returns:
+        Hex digest of the file contents (missing files count as empty),
+        or None if none of the files exist
+    """
+    digest = hashlib.sha256()
+    found = False
+    for path in paths:
+        digest.update(str(path.name).encode("utf-8") + b"\0")
+        if path.exists():
+            found = True
+            digest.update(path.read_bytes())
+        digest.update(b"\0")
+    return digest.hexdigest() if found else None
+
+
+def finding_hash(finding: Dict[str, Any]) -> str:
+    """
+    Hash the fields of a finding that end up in prompts.
+
+    Args:
+        finding: Finding dictionary
+
+    Returns:
+        Short hex digest
+    """
+    values = [finding.get(field) if isinstance(finding.get(field), str) else "" for field in HASHED_FIELDS]
+    return hashlib.sha1("\0".join(values).encode("utf-8")).hexdigest()[:16]
+
+
+class ChecklistManifest:
+    """
+    Finding ids and content hashes incorporated into a checklist with a given
+    fingerprint, and the finding ids behind each item added by the model.
+    """
+
+    def __init__(self, path: Path):
+        """
+        Load the manifest, or start an empty one if the file does not exist.
+
+        Args:
+            path: JSON file holding the manifest
+        """
+        self.path = Path(path)
+        self.fingerprint: Optional[str] = None
+        self.findings: Dict[str, str] = {}
+        self.sources: Dict[str, List[Any]] = {}
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+            self.fingerprint = data.get("fingerprint")
+            self.findings = data.get("findings", {})
+            self.sources = data.get("sources", {})
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable checklist manifest {self.path}: {e}")
+
+    def pending(self, findings_df: pd.DataFrame, fingerprint: Optional[str]) -> pd.DataFrame:
+        """
+        Select the findings not yet incorporated into the checklist.
+
+        If the checklist no longer matches the manifest's fingerprint (it was
+        edited or regenerated elsewhere), every finding is pending.
+
+        Args:
+            findings_df: Findings with an id column
+            fingerprint: Fingerprint of the current checklist
+
+        Returns:
+            Findings that are new or whose content changed
+        """
+        if fingerprint is None or fingerprint != self.fingerprint:
+            if self.findings:
+                logger.info(f"Checklist changed since {self.path} was written; processing all findings")
+            return findings_df
+        hashes = [finding_hash(finding) for finding in findings_df.to_dict(orient="records")]
+        mask = [self.findings.get(str(finding_id)) != digest
+                for finding_id, digest in zip(findings_df["id"], hashes)]
+        return findings_df[mask]
+
+    def update(self, findings_df: pd.DataFrame, fingerprint: str, reset: bool = False,
+               sources: Optional[Dict[str, List[Any]]] = None) -> None:
+        """
+        Record findings as incorporated into the checklist and save the manifest.
+
+        Args:
+            findings_df: Findings that were processed
+            fingerprint: Fingerprint of the checklist they were merged into
+            reset: Forget previously recorded findings (the checklist was rebuilt from the preset)
+            sources: Finding ids behind each item added to the checklist, by item label
+        """
+        if reset:
+            self.findings = {}
+            self.sources = {}
+        for finding in findings_df.to_dict(orient="records"):
+            self.findings[str(finding["id"])] = finding_hash(finding)
+        self.sources.update(sources or {})
+        self.fingerprint = fingerprint
+
+        os.makedirs(self.path.parent, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({"fingerprint": self.fingerprint, "findings": self.findings, "sources": self.sources}, f)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,333 @@
+"""
+Finding normalization module.
+Turns raw finding markdown into compact summaries for prompts: strips credit
+lines and links, truncates code blocks and drops repeated snippets, across a
+process pool, caching the result per finding version.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+from pathlib import Path
+from typing import TYPE_CHECKING, List, Dict, Any, Optional
+
+from checklist_generator.batching import compact_text, estimate_tokens
+from finding_retriever.store import FINDINGS_DIR
+
+if TYPE_CHECKING:
+    from concurrent.futures import ProcessPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = FINDINGS_DIR / ".cache" / "normalized.sqlite"
+DEFAULT_MAX_CODE_LINES = 12
+
+# Below this many findings a process pool costs more than it saves
+MIN_PARALLEL_FINDINGS = 64
+
+_CREDIT_RE = re.compile(r"^[ \t]*_?(?:submitted by|also found by|found by)\b[^\n]*$", re.IGNORECASE | re.MULTILINE)
+# Sherlock-style "## Found by" headings followed by the auditor names, and report source links
+_CREDIT_HEADING_RE = re.compile(r"^#+[ \t]*found by[ \t]*\n(?:[ \t]*\n)*[^\n#]*$", re.IGNORECASE | re.MULTILINE)
+_SOURCE_LINE_RE = re.compile(r"^[ \t]*source:[ \t]*<?https?://\S+[ \t]*$", re.IGNORECASE | re.MULTILINE)
+_IMAGE_RE = re.compile(r"!\[[^\]]*\]\([^)]*\)")
+_LINK_RE = re.compile(r"\[([^\]]*)\]\((?:[^()]|\([^)]*\))*\)")
+_URL_RE = re.compile(r"<?https?://[^\s>)]+>?")
+_HTML_TAG_RE = re.compile(r"</?(?:details|summary|br|p|sup|sub)\b[^>]*>", re.IGNORECASE)
+_FENCE_RE = re.compile(r"^[ \t]*(```|~~~)")
+
+
+def _truncate_code(lines: List[str], max_lines: int) -> List[str]:
+    """Keep the first max_lines non-blank lines of a code block, noting how many were dropped."""
+    lines = [line.rstrip() for line in lines if line.strip()]
+    if len(lines) <= max_lines:
+        return lines
+    return lines[:max_lines] + [f"// ... {len(lines) - max_lines} more lines"]
+
+
+def _code_key(lines: List[str]) -> str:
+    return hashlib.sha1("\n".join(re.sub(r"\s+", "", line) for line in lines).encode("utf-8")).hexdigest()
+
+
+def normalize_content(content: Optional[str], max_code_lines: int = DEFAULT_MAX_CODE_LINES) -> str:
+    """
+    Normalize the markdown content of a finding.
+
+    Credit lines, images, HTML tags and link targets are removed, fenced and
+    indented code blocks are truncated to max_code_lines lines, and code
+    blocks repeating an earlier one are replaced by a short note.
+
+    Args:
+        content: Raw markdown content
+        max_code_lines: Lines kept per code block (0 drops code entirely)
+
+    Returns:
+        Normalized text with collapsed whitespace
+    """
+    if not isinstance(content, str) or not content:
+        return ""
+    text = _CREDIT_HEADING_RE.sub("", content)
+    text = _CREDIT_RE.sub("", text)
+    text = _SOURCE_LINE_RE.sub("", text)
+    text = _IMAGE_RE.sub("", text)
+    text = _LINK_RE.sub(r"\1", text)
+    text = _URL_RE.sub("", text)
+    text = _HTML_TAG_RE.sub("", text)
+
+    output: List[str] = []
+    seen_code = set()
+
+    def flush_code(fence: str, code: List[str], closing: str = "```") -> None:
+        if not max_code_lines or not any(line.strip() for line in code):
+            return
+        key = _code_key(code)
+        if key in seen_code:
+            output.append("(same code as above)")
+            return
+        seen_code.add(key)
+        output.append(fence)
+        output.extend(_truncate_code(code, max_code_lines))
+        output.append(closing)
+
+    lines = text.splitlines()
+    position = 0
+    previous_blank = True
+    while position < len(lines):
+        line = lines[position]
+        match = _FENCE_RE.match(line)
+        if match:
+            # Fenced block: up to the closing fence of the same kind, or the end of the text
+            fence = line.strip()
+            code = []
+            position += 1
+            while position < len(lines) and not lines[position].strip().startswith(match.group(1)):
+                code.append(lines[position])
+                position += 1
+            flush_code(fence, code, match.group(1))
+            position += 1
+            previous_blank = True
+            continue
+        if previous_blank and (line.startswith("    ") or line.startswith("\t")) and line.strip():
+            # Indented block: consecutive indented or blank lines after a blank line
+            code = []
+            while position < len(lines) and (not lines[position].strip()
+                                             or lines[position].startswith(("    ", "\t"))):
+                code.append(lines[position])
+                position += 1
+            flush_code("```", code)
+            previous_blank = True
+            continue
+        output.append(line)
+        previous_blank = not line.strip()
+        position += 1
+
+    return compact_text("\n".join(output))
+
+
+def summarize_finding(finding: Dict[str, Any], max_code_lines: int = DEFAULT_MAX_CODE_LINES,
+                      model: str = "gpt-4") -> Dict[str, Any]:
+    """
+    Build the compact summary of a finding.
+
+    Args:
+        finding: Finding dictionary with title and content, and optionally content_code
+        max_code_lines: Lines kept per code block
+        model: Model whose tokenizer is used for the token count
+
+    Returns:
+        Dictionary with the finding 'id', its 'summary' text and the summary's 'tokens'
+    """
+    summary = normalize_content(finding.get("content"), max_code_lines)
+    code = finding.get("content_code")
+    if isinstance(code, str) and code.strip() and max_code_lines and "```" not in summary:
+        # Findings whose code lives in a separate column get its start appended
+        summary += "\n```\n" + "\n".join(_truncate_code(code.splitlines(), max_code_lines)) + "\n```"
+    return {"id": finding.get("id"), "summary": summary, "tokens": estimate_tokens(summary, model)}
+
+
+def _summarize_chunk(chunk: List[Dict[str, Any]], max_code_lines: int, model: str) -> List[Dict[str, Any]]:
+    """Summarize a list of findings in a worker process."""
+    return [summarize_finding(finding, max_code_lines, model) for finding in chunk]
+
+
+def finding_version(finding: Dict[str, Any]) -> str:
+    """
+    Identify the version of a finding for caching.
+
+    Args:
+        finding: Finding dictionary
+
+    Returns:
+        The finding's updated_time, or a hash of its content if the column was not retrieved
+    """
+    updated_time = finding.get("updated_time")
+    if updated_time is not None and str(updated_time) not in ("", "NaT", "nan", "None"):
+        return str(updated_time)
+    payload = f"{finding.get('content') or ''}\0{finding.get('content_code') or ''}"
+    return "sha1:" + hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+class NormalizationCache:
+    """SQLite cache of finding summaries keyed by finding id, version and settings."""
+
+    def __init__(self, path: Optional[Path] = None):
+        """
+        Args:
+            path: SQLite database file (default: findings/.cache/normalized.sqlite)
+        """
+        self.path = Path(path or DEFAULT_CACHE_PATH)
+        os.makedirs(self.path.parent, exist_ok=True)
+        self._lock = threading.Lock()
+        conn = self._connect()
+        try:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS normalized ("
+                "id TEXT NOT NULL, version TEXT NOT NULL, settings TEXT NOT NULL, "
+                "summary TEXT NOT NULL, tokens INTEGER NOT NULL, "
+                "PRIMARY KEY (id, version, settings))"
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    def get_many(self, keys: List[tuple], settings: str) -> Dict[tuple, Dict[str, Any]]:
+        """
+        Look up cached summaries.
+
+        Args:
+            keys: (id, version) tuples
+            settings: Fingerprint of the normalization settings
+
+        Returns:
+            Mapping of found (id, version) keys to {'summary', 'tokens'}
+        """
+        found = {}
+        conn = self._connect()
+        try:
+            conn.execute("CREATE TEMP TABLE wanted (id TEXT, version TEXT)")
+            conn.executemany("INSERT INTO wanted VALUES (?, ?)", keys)
+            rows = conn.execute(
+                "SELECT n.id, n.version, n.summary, n.tokens FROM normalized n "
+                "JOIN wanted w ON n.id = w.id AND n.version = w.version WHERE n.settings = ?",
+                (settings,)
+            )
+            for finding_id, version, summary, tokens in rows:
+                found[(finding_id, version)] = {"summary": summary, "tokens": tokens}
+        finally:
+            conn.close()
+        return found
+
+    def put_many(self, entries: List[tuple], settings: str) -> None:
+        """
+        Store summaries, replacing older versions of the same findings.
+
+        Args:
+            entries: (id, version, summary, tokens) tuples
+            settings: Fingerprint of the normalization settings
+        """
+        with self._lock:
+            conn = self._connect()
+            try:
+                conn.executemany("DELETE FROM normalized WHERE id = ? AND settings = ?",
+                                 [(entry[0], settings) for entry in entries])
+                conn.executemany(
+                    "INSERT OR REPLACE INTO normalized (id, version, settings, summary, tokens) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    [(finding_id, version, settings, summary, tokens)
+                     for finding_id, version, summary, tokens in entries]
+                )
+                conn.commit()
+            finally:
+                conn.close()
+
+
+class FindingNormalizer:
+    """Normalizes findings into prompt summaries across a process pool, with caching."""
+
+    def __init__(self, max_code_lines: int = DEFAULT_MAX_CODE_LINES, processes: Optional[int] = None,
+                 cache: Optional[NormalizationCache] = None, model: str = "gpt-4"):
+        """
+        Initialize the normalizer.
+
+        Args:
+            max_code_lines: Lines kept per code block (default: 12)
+            processes: Worker processes (default: CPU count; 1 to normalize in-process)
+            cache: Cache of summaries; None to always normalize
+            model: Model whose tokenizer is used for token counts
+        """
+        self.max_code_lines = max_code_lines
+        self.processes = processes or os.cpu_count() or 1
+        self.cache = cache
+        self.model = model
+        self.settings = json.dumps({"max_code_lines": max_code_lines, "model": model}, sort_keys=True)
+        self._executor: Optional["ProcessPoolExecutor"] = None
+        self._executor_lock = threading.Lock()
+
+    def _pool(self) -> "ProcessPoolExecutor":
+        """Get the worker pool, starting it on first use and keeping it until close()."""
+        from concurrent.futures import ProcessPoolExecutor
+        from multiprocessing import get_all_start_methods, get_context
+
+        with self._executor_lock:
+            if self._executor is None:
+                # Forking a process that runs threads (executor threads, the service's workers)
+                # can copy held locks into the children; forkserver and spawn start clean
+                method = "forkserver" if "forkserver" in get_all_start_methods() else "spawn"
+                self._executor = ProcessPoolExecutor(max_workers=self.processes, mp_context=get_context(method))
+            return self._executor
+
+    def close(self) -> None:
+        """Shut down the worker pool."""
+        with self._executor_lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+    def normalize(self, findings: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Summarize findings, reusing cached summaries of unchanged findings.
+
+        Args:
+            findings: Finding dictionaries
+
+        Returns:
+            Dictionaries with 'id', 'summary' and 'tokens', in input order
+        """
+        keys = [(str(finding.get("id")), finding_version(finding)) for finding in findings]
+        cached = self.cache.get_many(keys, self.settings) if self.cache else {}
+        missing = [position for position, key in enumerate(keys) if key not in cached]
+
+        summaries = self._summarize([findings[position] for position in missing])
+        if self.cache and summaries:
+            self.cache.put_many(
+                [keys[position] + (summary["summary"], summary["tokens"])
+                 for position, summary in zip(missing, summaries)],
+                self.settings
+            )
+        logger.info(f"Normalized {len(summaries)} findings, {len(findings) - len(missing)} from cache")
+
+        results = [None] * len(findings)
+        for position, summary in zip(missing, summaries):
+            results[position] = summary
+        for position, key in enumerate(keys):
+            if results[position] is None:
+                results[position] = {"id": findings[position].get("id"), **cached[key]}
+        return results
+
+    def _summarize(self, findings: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Summarize findings, in worker processes when there are enough of them."""
+        if self.processes <= 1 or len(findings) < MIN_PARALLEL_FINDINGS:
+            return _summarize_chunk(findings, self.max_code_lines, self.model)
+
+        # A few chunks per worker balance uneven finding sizes without much pickling overhead
+        chunk_size = max(1, len(findings) // (self.processes * 4))
+        chunks = [findings[start:start + chunk_size] for start in range(0, len(findings), chunk_size)]
+        results = self._pool().map(_summarize_chunk, chunks,
+                                   [self.max_code_lines] * len(chunks), [self.model] * len(chunks))
+        return [summary for chunk in results for summary in chunk]
@@ -0,0 +1,111 @@
+"""
+LLM response cache module.
+Caches model replies and their parsed results on disk, keyed by a hash of
+the model, the messages and the sampling parameters.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import List, Dict, Any, Optional
+from pathlib import Path
+
+from common.disk_cache import STATS_FILE, DiskCache
+from finding_retriever.store import FINDINGS_DIR
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = FINDINGS_DIR / ".cache" / "llm"
+DEFAULT_TTL = 30 * 24 * 60 * 60
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+class LLMResponseCache(DiskCache):
+    """Disk-backed cache of LLM responses with a TTL and an LRU size limit."""
+
+    label = "LLM response cache"
+
+    def __init__(self, cache_dir: Optional[Path] = None, ttl: float = DEFAULT_TTL,
+                 max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        Initialize the cache.
+
+        Args:
+            cache_dir: Directory holding the cache entries (default: findings/.cache/llm)
+            ttl: Seconds after which an entry expires (default: 30 days)
+            max_bytes: Total size of cached responses kept on disk (default: 256 MB)
+        """
+        super().__init__(cache_dir or DEFAULT_CACHE_DIR, ttl, max_bytes)
+
+    def key(self, model: str, messages: List[Dict[str, str]], **params: Any) -> str:
+        """
+        Compute the cache key of a request.
+
+        Args:
+            model: Model name
+            messages: Chat messages, including the system message
+            **params: Sampling parameters, e.g. temperature and max_tokens
+
+        Returns:
+            Hex digest identifying the request
+        """
+        payload = json.dumps([model, messages, params], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _usage_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def _keys(self) -> List[str]:
+        return [path.stem for path in self.cache_dir.glob("*.json") if path.name != STATS_FILE]
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a fresh cache entry and mark it as recently used.
+
+        Args:
+            key: Cache key from key()
+
+        Returns:
+            Entry with the raw 'response' and its 'parsed' result, or None on a
+            miss or an expired entry
+        """
+        try:
+            with open(self._usage_path(key), "r") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            self._count("misses")
+            return None
+
+        if time.time() - entry["created"] > self.ttl:
+            self._remove(key)
+            self._count("misses")
+            return None
+
+        self._touch(key)
+        self._count("hits")
+        return entry
+
+    def put(self, key: str, model: str, response: str, parsed: Any = None) -> None:
+        """
+        Store a response under a key.
+
+        Args:
+            key: Cache key from key()
+            model: Model name, recorded for inspection
+            response: Raw reply text
+            parsed: Parsed result of the reply (JSON-serializable)
+        """
+        entry = {
+            "created": time.time(),
+            "model": model,
+            "response": response,
+            "parsed": parsed,
+        }
+        path = self._usage_path(key)
+        tmp_path = self._tmp_path(path)
+        with open(tmp_path, "w") as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        self._written(key)
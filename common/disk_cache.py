@@ -0,0 +1,182 @@
+"""
+Disk cache module.
+Shared bookkeeping of the on-disk caches: hit/miss statistics, TTL and LRU
+eviction driven by file modification times, and persisted totals.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from typing import List, Optional
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# Seconds between full scans of the cache directory while it stays under its size limit
+DEFAULT_SCAN_INTERVAL = 5 * 60
+
+STATS_FILE = "stats.json"
+
+
+class DiskCache:
+    """
+    Base class of disk-backed caches with a TTL and an LRU size limit.
+
+    Each entry is stored as one or more files named after its key. The mtime
+    of the entry's usage file records its last use, so eviction only needs to
+    stat the files and never reads a cached payload. A lookup that finds an
+    entry older than the TTL removes it; eviction removes entries unused for
+    longer than the TTL, which are expired too, and then the least recently
+    used ones until the cache fits in max_bytes. Writes keep a running total
+    of the cache size and only scan the directory when it exceeds max_bytes
+    or the last scan is older than scan_interval.
+    """
+
+    # Name of the cache in log messages
+    label = "Disk cache"
+
+    def __init__(self, cache_dir: Path, ttl: float, max_bytes: int,
+                 scan_interval: float = DEFAULT_SCAN_INTERVAL):
+        """
+        Initialize the cache.
+
+        Args:
+            cache_dir: Directory holding the cache entries
+            ttl: Seconds after which an entry expires
+            max_bytes: Total size of the cache entries kept on disk
+            scan_interval: Seconds between full scans while the cache is under max_bytes
+        """
+        self.cache_dir = Path(cache_dir)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.scan_interval = scan_interval
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+        self._lock = threading.Lock()
+        self._total_bytes: Optional[int] = None
+        self._last_scan = 0.0
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _keys(self) -> List[str]:
+        """List the keys of the stored entries."""
+        raise NotImplementedError
+
+    def _usage_path(self, key: str) -> Path:
+        """Get the file whose mtime records the last use of an entry."""
+        raise NotImplementedError
+
+    def _entry_paths(self, key: str) -> List[Path]:
+        """Get every file of an entry."""
+        return [self._usage_path(key)]
+
+    def _tmp_path(self, path: Path) -> Path:
+        """Get a temporary file for writing path that no other writer of the same entry uses."""
+        return path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+    def _count(self, stat: str) -> None:
+        with self._lock:
+            self.stats[stat] += 1
+
+    def _touch(self, key: str) -> None:
+        """Mark an entry as recently used."""
+        os.utime(self._usage_path(key))
+
+    def _entry_size(self, key: str) -> Optional[int]:
+        """Get the size of an entry, or None if its usage file is gone."""
+        size = 0
+        for path in self._entry_paths(key):
+            try:
+                size += path.stat().st_size
+            except FileNotFoundError:
+                if path == self._usage_path(key):
+                    return None
+        return size
+
+    def _remove(self, key: str) -> None:
+        for path in self._entry_paths(key):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+    def _written(self, key: str) -> None:
+        """Account for a newly written entry and evict if the cache may have outgrown its limit."""
+        size = self._entry_size(key) or 0
+        with self._lock:
+            if self._total_bytes is not None:
+                self._total_bytes += size
+            due = (self._total_bytes is None or self._total_bytes > self.max_bytes
+                   or time.monotonic() - self._last_scan > self.scan_interval)
+        if due:
+            self.evict()
+
+    def evict(self) -> int:
+        """
+        Remove entries unused for longer than the TTL, then least recently used
+        ones until the cache fits in max_bytes.
+
+        Returns:
+            Number of entries removed
+        """
+        entries = []
+        now = time.time()
+        removed = 0
+        for key in self._keys():
+            try:
+                last_used = self._usage_path(key).stat().st_mtime
+            except FileNotFoundError:
+                continue
+            size = self._entry_size(key)
+            if size is None:
+                continue
+            if now - last_used > self.ttl:
+                self._remove(key)
+                removed += 1
+                continue
+            entries.append((last_used, key, size))
+
+        total = sum(size for _, _, size in entries)
+        for _, key, size in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self._remove(key)
+            total -= size
+            removed += 1
+
+        with self._lock:
+            self._total_bytes = total
+            self._last_scan = time.monotonic()
+            self.stats["evictions"] += removed
+        if removed:
+            logger.debug(f"Evicted {removed} {self.label.lower()} entries")
+        return removed
+
+    def clear(self) -> None:
+        """Remove every cache entry."""
+        for key in self._keys():
+            self._remove(key)
+        with self._lock:
+            self._total_bytes = 0
+
+    def log_stats(self) -> None:
+        """Log the hit/miss statistics of this run and add them to the persisted totals."""
+        with self._lock:
+            stats = dict(self.stats)
+            self.stats = {stat: 0 for stat in self.stats}
+
+        stats_path = self.cache_dir / STATS_FILE
+        try:
+            with open(stats_path, "r") as f:
+                totals = json.load(f)
+        except (OSError, ValueError):
+            totals = {}
+        for stat, value in stats.items():
+            totals[stat] = totals.get(stat, 0) + value
+        with open(stats_path, "w") as f:
+            json.dump(totals, f, indent=2)
+
+        lookups = totals.get("hits", 0) + totals.get("misses", 0)
+        hit_rate = totals.get("hits", 0) / lookups if lookups else 0.0
+        logger.info(f"{self.label}: {stats['hits']} hits, {stats['misses']} misses, "
+                    f"{stats['evictions']} evictions (all-time hit rate {hit_rate:.0%})")
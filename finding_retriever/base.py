@@ -0,0 +1,292 @@
+"""
+Finding Retriever base module.
+Defines the interface shared by all finding retrievers.
+"""
+
+import logging
+import random
+import time
+from typing import List, Dict, Any, Iterator, Optional
+
+from finding_retriever.dataset import (
+    DEFAULT_CHUNK_ROWS, DEFAULT_PARTITION_BY, DatasetWriter, dataset_path, reusable_dataset,
+)
+from finding_retriever.matcher import AhoCorasickMatcher
+from finding_retriever.store import DEFAULT_FORMAT, FindingsWriter, findings_path, open_writer
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 1000
+
+class FindingRetriever:
+    """Base class for components that retrieve Solodit findings from a source."""
+    
+    # Human readable name of the source, used in log messages
+    source_name = "source"
+    
+    def iter_finding_batches(self, category: Optional[str], custom_query: Optional[str] = None,
+                             batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Lazily retrieve findings in batches.
+        
+        Args:
+            category: Search category for findings
+            custom_query: Optional custom SQL query that overrides the category-based query
+            batch_size: Number of rows fetched per round trip
+            
+        Yields:
+            Lists of finding dictionaries, each at most batch_size long
+        """
+        raise NotImplementedError
+    
+    def iter_candidate_batches(self, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Lazily retrieve every finding that any category query could match,
+        i.e. all findings passing the non-category filters.
+        
+        Args:
+            batch_size: Number of rows fetched per round trip
+            
+        Yields:
+            Lists of finding dictionaries, each at most batch_size long
+        """
+        raise NotImplementedError
+    
+    def iter_keyset_page(self, custom_query: str, after_id: Optional[Any], limit: int,
+                         batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Lazily retrieve one page of a custom query's results ordered by id.
+        
+        Args:
+            custom_query: SQL query selecting the id column
+            after_id: Last id of the previous page (None for the first page)
+            limit: Maximum number of rows in the page
+            batch_size: Number of rows fetched per round trip
+            
+        Yields:
+            Lists of finding dictionaries, each at most batch_size long
+        """
+        raise NotImplementedError
+    
+    def is_transient_error(self, err: Exception) -> bool:
+        """Check whether an error is worth retrying against this source."""
+        return False
+    
+    def dataset_max_age(self) -> Optional[float]:
+        """Seconds a completed pull of a custom query is reused for (None to always pull again)."""
+        return None
+    
+    def iter_findings(self, category: Optional[str], custom_query: Optional[str] = None,
+                      batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[Dict[str, Any]]:
+        """
+        Lazily retrieve findings one at a time.
+        
+        Args:
+            category: Search category for findings
+            custom_query: Optional custom SQL query that overrides the category-based query
+            batch_size: Number of rows fetched per round trip
+            
+        Yields:
+            Finding dictionaries
+        """
+        for batch in self.iter_finding_batches(category, custom_query, batch_size):
+            yield from batch
+            
+    def retrieve_findings(self, category: Optional[str], custom_query: Optional[str] = None,
+                          batch_size: int = DEFAULT_BATCH_SIZE,
+                          output_format: str = DEFAULT_FORMAT) -> int:
+        """
+        Retrieve findings using either a custom query or a query generated
+        based on the provided category, streaming them to
+        findings/solodit_tidb_<category>.<format>.
+        
+        Args:
+            category: Search category for findings
+            custom_query: Optional custom SQL query that overrides the category-based query
+            batch_size: Number of rows fetched and written per batch
+            output_format: Output file format ('parquet', 'arrow' or 'csv')
+            
+        Returns:
+            Number of findings retrieved
+        """
+        name = category if not custom_query else "custom"
+        try:
+            writer = self._write_findings(
+                name, self.iter_finding_batches(category, custom_query, batch_size), output_format
+            )
+        except Exception as e:
+            logger.error(f"Error retrieving Solodit findings from {self.source_name}: {e}")
+            return 0
+        
+        logger.info(f"Retrieved {writer.rows_written} Solodit findings from {self.source_name}")
+        if writer.rows_written:
+            logger.info(f"Raw findings saved to {writer.output_file}")
+        else:
+            logger.warning("No findings to save")
+        return writer.rows_written
+    
+    def retrieve_dataset(self, custom_query: str, name: str = "custom", batch_size: int = DEFAULT_BATCH_SIZE,
+                         chunk_rows: int = DEFAULT_CHUNK_ROWS,
+                         partition_by: Optional[str] = DEFAULT_PARTITION_BY, restart: bool = False,
+                         retries: int = 3, backoff: float = 1.0) -> int:
+        """
+        Retrieve the results of a custom query in bounded memory into a
+        partitioned Parquet dataset at findings/solodit_tidb_<name>/.
+        
+        The results are fetched in pages of chunk_rows rows with keyset
+        pagination on id. Each page is written as one chunk file per partition
+        and committed to the dataset manifest, so a pull that is interrupted
+        resumes after its last committed chunk when run again with the same
+        query. Pages failing with transient errors are retried. A completed
+        pull of the same query younger than dataset_max_age() is reused
+        without querying the source.
+        
+        Args:
+            custom_query: SQL query selecting the id column (and the partition column)
+            name: Query name used for the dataset directory
+            batch_size: Number of rows fetched and written per batch
+            chunk_rows: Number of rows per page and chunk
+            partition_by: Partition column, 'publish_date' (by month) or 'audit_company' (None for one partition)
+            restart: Discard an interrupted or reusable pull instead of resuming or reusing it
+            retries: Number of retries of a page for transient errors (default: 3)
+            backoff: Base delay in seconds before the first retry (default: 1.0)
+            
+        Returns:
+            Number of findings retrieved
+        """
+        max_age = self.dataset_max_age()
+        if max_age is not None and not restart:
+            dataset = reusable_dataset(name, custom_query, partition_by, max_age)
+            if dataset is not None:
+                logger.info(f"Reusing the completed pull of '{name}' at {dataset.path} ({dataset.rows} findings)")
+                return dataset.rows
+        
+        try:
+            writer = DatasetWriter(dataset_path(name), custom_query, partition_by, restart=restart)
+            if writer.resumed:
+                logger.info(f"Resuming pull of '{name}' after id {writer.last_id} "
+                            f"({writer.rows} findings in {writer.chunks} chunks)")
+            while True:
+                written = self._write_page(writer, custom_query, chunk_rows, batch_size, retries, backoff)
+                logger.info(f"Pulled {writer.rows} findings in {writer.chunks} chunks")
+                if written < chunk_rows:
+                    break
+            dataset = writer.finish()
+        except Exception as e:
+            logger.error(f"Error retrieving Solodit findings from {self.source_name}: {e}")
+            return 0
+        
+        logger.info(f"Retrieved {dataset.rows} Solodit findings from {self.source_name}")
+        if dataset.rows:
+            logger.info(f"Raw findings saved to {dataset.path} in {len(dataset.partitions())} partitions")
+        else:
+            logger.warning("No findings to save")
+        return dataset.rows
+    
+    def _write_page(self, writer: DatasetWriter, custom_query: str, chunk_rows: int, batch_size: int,
+                    retries: int, backoff: float) -> int:
+        """
+        Write the next keyset page of a custom query as a chunk, retrying
+        transient failures with exponential backoff and jitter.
+        
+        Returns:
+            Number of findings in the page
+        """
+        attempt = 0
+        while True:
+            try:
+                return writer.write_chunk(self.iter_keyset_page(custom_query, writer.last_id, chunk_rows, batch_size))
+            except Exception as e:
+                if attempt >= retries or not self.is_transient_error(e):
+                    raise
+                delay = backoff * (2 ** attempt) * (0.5 + random.random())
+                attempt += 1
+                logger.warning(f"Transient error after id {writer.last_id} ({e}); "
+                               f"retry {attempt}/{retries} in {delay:.1f}s")
+                time.sleep(delay)
+    
+    def _write_findings(self, name: str, batches: Iterator[List[Dict[str, Any]]],
+                        output_format: str = DEFAULT_FORMAT) -> FindingsWriter:
+        """
+        Stream batches of findings to findings/solodit_tidb_<name>.<format>.
+        
+        The output file is only replaced once every batch has been written.
+        
+        Args:
+            name: Category name (or 'custom' for custom queries)
+            batches: Batches of finding dictionaries
+            output_format: Output file format ('parquet', 'arrow' or 'csv')
+            
+        Returns:
+            The closed writer, exposing rows_written and output_file
+        """
+        writer = open_writer(findings_path(name, output_format), output_format)
+        try:
+            for batch in batches:
+                writer.write_batch(batch)
+                logger.debug(f"Wrote batch of {len(batch)} findings ({writer.rows_written} total)")
+        except BaseException:
+            writer.abort()
+            raise
+        writer.close()
+        return writer
+    
+    def retrieve_categories(self, categories: List[str], batch_size: int = DEFAULT_BATCH_SIZE,
+                            output_format: str = DEFAULT_FORMAT) -> Dict[str, int]:
+        """
+        Retrieve findings for many categories in a single pass over the
+        candidate rows, writing one findings file per category.
+        
+        Each row is assigned to every category whose term occurs in its title
+        or content, matching the semantics of the per-category query.
+        
+        Args:
+            categories: Search categories for findings
+            batch_size: Number of rows fetched and written per batch
+            output_format: Output file format ('parquet', 'arrow' or 'csv')
+            
+        Returns:
+            Dictionary mapping each category to its number of findings
+        """
+        # A repeated category would get every matching row written to its file twice
+        categories = list(dict.fromkeys(categories))
+        matcher = AhoCorasickMatcher(categories)
+        categories_by_term: Dict[str, List[str]] = {}
+        for category in categories:
+            categories_by_term.setdefault(category.strip().lower(), []).append(category)
+        
+        writers = {
+            category: open_writer(findings_path(category, output_format), output_format)
+            for terms in categories_by_term.values() for category in terms
+        }
+        logger.info(f"Retrieving findings for {len(writers)} categories in one pass")
+        
+        scanned = 0
+        try:
+            for batch in self.iter_candidate_batches(batch_size):
+                pending: Dict[str, List[Dict[str, Any]]] = {}
+                for row in batch:
+                    text = f"{row.get('title') or ''}\n{row.get('content') or ''}"
+                    for term in matcher.match(text):
+                        for category in categories_by_term[term]:
+                            pending.setdefault(category, []).append(row)
+                for category, rows in pending.items():
+                    writers[category].write_batch(rows)
+                scanned += len(batch)
+                logger.debug(f"Scanned {scanned} candidate findings")
+            for writer in writers.values():
+                writer.close()
+        except Exception as e:
+            for writer in writers.values():
+                writer.abort()
+            logger.error(f"Error retrieving Solodit findings from {self.source_name}: {e}")
+            return {category: 0 for category in writers}
+        
+        counts = {category: writer.rows_written for category, writer in writers.items()}
+        logger.info(f"Scanned {scanned} candidate findings from {self.source_name}")
+        for category, count in counts.items():
+            if count:
+                logger.info(f"Saved {count} findings for '{category}' to {writers[category].output_file}")
+            else:
+                logger.warning(f"No findings to save for '{category}'")
+        return counts
@@ -0,0 +1,413 @@
+"""
+Partitioned findings dataset module.
+Stores the results of large custom queries as Parquet chunk files, one per
+partition (publish month or audit company) and chunk, with a manifest of the
+committed chunks. Pulls write one chunk per keyset page, so memory stays
+bounded and an interrupted pull resumes after its last committed chunk.
+Readers iterate the chunk files lazily.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, List, Dict, Any, Iterable, Iterator, Optional
+
+from finding_retriever.instrumentation import span
+from finding_retriever.store import SUPPORTED_FORMATS, ParquetFindingsWriter, findings_path, read_findings
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Columns a dataset can be partitioned by; publish_date is partitioned by month
+PARTITION_COLUMNS = ("publish_date", "audit_company")
+DEFAULT_PARTITION_BY = "publish_date"
+DEFAULT_CHUNK_ROWS = 50000
+DEFAULT_ROW_GROUP_ROWS = 10000
+MANIFEST_NAME = "_manifest.json"
+
+_CHUNK_FILE_RE = re.compile(r"part-(\d+)\.parquet")
+_UNSAFE_PATH_RE = re.compile(r"[^A-Za-z0-9._-]+")
+
+
+def dataset_path(name: str, findings_dir: Optional[Path] = None) -> Path:
+    """
+    Build the directory of the partitioned dataset of a query name.
+
+    Args:
+        name: Query name, e.g. 'custom'
+        findings_dir: Directory holding the findings files (default: FINDINGS_DIR)
+
+    Returns:
+        Path to the dataset directory, next to the findings files of the same name
+    """
+    return findings_path(name, "parquet", findings_dir).with_suffix("")
+
+
+def partition_key(row: Dict[str, Any], partition_by: Optional[str]) -> str:
+    """
+    Get the partition directory of a row.
+
+    Args:
+        row: Finding dictionary
+        partition_by: Partition column, one of PARTITION_COLUMNS (None for a single partition)
+
+    Returns:
+        Hive-style directory name, e.g. 'publish_date=2024-03' ('' without partitioning)
+    """
+    if partition_by is None:
+        return ""
+    value = row.get(partition_by)
+    if value is None or value == "":
+        return f"{partition_by}=unknown"
+    if partition_by == "publish_date":
+        # Dates, datetimes and ISO strings all start with YYYY-MM
+        text = str(value)[:7]
+    else:
+        text = _UNSAFE_PATH_RE.sub("_", str(value)).strip("_") or "unknown"
+    return f"{partition_by}={text}"
+
+
+def _partition_of(file: str) -> str:
+    parent = Path(file).parent
+    return "" if parent == Path(".") else str(parent)
+
+
+def _fingerprint(query: str, partition_by: Optional[str]) -> str:
+    payload = json.dumps({"query": query.strip(), "partition_by": partition_by}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _load_manifest(path: Path) -> Optional[Dict[str, Any]]:
+    manifest_file = path / MANIFEST_NAME
+    if not manifest_file.exists():
+        return None
+    with open(manifest_file, "r") as f:
+        return json.load(f)
+
+
+def _save_manifest(path: Path, manifest: Dict[str, Any]) -> None:
+    manifest_file = path / MANIFEST_NAME
+    tmp_file = manifest_file.with_name(manifest_file.name + ".tmp")
+    with open(tmp_file, "w") as f:
+        json.dump(manifest, f, indent=2, default=str)
+    os.replace(tmp_file, manifest_file)
+
+
+class FindingsDataset:
+    """A completed partitioned findings dataset, read lazily one chunk file at a time."""
+
+    def __init__(self, path: Path):
+        """
+        Args:
+            path: Dataset directory
+        """
+        self.path = Path(path)
+        self._manifest: Optional[Dict[str, Any]] = None
+
+    @property
+    def manifest_file(self) -> Path:
+        return self.path / MANIFEST_NAME
+
+    @property
+    def manifest(self) -> Dict[str, Any]:
+        if self._manifest is None:
+            self._manifest = _load_manifest(self.path) or {}
+        return self._manifest
+
+    def exists(self) -> bool:
+        """Check whether a completed pull is stored at the path."""
+        return self.manifest_file.exists() and bool(self.manifest.get("complete"))
+
+    @property
+    def rows(self) -> int:
+        return self.manifest.get("rows", 0)
+
+    def partitions(self) -> List[str]:
+        """
+        List the partitions of the dataset.
+
+        Returns:
+            Sorted partition directory names ('' for an unpartitioned dataset)
+        """
+        return sorted({_partition_of(file) for chunk in self.manifest.get("chunks", []) for file in chunk["files"]})
+
+    def files(self, partitions: Optional[Iterable[str]] = None) -> List[Path]:
+        """
+        List the chunk files of the dataset in the order they were pulled.
+
+        Args:
+            partitions: Only list the files of these partitions (None for all)
+
+        Returns:
+            Paths of the chunk files
+        """
+        wanted = set(partitions) if partitions is not None else None
+        files = []
+        for chunk in self.manifest.get("chunks", []):
+            for file in chunk["files"]:
+                if wanted is None or _partition_of(file) in wanted:
+                    files.append(self.path / file)
+        return files
+
+    def iter_batches(self, columns: Optional[List[str]] = None, batch_size: int = 10000,
+                     partitions: Optional[Iterable[str]] = None) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Lazily read the findings of the dataset in batches.
+
+        Args:
+            columns: Columns to read (None for all); missing columns are skipped
+            batch_size: Maximum number of findings per batch
+            partitions: Only read these partitions (None for all)
+
+        Yields:
+            Lists of finding dictionaries
+        """
+        import pyarrow.parquet as pq
+
+        for file in self.files(partitions):
+            parquet_file = pq.ParquetFile(file)
+            available = parquet_file.schema_arrow.names
+            selected = [column for column in columns if column in available] if columns is not None else None
+            for record_batch in parquet_file.iter_batches(batch_size=batch_size, columns=selected):
+                with span("dataset.read") as read_span:
+                    batch = record_batch.to_pylist()
+                    read_span.add(rows=len(batch))
+                yield batch
+
+    def iter_frames(self, columns: Optional[List[str]] = None,
+                    partitions: Optional[Iterable[str]] = None) -> Iterator["pd.DataFrame"]:
+        """
+        Lazily read the dataset one chunk file at a time.
+
+        Args:
+            columns: Columns to read (None for all); missing columns are skipped
+            partitions: Only read these partitions (None for all)
+
+        Yields:
+            One DataFrame per chunk file
+        """
+        for file in self.files(partitions):
+            yield read_findings(file, "parquet", columns)
+
+    def to_pandas(self, columns: Optional[List[str]] = None) -> "pd.DataFrame":
+        """
+        Read the whole dataset into a DataFrame, for stages that need every finding at once.
+
+        Args:
+            columns: Columns to read (None for all); missing columns are skipped
+
+        Returns:
+            DataFrame with the findings of every chunk file
+        """
+        import pandas as pd
+
+        frames = [frame for frame in self.iter_frames(columns) if not frame.empty]
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, ignore_index=True)
+
+
+class DatasetWriter:
+    """
+    Writes a partitioned dataset chunk by chunk into a staging directory.
+
+    Each committed chunk is recorded in the staging manifest together with the
+    last id it contains. Reopening the writer for the same query and
+    partitioning resumes from there; finish() moves the completed dataset into
+    place, replacing the previous one.
+    """
+
+    def __init__(self, path: Path, query: str, partition_by: Optional[str] = DEFAULT_PARTITION_BY,
+                 restart: bool = False):
+        """
+        Args:
+            path: Dataset directory
+            query: Query being pulled, identifying the pull to resume
+            partition_by: Partition column, one of PARTITION_COLUMNS (None for a single partition)
+            restart: Discard an interrupted pull of the same query instead of resuming it
+        """
+        if partition_by is not None and partition_by not in PARTITION_COLUMNS:
+            raise ValueError(f"Unsupported partition column: {partition_by}")
+        self.path = Path(path)
+        self.staging_path = self.path.with_name(self.path.name + ".partial")
+        self.partition_by = partition_by
+        fingerprint = _fingerprint(query, partition_by)
+
+        manifest = None if restart else _load_manifest(self.staging_path)
+        self.resumed = manifest is not None and manifest.get("fingerprint") == fingerprint
+        if not self.resumed:
+            shutil.rmtree(self.staging_path, ignore_errors=True)
+            manifest = {
+                "query": query.strip(),
+                "fingerprint": fingerprint,
+                "partition_by": partition_by,
+                "rows": 0,
+                "last_id": None,
+                "complete": False,
+                "chunks": [],
+            }
+        self.manifest = manifest
+        os.makedirs(self.staging_path, exist_ok=True)
+        self._discard_uncommitted()
+        _save_manifest(self.staging_path, self.manifest)
+
+    @property
+    def rows(self) -> int:
+        return self.manifest["rows"]
+
+    @property
+    def last_id(self) -> Optional[Any]:
+        return self.manifest["last_id"]
+
+    @property
+    def chunks(self) -> int:
+        return len(self.manifest["chunks"])
+
+    def _discard_uncommitted(self) -> None:
+        """Remove chunk files left behind by a chunk that was not committed."""
+        for file in self.staging_path.rglob("part-*"):
+            match = _CHUNK_FILE_RE.fullmatch(file.name)
+            if match is None or int(match.group(1)) >= self.chunks:
+                file.unlink()
+
+    def write_chunk(self, batches: Iterable[List[Dict[str, Any]]],
+                    row_group_rows: int = DEFAULT_ROW_GROUP_ROWS) -> int:
+        """
+        Write batches ordered by id as the next chunk and commit it.
+
+        Rows are buffered per partition so that row groups do not shrink with
+        the number of partitions; at most row_group_rows rows are buffered,
+        flushing the largest partition first.
+
+        Args:
+            batches: Batches of finding dictionaries, e.g. one keyset page
+            row_group_rows: Maximum number of buffered rows and rows per row group
+
+        Returns:
+            Number of findings written (0 if there were none and nothing was committed)
+        """
+        chunk = self.chunks
+        writers: Dict[str, ParquetFindingsWriter] = {}
+        buffers: Dict[str, List[Dict[str, Any]]] = {}
+        buffered = 0
+        rows, last_id = 0, self.last_id
+
+        def flush(key: str) -> None:
+            writer = writers.get(key)
+            if writer is None:
+                writer = writers[key] = ParquetFindingsWriter(self.staging_path / key / f"part-{chunk:05d}.parquet")
+            writer.write_batch(buffers.pop(key))
+
+        try:
+            with span("dataset.chunk", chunk=chunk) as chunk_span:
+                for batch in batches:
+                    if not batch:
+                        continue
+                    if "id" not in batch[0]:
+                        raise ValueError("Partitioned pulls need the query to select the id column")
+                    if self.partition_by is not None and self.partition_by not in batch[0]:
+                        raise ValueError(f"Partitioned pulls need the query to select the "
+                                         f"{self.partition_by} column")
+                    for row in batch:
+                        buffers.setdefault(partition_key(row, self.partition_by), []).append(row)
+                    buffered += len(batch)
+                    while buffered >= row_group_rows:
+                        largest = max(buffers, key=lambda key: len(buffers[key]))
+                        buffered -= len(buffers[largest])
+                        flush(largest)
+                    rows += len(batch)
+                    last_id = batch[-1]["id"]
+                for key in list(buffers):
+                    flush(key)
+                for writer in writers.values():
+                    writer.close()
+                chunk_span.add(rows=rows)
+        except BaseException:
+            for writer in writers.values():
+                writer.abort()
+            raise
+        if not rows:
+            return 0
+
+        self.manifest["chunks"].append({
+            "files": {str(writer.output_file.relative_to(self.staging_path)): writer.rows_written
+                      for writer in writers.values()},
+            "rows": rows,
+            "last_id": last_id,
+        })
+        self.manifest["rows"] += rows
+        self.manifest["last_id"] = last_id
+        _save_manifest(self.staging_path, self.manifest)
+        logger.debug(f"Committed chunk {chunk} with {rows} findings up to id {last_id}")
+        return rows
+
+    def finish(self) -> FindingsDataset:
+        """
+        Mark the pull complete and move the dataset into place.
+
+        Returns:
+            The completed dataset
+        """
+        self.manifest["complete"] = True
+        _save_manifest(self.staging_path, self.manifest)
+        previous = self.path.with_name(self.path.name + ".old")
+        shutil.rmtree(previous, ignore_errors=True)
+        if self.path.exists():
+            os.replace(self.path, previous)
+        os.replace(self.staging_path, self.path)
+        shutil.rmtree(previous, ignore_errors=True)
+        return FindingsDataset(self.path)
+
+
+def stored_dataset(name: str, findings_dir: Optional[Path] = None) -> Optional[FindingsDataset]:
+    """
+    Get the completed dataset of a query name unless a findings file of the
+    same name was written after it.
+
+    Args:
+        name: Query name, e.g. 'custom'
+        findings_dir: Directory holding the findings files (default: FINDINGS_DIR)
+
+    Returns:
+        The dataset, or None if there is none or it is stale
+    """
+    dataset = FindingsDataset(dataset_path(name, findings_dir))
+    if not dataset.exists():
+        return None
+    completed = dataset.manifest_file.stat().st_mtime
+    for fmt in SUPPORTED_FORMATS:
+        path = findings_path(name, fmt, findings_dir)
+        if path.exists() and path.stat().st_mtime > completed:
+            return None
+    return dataset
+
+
+def reusable_dataset(name: str, query: str, partition_by: Optional[str], max_age: float,
+                     findings_dir: Optional[Path] = None) -> Optional[FindingsDataset]:
+    """
+    Get the completed pull of the same query and partitioning, if it is recent
+    enough to be served instead of querying again.
+
+    Args:
+        name: Query name, e.g. 'custom'
+        query: Query to pull
+        partition_by: Partition column, one of PARTITION_COLUMNS (None for a single partition)
+        max_age: Maximum seconds since the pull was completed
+        findings_dir: Directory holding the findings files (default: FINDINGS_DIR)
+
+    Returns:
+        The dataset, or None if there is none, it is stale or it was pulled for another query
+    """
+    dataset = stored_dataset(name, findings_dir)
+    if dataset is None or dataset.manifest.get("fingerprint") != _fingerprint(query, partition_by):
+        return None
+    if time.time() - dataset.manifest_file.stat().st_mtime > max_age:
+        return None
+    return dataset
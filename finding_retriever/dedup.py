@@ -0,0 +1,299 @@
+"""
+Near-duplicate finding detection module.
+Clusters findings whose title and content are nearly identical using MinHash
+signatures and locality-sensitive hashing (LSH), so that each issue is sent
+to the checklist generator only once.
+"""
+
+import logging
+import re
+from collections import defaultdict
+from typing import Callable, List, Dict, Any, Iterable, Iterator, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"[a-z0-9_]+")
+# Warden credit lines ("_Submitted by ..., also found by ..._") differ between
+# copies of the same finding and would dilute the similarity
+_CREDIT_RE = re.compile(r"_?(submitted by|also found by)[^\n]*", re.IGNORECASE)
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+
+def _optimal_bands(num_perm: int, threshold: float) -> Tuple[int, int]:
+    """
+    Pick the LSH banding whose S-curve threshold (1/b)^(1/r) is closest to
+    the requested similarity threshold.
+
+    Args:
+        num_perm: Number of MinHash permutations
+        threshold: Jaccard similarity at which findings count as duplicates
+
+    Returns:
+        Tuple of (bands, rows per band)
+    """
+    best = (num_perm, 1)
+    best_error = float("inf")
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        error = abs((1.0 / bands) ** (1.0 / rows) - threshold)
+        if error < best_error:
+            best, best_error = (bands, rows), error
+    return best
+
+
+class MinHashDeduplicator:
+    """Clusters near-duplicate findings in near-linear time with MinHash LSH."""
+
+    def __init__(self, threshold: float = 0.8, num_perm: int = 128, shingle_size: int = 5,
+                 seed: int = 1):
+        """
+        Initialize the deduplicator.
+
+        Args:
+            threshold: Estimated Jaccard similarity at which two findings are duplicates (default: 0.8)
+            num_perm: Number of MinHash permutations (default: 128)
+            shingle_size: Number of consecutive words per shingle (default: 5)
+            seed: Seed of the random permutations
+        """
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.bands, self.rows = _optimal_bands(num_perm, threshold)
+
+        rng = np.random.default_rng(seed)
+        # 32-bit coefficients keep a * x + b below 2**64 for 32-bit x
+        self._a = rng.integers(1, int(_MAX_HASH), size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, int(_MAX_HASH), size=num_perm, dtype=np.uint64)
+        # Random odd multipliers combining the words of a shingle into one hash
+        self._word_mix = rng.integers(1, 1 << 62, size=shingle_size, dtype=np.uint64) | np.uint64(1)
+        self._vocabulary: Dict[str, int] = {}
+
+        self.ids: List[Any] = []
+        self._signatures: List[np.ndarray] = []
+
+    @staticmethod
+    def normalize(title: Optional[str], content: Optional[str]) -> List[str]:
+        """
+        Normalize a finding into lowercase word tokens.
+
+        Args:
+            title: Finding title
+            content: Finding content (markdown)
+
+        Returns:
+            List of word tokens
+        """
+        text = f"{title or ''}\n{content or ''}"
+        text = _CREDIT_RE.sub(" ", text)
+        # Drop "[H-02]"-style report numbering that differs between platforms
+        text = re.sub(r"\[[a-z]-\d+\]", " ", text, flags=re.IGNORECASE)
+        return _TOKEN_RE.findall(text.lower())
+
+    def _shingle_hashes(self, tokens: List[str]) -> np.ndarray:
+        """Hash every word shingle of a token list into a 64-bit integer."""
+        ids = np.fromiter(
+            (self._vocabulary.setdefault(token, len(self._vocabulary)) for token in tokens),
+            dtype=np.uint64, count=len(tokens),
+        )
+        ids = ids * np.uint64(0x9E3779B97F4A7C15) + np.uint64(1)
+        k = min(self.shingle_size, len(ids))
+        if k == 0:
+            return np.zeros(1, dtype=np.uint64)
+        windows = len(ids) - k + 1
+        hashes = np.zeros(windows, dtype=np.uint64)
+        for offset in range(k):
+            hashes ^= ids[offset:offset + windows] * self._word_mix[offset]
+        return np.unique(hashes)
+
+    def signature(self, tokens: List[str]) -> np.ndarray:
+        """
+        Compute the MinHash signature of a token list.
+
+        Args:
+            tokens: Normalized word tokens
+
+        Returns:
+            Array of num_perm 32-bit minimum hash values
+        """
+        shingles = self._shingle_hashes(tokens) & _MAX_HASH
+        # (a * x + b) mod p for every permutation and shingle at once
+        permuted = (self._a[:, None] * shingles[None, :] + self._b[:, None]) % _MERSENNE_PRIME
+        return (permuted.min(axis=1) & _MAX_HASH).astype(np.uint32)
+
+    def add(self, finding_id: Any, title: Optional[str], content: Optional[str]) -> None:
+        """
+        Add a finding to the index.
+
+        Args:
+            finding_id: Identifier of the finding
+            title: Finding title
+            content: Finding content
+        """
+        self.ids.append(finding_id)
+        self._signatures.append(self.signature(self.normalize(title, content)))
+
+    def add_findings(self, findings: Iterable[Dict[str, Any]]) -> None:
+        """
+        Add findings (dictionaries with id, title and content) to the index.
+
+        Args:
+            findings: Finding dictionaries, e.g. from a retriever's iter_findings()
+        """
+        for finding in findings:
+            self.add(finding.get("id"), finding.get("title"), finding.get("content"))
+
+    def clusters(self) -> List[List[int]]:
+        """
+        Group the indexed findings into near-duplicate clusters.
+
+        Candidate pairs come from LSH buckets, so only findings sharing a band
+        are ever compared; each candidate is confirmed by its estimated Jaccard
+        similarity before being merged.
+
+        Returns:
+            Clusters as lists of positions in self.ids, largest first
+        """
+        count = len(self._signatures)
+        if not count:
+            return []
+        signatures = np.vstack(self._signatures)
+        parent = list(range(count))
+
+        def find(node: int) -> int:
+            while parent[node] != node:
+                parent[node] = parent[parent[node]]
+                node = parent[node]
+            return node
+
+        for band in range(self.bands):
+            band_values = np.ascontiguousarray(signatures[:, band * self.rows:(band + 1) * self.rows])
+            buckets: Dict[bytes, List[int]] = defaultdict(list)
+            for position, key in enumerate(map(bytes, band_values)):
+                buckets[key].append(position)
+            for members in buckets.values():
+                if len(members) < 2:
+                    continue
+                head = members[0]
+                similarity = (signatures[members[1:]] == signatures[head]).mean(axis=1)
+                for member, score in zip(members[1:], similarity):
+                    if score >= self.threshold:
+                        root_head, root_member = find(head), find(member)
+                        if root_head != root_member:
+                            parent[root_member] = root_head
+
+        groups: Dict[int, List[int]] = defaultdict(list)
+        for position in range(count):
+            groups[find(position)].append(position)
+        return sorted(groups.values(), key=len, reverse=True)
+
+
+def _representatives(deduplicator: MinHashDeduplicator, ids: List[Any],
+                     content_lengths: List[int]) -> Dict[int, Tuple[int, str]]:
+    """
+    Pick the member with the longest content as the representative of each cluster.
+
+    Args:
+        deduplicator: Index whose ids are positions in ids and content_lengths
+        ids: Finding ids by position
+        content_lengths: Content lengths by position
+
+    Returns:
+        Mapping of each representative's position to its cluster size and the
+        comma-separated ids of the other members
+    """
+    representatives: Dict[int, Tuple[int, str]] = {}
+    for members in deduplicator.clusters():
+        representative = max(members, key=lambda position: content_lengths[position])
+        member_ids = dict.fromkeys(str(ids[member]) for member in sorted(members))
+        member_ids.pop(str(ids[representative]), None)
+        representatives[representative] = (len(members), ",".join(member_ids))
+    return representatives
+
+
+def deduplicate_findings(df: pd.DataFrame, threshold: float = 0.8, num_perm: int = 128,
+                         shingle_size: int = 5) -> pd.DataFrame:
+    """
+    Keep one representative per cluster of near-duplicate findings.
+
+    The representative is the member with the longest content. It gains a
+    'cluster_size' column and a 'duplicate_ids' column listing the ids of the
+    findings it stands for (comma-separated, empty for unique findings).
+
+    Args:
+        df: Findings with id, title and content columns
+        threshold: Estimated Jaccard similarity at which two findings are duplicates
+        num_perm: Number of MinHash permutations
+        shingle_size: Number of consecutive words per shingle
+
+    Returns:
+        DataFrame with one row per cluster, in the original order
+    """
+    if df.empty:
+        return df.assign(cluster_size=pd.Series(dtype=int), duplicate_ids=pd.Series(dtype=str))
+
+    deduplicator = MinHashDeduplicator(threshold=threshold, num_perm=num_perm, shingle_size=shingle_size)
+    titles = df["title"].tolist() if "title" in df.columns else [None] * len(df)
+    contents = df["content"].tolist() if "content" in df.columns else [None] * len(df)
+    for position, (title, content) in enumerate(zip(titles, contents)):
+        deduplicator.add(position, title, content)
+
+    content_lengths = [len(content) if isinstance(content, str) else 0 for content in contents]
+    representatives = _representatives(deduplicator, df["id"].tolist(), content_lengths)
+    keep = sorted(representatives)
+    result = df.iloc[keep].copy()
+    result["cluster_size"] = [representatives[position][0] for position in keep]
+    result["duplicate_ids"] = [representatives[position][1] for position in keep]
+    logger.info(f"Deduplicated {len(df)} findings into {len(result)} clusters "
+                f"(bands={deduplicator.bands}, rows={deduplicator.rows})")
+    return result.reset_index(drop=True)
+
+
+def deduplicate_batches(read_batches: Callable[[], Iterable[List[Dict[str, Any]]]], threshold: float = 0.8,
+                        num_perm: int = 128, shingle_size: int = 5) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Keep one representative per cluster of near-duplicate findings without
+    holding the findings in memory, only their MinHash signatures.
+
+    The findings are read twice: once to index them and once to yield the
+    representatives, which gain the same columns as in deduplicate_findings().
+
+    Args:
+        read_batches: Function returning a new iterator over the batches of findings
+            in the same order each time, e.g. of a partitioned dataset
+        threshold: Estimated Jaccard similarity at which two findings are duplicates
+        num_perm: Number of MinHash permutations
+        shingle_size: Number of consecutive words per shingle
+
+    Yields:
+        Batches of representative finding dictionaries, in the original order
+    """
+    deduplicator = MinHashDeduplicator(threshold=threshold, num_perm=num_perm, shingle_size=shingle_size)
+    ids: List[Any] = []
+    content_lengths: List[int] = []
+    for batch in read_batches():
+        for finding in batch:
+            content = finding.get("content")
+            deduplicator.add(len(ids), finding.get("title"), content)
+            ids.append(finding.get("id"))
+            content_lengths.append(len(content) if isinstance(content, str) else 0)
+
+    representatives = _representatives(deduplicator, ids, content_lengths)
+    position = 0
+    for batch in read_batches():
+        kept = []
+        for finding in batch:
+            if position in representatives:
+                cluster_size, duplicate_ids = representatives[position]
+                kept.append({**finding, "cluster_size": cluster_size, "duplicate_ids": duplicate_ids})
+            position += 1
+        if kept:
+            yield kept
+    logger.info(f"Deduplicated {len(ids)} findings into {len(representatives)} clusters "
+                f"(bands={deduplicator.bands}, rows={deduplicator.rows})")
@@ -0,0 +1,341 @@
+"""
+Instrumentation module.
+Times the stages of the pipeline as nested spans carrying row, byte, token
+and memory counters, and reports them as a summary table or a Chrome trace.
+Instrumentation is off unless enabled; a disabled span is a shared no-op.
+"""
+
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextvars import ContextVar
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Counters summed per stage in the summary table
+COUNTERS = ("rows", "bytes", "tokens_in", "tokens_out")
+
+
+def peak_rss_mb() -> Optional[float]:
+    """
+    Get the peak resident set size of the current process.
+
+    Returns:
+        Peak RSS in MB, or None where the resource module is unavailable
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in bytes on macOS and in kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def estimate_row_bytes(rows: List[Any]) -> int:
+    """
+    Estimate the payload size of fetched rows.
+
+    Args:
+        rows: Row tuples or dictionaries
+
+    Returns:
+        Bytes of string and binary values, plus 8 per other non-NULL value
+    """
+    size = 0
+    for row in rows:
+        for value in (row.values() if isinstance(row, dict) else row):
+            if isinstance(value, (str, bytes, bytearray)):
+                size += len(value)
+            elif value is not None:
+                size += 8
+    return size
+
+
+class _NullSpan:
+    """Span returned while instrumentation is disabled; every method does nothing."""
+
+    __slots__ = ()
+    enabled = False
+
+    def add(self, **counters) -> None:
+        pass
+
+    def set(self, **attributes) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NULL_SPAN = _NullSpan()
+
+
+class Span:
+    """A timed stage of the pipeline."""
+
+    __slots__ = ("profiler", "name", "attributes", "counters", "start", "end", "lane",
+                 "parent", "peak_rss_mb", "_token")
+    enabled = True
+
+    def __init__(self, profiler: "Profiler", name: str, attributes: Dict[str, Any]):
+        self.profiler = profiler
+        self.name = name
+        self.attributes = attributes
+        self.counters: Dict[str, float] = {}
+        self.start = self.end = 0.0
+        self.lane = 0
+        self.parent: Optional[str] = None
+        self.peak_rss_mb: Optional[float] = None
+        self._token = None
+
+    def add(self, **counters) -> None:
+        """Add to counters of the span, e.g. rows=1000, bytes=4096."""
+        for key, value in counters.items():
+            if value is not None:
+                self.counters[key] = self.counters.get(key, 0) + value
+
+    def set(self, **attributes) -> None:
+        """Set descriptive attributes of the span."""
+        self.attributes.update(attributes)
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+    def __enter__(self) -> "Span":
+        parent = self.profiler._current.get()
+        self.parent = parent.name if parent is not None else None
+        self._token = self.profiler._current.set(self)
+        self.lane = self.profiler._lane()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end = time.perf_counter()
+        self.peak_rss_mb = peak_rss_mb()
+        if exc_type is not None:
+            self.attributes["error"] = exc_type.__name__
+        self.profiler._current.reset(self._token)
+        self.profiler._record(self)
+        return False
+
+
+class Profiler:
+    """Collects the spans of a run."""
+
+    def __init__(self):
+        self.spans: List[Span] = []
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+        self._current: ContextVar[Optional[Span]] = ContextVar(f"span_{id(self)}", default=None)
+        # Trace lanes: one per thread, and one per asyncio task so concurrent requests do not overlap
+        self._lanes: Dict[Tuple[int, int], int] = {}
+        self._lane_names: Dict[int, str] = {}
+
+    def span(self, name: str, **attributes) -> Span:
+        """
+        Create a span to be used as a context manager.
+
+        Args:
+            name: Stage name, e.g. 'tidb.fetch'
+            **attributes: Descriptive attributes, e.g. category='vesting'
+
+        Returns:
+            Span instance
+        """
+        return Span(self, name, attributes)
+
+    def _lane(self) -> int:
+        thread = threading.current_thread()
+        # Without asyncio loaded there is no task to look up, and importing it costs startup time
+        asyncio = sys.modules.get("asyncio")
+        task = None
+        if asyncio is not None:
+            try:
+                task = asyncio.current_task()
+            except RuntimeError:
+                pass
+        key = (thread.ident, id(task) if task is not None else 0)
+        with self._lock:
+            lane = self._lanes.get(key)
+            if lane is None:
+                lane = self._lanes[key] = len(self._lanes) + 1
+                self._lane_names[lane] = thread.name if task is None else f"{thread.name} / {task.get_name()}"
+            return lane
+
+    def _record(self, span: Span) -> None:
+        with self._lock:
+            self.spans.append(span)
+
+    def stages(self) -> List[Dict[str, Any]]:
+        """
+        Aggregate the recorded spans by name.
+
+        Returns:
+            One dictionary per stage, in order of first occurrence, with
+            'name', 'calls', 'total', 'max' (seconds), the summed counters
+            and the highest 'peak_rss_mb'
+        """
+        with self._lock:
+            spans = sorted(self.spans, key=lambda span: span.start)
+        stages: Dict[str, Dict[str, Any]] = {}
+        for span in spans:
+            stage = stages.setdefault(span.name, {"name": span.name, "calls": 0, "total": 0.0, "max": 0.0,
+                                                  "peak_rss_mb": None})
+            stage["calls"] += 1
+            stage["total"] += span.duration
+            stage["max"] = max(stage["max"], span.duration)
+            for key, value in span.counters.items():
+                stage[key] = stage.get(key, 0) + value
+            if span.peak_rss_mb is not None:
+                stage["peak_rss_mb"] = max(stage["peak_rss_mb"] or 0.0, span.peak_rss_mb)
+        return list(stages.values())
+
+    def summary(self) -> str:
+        """
+        Render the recorded stages as a text table.
+
+        Concurrent spans overlap, so stage totals can add up to more than the wall time.
+
+        Returns:
+            Table with one row per stage
+        """
+        headers = ["Stage", "Calls", "Total s", "Mean ms", "Max ms", "Rows", "Bytes", "Tokens in",
+                   "Tokens out", "Peak RSS MB"]
+        rows = []
+        for stage in self.stages():
+            rows.append([
+                stage["name"],
+                str(stage["calls"]),
+                f"{stage['total']:.3f}",
+                f"{stage['total'] / stage['calls'] * 1000:.1f}",
+                f"{stage['max'] * 1000:.1f}",
+                *(f"{int(stage[key]):,}" if key in stage else "" for key in COUNTERS),
+                f"{stage['peak_rss_mb']:.0f}" if stage["peak_rss_mb"] is not None else "",
+            ])
+        widths = [max(len(row[column]) for row in [headers] + rows) for column in range(len(headers))]
+
+        def line(cells: List[str]) -> str:
+            return "  ".join(cell.ljust(width) if column == 0 else cell.rjust(width)
+                             for column, (cell, width) in enumerate(zip(cells, widths)))
+
+        lines = [line(headers), line(["-" * width for width in widths])]
+        lines.extend(line(row) for row in rows)
+        lines.append(f"Wall time {time.perf_counter() - self.started:.3f}s, "
+                     f"peak RSS {peak_rss_mb() or 0:.0f} MB")
+        return "\n".join(lines)
+
+    def to_chrome_trace(self) -> Dict[str, Any]:
+        """
+        Convert the recorded spans to the Chrome trace event format,
+        viewable in chrome://tracing or Perfetto.
+
+        Returns:
+            Trace dictionary with complete ('X') events in microseconds
+        """
+        pid = os.getpid()
+        with self._lock:
+            spans = list(self.spans)
+            lane_names = dict(self._lane_names)
+        events = [
+            {"name": "thread_name", "ph": "M", "pid": pid, "tid": lane, "args": {"name": name}}
+            for lane, name in lane_names.items()
+        ]
+        for span in spans:
+            args = {**span.attributes, **span.counters}
+            if span.parent:
+                args["parent"] = span.parent
+            if span.peak_rss_mb is not None:
+                args["peak_rss_mb"] = round(span.peak_rss_mb, 1)
+            events.append({
+                "name": span.name,
+                "cat": span.name.split(".", 1)[0],
+                "ph": "X",
+                "ts": round((span.start - self.started) * 1e6, 1),
+                "dur": round(span.duration * 1e6, 1),
+                "pid": pid,
+                "tid": span.lane,
+                "args": {key: value if isinstance(value, (int, float, bool)) or value is None else str(value)
+                         for key, value in args.items()},
+            })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write_trace(self, path: Path) -> None:
+        """
+        Write the Chrome trace of the recorded spans to a JSON file.
+
+        Args:
+            path: Output file
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(self.to_chrome_trace(), f)
+        logger.info(f"Trace with {len(self.spans)} spans saved to {path}")
+
+
+_profiler: Optional[Profiler] = None
+
+
+def enable() -> Profiler:
+    """
+    Start recording spans, process-wide.
+
+    Returns:
+        The active profiler
+    """
+    global _profiler
+    if _profiler is None:
+        _profiler = Profiler()
+    return _profiler
+
+
+def disable() -> Optional[Profiler]:
+    """
+    Stop recording spans.
+
+    Returns:
+        The profiler that was active, with its recorded spans, or None
+    """
+    global _profiler
+    profiler, _profiler = _profiler, None
+    return profiler
+
+
+def get_profiler() -> Optional[Profiler]:
+    """Get the active profiler, or None if instrumentation is disabled."""
+    return _profiler
+
+
+def span(name: str, **attributes):
+    """
+    Time a stage of the pipeline.
+
+    Use as a context manager; the returned span accepts counters:
+
+        with span("tidb.fetch") as s:
+            rows = cursor.fetchmany(size)
+            s.add(rows=len(rows))
+
+    Work done only to compute counters should be guarded by s.enabled.
+
+    Args:
+        name: Stage name, e.g. 'tidb.fetch'
+        **attributes: Descriptive attributes
+
+    Returns:
+        Span of the active profiler, or a no-op span if instrumentation is disabled
+    """
+    profiler = _profiler
+    if profiler is None:
+        return NULL_SPAN
+    return Span(profiler, name, attributes)
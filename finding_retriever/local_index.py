@@ -0,0 +1,425 @@
+"""
+Local Index Finding Retriever module.
+Maintains a local SQLite FTS5 mirror of the Solodit findings table and
+retrieves findings from it with BM25-ranked full-text search.
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+from datetime import date, datetime
+from decimal import Decimal
+from typing import List, Dict, Any, Iterator, Optional
+from pathlib import Path
+
+from finding_retriever.base import DEFAULT_BATCH_SIZE, FindingRetriever
+from finding_retriever.query_builder import ALL_COLUMNS, keyset_page_query
+from finding_retriever.store import FINDINGS_DIR
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INDEX_PATH = FINDINGS_DIR / ".index" / "solodit_findings.sqlite"
+
+TABLE_NAME = "t_solodit_findings"
+FTS_TABLE_NAME = "t_solodit_findings_fts"
+
+
+def _to_sqlite_value(value: Any) -> Any:
+    """Convert a value returned by mysql.connector into one SQLite can store."""
+    if isinstance(value, (datetime, date)):
+        return str(value)
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (bytes, bytearray)):
+        return bytes(value).decode("utf-8", errors="replace")
+    return value
+
+
+class FindingsIndex:
+    """On-disk full-text index mirroring the t_solodit_findings table."""
+
+    def __init__(self, path: Optional[Path] = None, keep_open: bool = False):
+        """
+        Initialize the findings index.
+
+        Args:
+            path: SQLite database file (default: findings/.index/solodit_findings.sqlite)
+            keep_open: Keep one connection per thread open between queries, so that
+                a long-running process keeps its page cache warm. The index must
+                not be rebuilt while such connections are open.
+        """
+        self.path = Path(path or DEFAULT_INDEX_PATH)
+        self.keep_open = keep_open
+        self._local = threading.local()
+        self._open_connections: List[sqlite3.Connection] = []
+        self._open_lock = threading.Lock()
+
+    def exists(self) -> bool:
+        """Check whether the index has been built."""
+        if not self.path.exists():
+            return False
+        if self.keep_open:
+            return self._has_schema(self._thread_connection())
+        connection = self.connect()
+        try:
+            return self._has_schema(connection)
+        finally:
+            connection.close()
+
+    def connect(self, check_same_thread: bool = True) -> sqlite3.Connection:
+        """
+        Open a connection to the index database.
+
+        Args:
+            check_same_thread: Only allow the creating thread to use the connection
+
+        Returns:
+            SQLite connection object
+        """
+        os.makedirs(self.path.parent, exist_ok=True)
+        connection = sqlite3.connect(self.path, check_same_thread=check_same_thread)
+        connection.execute("PRAGMA journal_mode = WAL")
+        connection.execute("CREATE TABLE IF NOT EXISTS index_meta (key TEXT PRIMARY KEY, value TEXT)")
+        return connection
+
+    def _thread_connection(self) -> sqlite3.Connection:
+        """Get the connection kept open for the current thread, opening it on first use."""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            # Closed from whichever thread calls close(), but only used by this one
+            connection = self._local.connection = self.connect(check_same_thread=False)
+            with self._open_lock:
+                self._open_connections.append(connection)
+        return connection
+
+    def close(self) -> None:
+        """Close the connections kept open with keep_open."""
+        with self._open_lock:
+            connections, self._open_connections = self._open_connections, []
+        for connection in connections:
+            connection.close()
+        self._local = threading.local()
+
+    def _create_schema(self, connection: sqlite3.Connection, columns: List[str]) -> None:
+        """
+        Create the mirror table, its FTS5 index and the triggers keeping them in sync.
+
+        Args:
+            connection: SQLite connection object
+            columns: Column names of the source table
+        """
+        column_defs = ", ".join(
+            "id INTEGER PRIMARY KEY" if column == "id" else f'"{column}"' for column in columns
+        )
+        connection.executescript(f"""
+        DROP TABLE IF EXISTS {FTS_TABLE_NAME};
+        DROP TABLE IF EXISTS {TABLE_NAME};
+        CREATE TABLE {TABLE_NAME} ({column_defs});
+        CREATE INDEX idx_{TABLE_NAME}_impact ON {TABLE_NAME} (impact);
+        -- External-content FTS5 table: the text lives only in {TABLE_NAME}
+        CREATE VIRTUAL TABLE {FTS_TABLE_NAME} USING fts5(
+            title, content, content='{TABLE_NAME}', content_rowid='id',
+            tokenize='porter unicode61'
+        );
+        CREATE TRIGGER {TABLE_NAME}_ai AFTER INSERT ON {TABLE_NAME} BEGIN
+            INSERT INTO {FTS_TABLE_NAME} (rowid, title, content) VALUES (new.id, new.title, new.content);
+        END;
+        CREATE TRIGGER {TABLE_NAME}_ad AFTER DELETE ON {TABLE_NAME} BEGIN
+            INSERT INTO {FTS_TABLE_NAME} ({FTS_TABLE_NAME}, rowid, title, content)
+            VALUES ('delete', old.id, old.title, old.content);
+        END;
+        CREATE TRIGGER {TABLE_NAME}_au AFTER UPDATE ON {TABLE_NAME} BEGIN
+            INSERT INTO {FTS_TABLE_NAME} ({FTS_TABLE_NAME}, rowid, title, content)
+            VALUES ('delete', old.id, old.title, old.content);
+            INSERT INTO {FTS_TABLE_NAME} (rowid, title, content) VALUES (new.id, new.title, new.content);
+        END;
+        """)
+
+    def _get_meta(self, connection: sqlite3.Connection, key: str) -> Optional[str]:
+        row = connection.execute("SELECT value FROM index_meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, connection: sqlite3.Connection, key: str, value: str) -> None:
+        connection.execute(
+            "INSERT INTO index_meta (key, value) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (key, value),
+        )
+
+    def _apply_batches(self, connection: sqlite3.Connection,
+                       batches: Iterator[List[Dict[str, Any]]]) -> Dict[str, int]:
+        """
+        Upsert valid rows and delete invalid ones, tracking the updated_time watermark.
+
+        Args:
+            connection: SQLite connection object
+            batches: Batches of finding dictionaries from the source table
+
+        Returns:
+            Dictionary with 'upserted' and 'removed' row counts
+        """
+        stats = {"upserted": 0, "removed": 0}
+        columns = None
+        high_water = self._get_meta(connection, "updated_time")
+
+        for batch in batches:
+            if columns is None:
+                columns = list(batch[0].keys())
+                if not self._has_schema(connection):
+                    self._create_schema(connection, columns)
+                placeholders = ", ".join("?" for _ in columns)
+                column_list = ", ".join(f'"{column}"' for column in columns)
+                # DO UPDATE fires the AFTER UPDATE trigger that drops the old tokens from the FTS
+                # index; REPLACE deletes the old row without firing AFTER DELETE
+                updates = ", ".join(f'"{column}" = excluded."{column}"' for column in columns if column != "id")
+                upsert_sql = (
+                    f"INSERT INTO {TABLE_NAME} ({column_list}) VALUES ({placeholders}) "
+                    f"ON CONFLICT(id) DO UPDATE SET {updates}"
+                )
+
+            valid_rows = []
+            invalid_ids = []
+            for row in batch:
+                if row.get("is_valid") is not None and int(row["is_valid"]) == 0:
+                    invalid_ids.append((row["id"],))
+                else:
+                    valid_rows.append(tuple(_to_sqlite_value(row.get(column)) for column in columns))
+                if row.get("updated_time") is not None:
+                    updated_time = str(row["updated_time"])
+                    if high_water is None or updated_time > high_water:
+                        high_water = updated_time
+
+            connection.executemany(upsert_sql, valid_rows)
+            connection.executemany(f"DELETE FROM {TABLE_NAME} WHERE id = ?", invalid_ids)
+            stats["upserted"] += len(valid_rows)
+            stats["removed"] += len(invalid_ids)
+
+        if high_water is not None:
+            self._set_meta(connection, "updated_time", high_water)
+        return stats
+
+    def _has_schema(self, connection: sqlite3.Connection) -> bool:
+        row = connection.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name = ?", (FTS_TABLE_NAME,)
+        ).fetchone()
+        return row is not None
+
+    def rebuild(self, source, batch_size: int = DEFAULT_BATCH_SIZE) -> Dict[str, int]:
+        """
+        Rebuild the index from scratch by streaming the whole source table.
+
+        The new index is built next to the current one and swapped in when
+        complete, so searches keep working while a rebuild runs.
+
+        Args:
+            source: SoloditTiDBRetriever used to read the findings table
+            batch_size: Number of rows fetched per round trip
+
+        Returns:
+            Dictionary with 'upserted' and 'removed' row counts
+        """
+        tmp_index = FindingsIndex(self.path.with_name(self.path.name + ".tmp"))
+        if tmp_index.path.exists():
+            tmp_index.path.unlink()
+
+        logger.info(f"Rebuilding local findings index at {self.path}")
+        connection = tmp_index.connect()
+        try:
+            stats = self._apply_batches(connection, source.iter_table_batches(batch_size=batch_size))
+            if not self._has_schema(connection):
+                # An empty source yields no batch to take the columns from
+                self._create_schema(connection, list(ALL_COLUMNS))
+            connection.execute(f"INSERT INTO {FTS_TABLE_NAME} ({FTS_TABLE_NAME}) VALUES ('optimize')")
+            connection.commit()
+            connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        finally:
+            connection.close()
+
+        for suffix in ("-wal", "-shm"):
+            stale = Path(str(self.path) + suffix)
+            if stale.exists():
+                stale.unlink()
+        os.replace(tmp_index.path, self.path)
+        logger.info(f"Local findings index rebuilt with {stats['upserted']} findings")
+        return stats
+
+    def refresh(self, source, batch_size: int = DEFAULT_BATCH_SIZE) -> Dict[str, int]:
+        """
+        Refresh the index with rows updated since the last build or refresh.
+
+        Args:
+            source: SoloditTiDBRetriever used to read the findings table
+            batch_size: Number of rows fetched per round trip
+
+        Returns:
+            Dictionary with 'upserted' and 'removed' row counts
+        """
+        if not self.exists():
+            return self.rebuild(source, batch_size)
+
+        connection = self.connect()
+        try:
+            updated_since = self._get_meta(connection, "updated_time")
+            logger.info(f"Refreshing local findings index with rows updated since {updated_since}")
+            stats = self._apply_batches(
+                connection, source.iter_table_batches(updated_since=updated_since, batch_size=batch_size)
+            )
+            connection.commit()
+        finally:
+            connection.close()
+
+        logger.info(f"Local findings index refreshed: {stats['upserted']} upserted, {stats['removed']} removed")
+        return stats
+
+    @staticmethod
+    def _match_expression(category: str) -> str:
+        """
+        Build an FTS5 MATCH expression searching the category as a phrase.
+
+        Args:
+            category: The search category (e.g., 'vesting', 'input validation')
+
+        Returns:
+            FTS5 query string
+        """
+        return '"' + category.replace('"', '""') + '"'
+
+    def search(self, category: str, impacts: tuple = ("HIGH",), limit: Optional[int] = None,
+               batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Search the index for findings matching a category, best matches first.
+
+        Args:
+            category: The search category (e.g., 'vesting', 'reentrancy', etc.)
+            impacts: Impact levels to include
+            limit: Maximum number of findings to return (None for all)
+            batch_size: Number of rows fetched per batch
+
+        Yields:
+            Lists of finding dictionaries with an added 'bm25_score' (higher is better)
+        """
+        impact_placeholders = ", ".join("?" for _ in impacts)
+        query = f"""
+        SELECT f.*, -bm25({FTS_TABLE_NAME}, 2.0, 1.0) AS bm25_score
+        FROM {FTS_TABLE_NAME}
+        JOIN {TABLE_NAME} AS f ON f.id = {FTS_TABLE_NAME}.rowid
+        WHERE {FTS_TABLE_NAME} MATCH ?
+        AND f.impact IN ({impact_placeholders})
+        ORDER BY bm25({FTS_TABLE_NAME}, 2.0, 1.0)
+        """
+        params: List[Any] = [self._match_expression(category), *impacts]
+        if limit is not None:
+            query += "LIMIT ?"
+            params.append(limit)
+        yield from self.execute(query, tuple(params), batch_size)
+
+    def execute(self, query: str, params: tuple = (),
+                batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Run a query against the index and yield the results in batches.
+
+        Args:
+            query: SQL query to execute (SQLite dialect)
+            params: Parameters bound to the query placeholders
+            batch_size: Number of rows fetched per batch
+
+        Yields:
+            Lists of dictionaries containing the query results
+        """
+        connection = self._thread_connection() if self.keep_open else self.connect()
+        cursor = None
+        try:
+            cursor = connection.execute(query, params)
+            columns = [col[0] for col in cursor.description]
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield [dict(zip(columns, row)) for row in rows]
+        finally:
+            if not self.keep_open:
+                connection.close()
+            elif cursor is not None:
+                cursor.close()
+
+
+class LocalIndexRetriever(FindingRetriever):
+    """Component to retrieve Solodit findings from the local full-text index."""
+
+    source_name = "local index"
+
+    def __init__(self, index: Optional[FindingsIndex] = None, limit: Optional[int] = None):
+        """
+        Initialize the local index retriever.
+
+        Args:
+            index: Findings index to search (default: findings/.index/solodit_findings.sqlite)
+            limit: Maximum number of findings returned per category (None for all)
+        """
+        self.index = index or FindingsIndex()
+        self.limit = limit
+
+    def _require_index(self) -> None:
+        if not self.index.exists():
+            raise FileNotFoundError(
+                f"Local findings index not found at {self.index.path}; build it with --rebuild-index"
+            )
+
+    def iter_candidate_batches(self, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Stream every HIGH-impact finding in the local index.
+
+        Args:
+            batch_size: Number of rows fetched per batch
+
+        Yields:
+            Lists of finding dictionaries, each at most batch_size long
+        """
+        self._require_index()
+        yield from self.index.execute(
+            f"SELECT * FROM {TABLE_NAME} WHERE impact IN ('HIGH')", batch_size=batch_size
+        )
+
+    def iter_finding_batches(self, category: Optional[str], custom_query: Optional[str] = None,
+                             batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Lazily retrieve findings from the local index in batches.
+
+        Custom queries run against the local SQLite mirror, where the findings
+        table is available as t_solodit_findings.
+
+        Args:
+            category: Search category for findings
+            custom_query: Optional custom SQL query that overrides the category-based search
+            batch_size: Number of rows fetched per batch
+
+        Yields:
+            Lists of finding dictionaries, each at most batch_size long
+        """
+        self._require_index()
+
+        if custom_query:
+            logger.info("Using custom SQL query against the local index")
+            yield from self.index.execute(custom_query, batch_size=batch_size)
+        else:
+            logger.info(f"Using full-text search for '{category}'")
+            yield from self.index.search(category, limit=self.limit, batch_size=batch_size)
+
+    def iter_keyset_page(self, custom_query: str, after_id: Optional[Any], limit: int,
+                         batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Lazily retrieve one page of a custom query's results ordered by id from the local index.
+
+        Args:
+            custom_query: SQL query against t_solodit_findings selecting the id column
+            after_id: Last id of the previous page (None for the first page)
+            limit: Maximum number of rows in the page
+            batch_size: Number of rows fetched per batch
+
+        Yields:
+            Lists of finding dictionaries, each at most batch_size long
+        """
+        self._require_index()
+        query, params = keyset_page_query(custom_query, after_id, limit, placeholder="?")
+        yield from self.index.execute(query, params, batch_size=batch_size)
@@ -0,0 +1,113 @@
+"""
+Multi-pattern matcher module.
+Finds which of many category terms occur in a text in a single pass.
+"""
+
+import logging
+from collections import deque
+from typing import List, Dict, Set, Iterable
+
+logger = logging.getLogger(__name__)
+
+
+class AhoCorasickMatcher:
+    """Case-insensitive Aho-Corasick automaton over a fixed set of terms."""
+
+    def __init__(self, terms: Iterable[str]):
+        """
+        Build the automaton.
+
+        Uses the pyahocorasick C extension when it is installed and falls
+        back to a pure Python automaton otherwise.
+
+        Args:
+            terms: Terms to search for; matching is case-insensitive
+        """
+        self.terms: List[str] = []
+        for term in terms:
+            term = term.strip().lower()
+            if term and term not in self.terms:
+                self.terms.append(term)
+        if not self.terms:
+            raise ValueError("At least one non-empty term is required")
+
+        try:
+            import ahocorasick
+        except ImportError:
+            self._automaton = None
+            self._build()
+        else:
+            self._automaton = ahocorasick.Automaton()
+            for term_id, term in enumerate(self.terms):
+                self._automaton.add_word(term, term_id)
+            self._automaton.make_automaton()
+
+    def _build(self) -> None:
+        """Build the trie, failure links and output sets of the pure Python automaton."""
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[Set[int]] = [set()]
+
+        for term_id, term in enumerate(self.terms):
+            state = 0
+            for char in term:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append(set())
+                state = next_state
+            self._output[state].add(term_id)
+
+        # Breadth-first pass so every failure link points at an already finished state
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                self._output[next_state] |= self._output[self._fail[next_state]]
+
+    def match_ids(self, text: str) -> Set[int]:
+        """
+        Find the ids of all terms occurring in a text.
+
+        Args:
+            text: Text to scan
+
+        Returns:
+            Set of indexes into self.terms
+        """
+        text = text.lower()
+        if self._automaton is not None:
+            return {term_id for _, term_id in self._automaton.iter(text)}
+
+        found: Set[int] = set()
+        goto, fail, output = self._goto, self._fail, self._output
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                found |= output[state]
+                if len(found) == len(self.terms):
+                    break
+        return found
+
+    def match(self, text: str) -> Set[str]:
+        """
+        Find all terms occurring in a text.
+
+        Args:
+            text: Text to scan
+
+        Returns:
+            Set of matched terms
+        """
+        return {self.terms[term_id] for term_id in self.match_ids(text)}
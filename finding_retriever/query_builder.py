@@ -0,0 +1,220 @@
+"""
+Findings query builder module.
+Builds parameterized, column-projected queries against the Solodit findings table.
+"""
+
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+FINDINGS_TABLE = "shield_alds_stg.t_solodit_findings"
+
+# Every column of t_solodit_findings, used to validate projections since
+# column names cannot be bound as parameters
+ALL_COLUMNS = (
+    "id", "key_no", "title", "audit_company", "publish_date", "content", "protocol",
+    "finder_list", "impact", "tag_list", "contest_prize_txt", "pdf_page_from",
+    "general_score", "quality_score", "github_link", "source_link", "pdf_link",
+    "contest_link", "spider_file", "report_key_no", "created_time", "updated_time",
+    "is_valid", "content_code", "category_list",
+)
+
+# Columns read by the checklist pipeline
+DEFAULT_COLUMNS = (
+    "id", "title", "content", "impact", "protocol", "tag_list", "category_list", "publish_date",
+)
+
+
+# Escape character for LIKE patterns; '!' behaves the same with or without
+# NO_BACKSLASH_ESCAPES and in other SQL dialects
+LIKE_ESCAPE = "!"
+
+
+def escape_like(value: str) -> str:
+    """
+    Escape LIKE wildcards so a value is matched literally.
+
+    Args:
+        value: Raw search term
+
+    Returns:
+        Term with LIKE_ESCAPE, % and _ escaped
+    """
+    for char in (LIKE_ESCAPE, "%", "_"):
+        value = value.replace(char, LIKE_ESCAPE + char)
+    return value
+
+
+class FindingsQuery:
+    """Parameterized SELECT over the findings table with projection and filters."""
+
+    def __init__(self, columns: Optional[Sequence[str]] = DEFAULT_COLUMNS,
+                 impacts: Optional[Iterable[str]] = ("HIGH",), category: Optional[str] = None,
+                 published_after: Optional[str] = None, published_before: Optional[str] = None,
+                 audit_companies: Optional[Iterable[str]] = None, updated_since: Optional[str] = None,
+                 order_by: Optional[str] = None, table: str = FINDINGS_TABLE):
+        """
+        Initialize the query.
+
+        Args:
+            columns: Columns to select (None for all columns)
+            impacts: Impact levels to include (None for any impact)
+            category: Term matched case-insensitively against title and content
+            published_after: Only include findings published on or after this date (YYYY-MM-DD)
+            published_before: Only include findings published on or before this date (YYYY-MM-DD)
+            audit_companies: Only include findings from these audit companies
+            updated_since: Only include rows updated at or after this time
+            order_by: Column to order the results by
+            table: Fully qualified findings table name
+        """
+        self.columns = tuple(columns) if columns else None
+        self.impacts = tuple(impacts) if impacts else None
+        self.category = category
+        self.published_after = published_after
+        self.published_before = published_before
+        self.audit_companies = tuple(audit_companies) if audit_companies else None
+        self.updated_since = updated_since
+        self.order_by = order_by
+        self.table = table
+
+        for column in (self.columns or ()) + ((order_by,) if order_by else ()):
+            if column not in ALL_COLUMNS:
+                raise ValueError(f"Unknown findings column: {column}")
+
+    def replace(self, **changes: Any) -> "FindingsQuery":
+        """
+        Create a copy of the query with some attributes changed.
+
+        Args:
+            **changes: Constructor arguments to override
+
+        Returns:
+            New FindingsQuery instance
+        """
+        return FindingsQuery(**{**vars(self), **changes})
+
+    def with_columns(self, *required: str) -> "FindingsQuery":
+        """
+        Create a copy of the query whose projection includes the given columns.
+
+        Args:
+            *required: Columns that must be selected
+
+        Returns:
+            New FindingsQuery instance (self if nothing is missing)
+        """
+        if self.columns is None:
+            return self
+        missing = tuple(column for column in required if column not in self.columns)
+        return self.replace(columns=self.columns + missing) if missing else self
+
+    @property
+    def filter_columns(self) -> Tuple[str, ...]:
+        """Columns read by the filters of the query, as needed by matches()."""
+        columns = []
+        if self.impacts:
+            columns.append("impact")
+        if self.category:
+            columns.extend(("title", "content"))
+        if self.published_after or self.published_before:
+            columns.append("publish_date")
+        if self.audit_companies:
+            columns.append("audit_company")
+        return tuple(columns)
+
+    def matches(self, row: Dict[str, Any]) -> bool:
+        """
+        Check a row against the filters of the query, as the database would.
+
+        The updated_since filter is not checked.
+
+        Args:
+            row: Finding dictionary with at least the filter_columns
+
+        Returns:
+            True if the row passes every filter
+        """
+        if self.impacts and row.get("impact") not in self.impacts:
+            return False
+        if self.category:
+            term = self.category.lower()
+            if term not in (row.get("title") or "").lower() and term not in (row.get("content") or "").lower():
+                return False
+        publish_date = row.get("publish_date")
+        if self.published_after and (publish_date is None or str(publish_date) < self.published_after):
+            return False
+        if self.published_before and (publish_date is None or str(publish_date) > self.published_before):
+            return False
+        if self.audit_companies and row.get("audit_company") not in self.audit_companies:
+            return False
+        return True
+
+    def build(self) -> Tuple[str, Tuple[Any, ...]]:
+        """
+        Render the query with %s placeholders.
+
+        Returns:
+            Tuple of SQL query string and its parameters
+        """
+        select_list = ", ".join(f"`{column}`" for column in self.columns) if self.columns else "*"
+        conditions: List[str] = []
+        params: List[Any] = []
+
+        if self.impacts:
+            conditions.append(f"impact IN ({', '.join('%s' for _ in self.impacts)})")
+            params.extend(self.impacts)
+        if self.category:
+            conditions.append(f"(LOWER(title) LIKE %s ESCAPE '{LIKE_ESCAPE}' "
+                              f"OR LOWER(content) LIKE %s ESCAPE '{LIKE_ESCAPE}')")
+            pattern = f"%{escape_like(self.category.lower())}%"
+            params.extend([pattern, pattern])
+        if self.published_after:
+            conditions.append("publish_date >= %s")
+            params.append(self.published_after)
+        if self.published_before:
+            conditions.append("publish_date <= %s")
+            params.append(self.published_before)
+        if self.audit_companies:
+            conditions.append(f"audit_company IN ({', '.join('%s' for _ in self.audit_companies)})")
+            params.extend(self.audit_companies)
+        if self.updated_since:
+            conditions.append("updated_time >= %s")
+            params.append(self.updated_since)
+
+        query = f"SELECT {select_list}\nFROM {self.table}"
+        if conditions:
+            query += "\nWHERE " + "\nAND ".join(conditions)
+        if self.order_by:
+            query += f"\nORDER BY `{self.order_by}`"
+        return query, tuple(params)
+
+
+def keyset_page_query(query: str, after_id: Optional[Any], limit: int,
+                      placeholder: str = "%s") -> Tuple[str, Tuple[Any, ...]]:
+    """
+    Wrap a query so that it returns one page of its rows ordered by id.
+
+    Pages continue after the last id seen (keyset pagination), so each page is
+    a short query that seeks on the primary key however deep the pull is.
+    The wrapped query must select the id column and should not apply its own
+    ORDER BY or LIMIT.
+
+    Args:
+        query: SQL query to paginate
+        after_id: Last id of the previous page (None for the first page)
+        limit: Maximum number of rows in the page
+        placeholder: Parameter placeholder of the database driver ('%s' or '?')
+
+    Returns:
+        Tuple of SQL query string and its parameters
+    """
+    inner = query.strip().rstrip(";")
+    page = f"SELECT * FROM (\n{inner}\n) AS keyset_page"
+    params: List[Any] = []
+    if after_id is not None:
+        page += f"\nWHERE keyset_page.`id` > {placeholder}"
+        params.append(after_id)
+    page += f"\nORDER BY keyset_page.`id`\nLIMIT {placeholder}"
+    params.append(limit)
+    return page, tuple(params)
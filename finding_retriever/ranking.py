@@ -0,0 +1,260 @@
+"""
+Relevance ranking module.
+Scores findings against a category description with vectorized BM25 or
+TF-IDF over sparse term matrices, so only the most relevant findings are
+sent to the checklist generator.
+"""
+
+import logging
+import re
+from pathlib import Path
+from typing import TYPE_CHECKING, List, Dict, Optional, Tuple
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+    from scipy import sparse
+
+logger = logging.getLogger(__name__)
+
+RANKING_METHODS = ("bm25", "tfidf")
+CHECKLIST_DIR = Path(__file__).parent.parent / "checklist"
+
+_TOKEN_RE = re.compile(r"[a-z][a-z0-9_]+")
+# Separates documents in the joined corpus; matched as a token of its own
+_SEPARATOR = "\x00"
+_CORPUS_TOKEN_RE = re.compile(r"[a-z][a-z0-9_]+|\x00")
+_STOP_WORDS = frozenset("""
+a an and are as at be been but by can could do does for from has have if in into is it its
+may not of on or should so such than that the their them then there these they this to was
+were when which while will with would check checks user users contract contracts
+""".split())
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """
+    Split text into lowercase word tokens without stop words.
+
+    Args:
+        text: Text to tokenize
+
+    Returns:
+        List of tokens
+    """
+    if not isinstance(text, str):
+        return []
+    return [token for token in _TOKEN_RE.findall(text.lower()) if token not in _STOP_WORDS]
+
+
+def category_description(category: str, checklist_dir: Optional[Path] = None) -> str:
+    """
+    Build the text describing a category from its checklist files.
+
+    Args:
+        category: Category name
+        checklist_dir: Directory holding <category>/introduction.md and
+            <category>/preset_checklist.md (default: checklist/)
+
+    Returns:
+        Introduction and preset checklist text, or the category name if
+        neither file exists
+    """
+    category_dir = Path(checklist_dir or CHECKLIST_DIR) / category
+    parts = [category]
+    for name in ("introduction.md", "preset_checklist.md"):
+        path = category_dir / name
+        if path.exists():
+            parts.append(path.read_text())
+    if len(parts) == 1:
+        logger.warning(f"No checklist files found in {category_dir}; ranking by the category name only")
+    return "\n".join(parts)
+
+
+def _term_matrix(texts: List[str]) -> Tuple["sparse.csr_matrix", Dict[str, int]]:
+    """
+    Build a sparse document-term count matrix.
+
+    The whole corpus is tokenized with one regular expression pass and
+    terms are mapped to columns with a hash-based factorization, so no
+    Python code runs per token.
+
+    Args:
+        texts: Documents
+
+    Returns:
+        Tuple of (CSR matrix of term counts, vocabulary mapping term to column)
+    """
+    import numpy as np
+    import pandas as pd
+    from scipy import sparse
+
+    corpus = _SEPARATOR.join(text.replace(_SEPARATOR, " ") for text in texts).lower()
+    tokens = _CORPUS_TOKEN_RE.findall(corpus)
+    codes, terms = pd.factorize(np.asarray(tokens, dtype=object))
+    terms = terms.tolist()
+
+    excluded = np.fromiter((term in _STOP_WORDS or term == _SEPARATOR for term in terms),
+                           dtype=bool, count=len(terms))
+    is_separator = np.zeros(len(codes), dtype=bool)
+    if _SEPARATOR in terms:
+        is_separator = codes == terms.index(_SEPARATOR)
+    rows = np.cumsum(is_separator)
+    keep = ~excluded[codes]
+
+    # Duplicate (row, column) entries are summed into term counts
+    matrix = sparse.csr_matrix(
+        (np.ones(int(keep.sum()), dtype=np.float64), (rows[keep], codes[keep])),
+        shape=(len(texts), len(terms)),
+    )
+    matrix.sum_duplicates()
+    return matrix, {term: column for column, term in enumerate(terms)}
+
+
+def _query_vector(query_tokens: List[str], vocabulary: Dict[str, int]) -> "np.ndarray":
+    """Term counts of the query over the document vocabulary."""
+    import numpy as np
+
+    vector = np.zeros(len(vocabulary), dtype=np.float64)
+    for token in query_tokens:
+        column = vocabulary.get(token)
+        if column is not None:
+            vector[column] += 1.0
+    return vector
+
+
+def _tfidf_weights(matrix: "sparse.csr_matrix") -> Tuple["sparse.csr_matrix", "np.ndarray"]:
+    """
+    Turn a term count matrix into L2-normalized sublinear TF-IDF rows.
+
+    Args:
+        matrix: Document-term count matrix from _term_matrix()
+
+    Returns:
+        Tuple of (weighted matrix, idf of each term)
+    """
+    import numpy as np
+    from scipy import sparse
+
+    count = matrix.shape[0]
+    document_frequency = np.bincount(matrix.indices, minlength=matrix.shape[1])
+    idf = np.log((1 + count) / (1 + document_frequency)) + 1
+
+    matrix = matrix.copy()
+    matrix.data = 1 + np.log(matrix.data)
+    matrix = matrix.multiply(idf).tocsr()
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    return sparse.diags(1.0 / norms) @ matrix, idf
+
+
+def bm25_scores(texts: List[str], query: str, k1: float = 1.2, b: float = 0.75) -> "np.ndarray":
+    """
+    Score documents against a query with Okapi BM25.
+
+    Args:
+        texts: Documents
+        query: Query text; repeated terms weigh more
+        k1: Term frequency saturation
+        b: Document length normalization
+
+    Returns:
+        Array of scores, one per document
+    """
+    import numpy as np
+
+    matrix, vocabulary = _term_matrix(texts)
+    count = matrix.shape[0]
+    document_frequency = np.bincount(matrix.indices, minlength=matrix.shape[1])
+    idf = np.log1p((count - document_frequency + 0.5) / (document_frequency + 0.5))
+
+    lengths = np.asarray(matrix.sum(axis=1)).ravel()
+    average_length = lengths.mean() or 1.0
+    # Saturate the stored term counts in place, row by row via the CSR index pointer
+    row_norms = np.repeat(k1 * (1 - b + b * lengths / average_length), np.diff(matrix.indptr))
+    matrix.data = matrix.data * (k1 + 1) / (matrix.data + row_norms)
+
+    return matrix @ (idf * _query_vector(tokenize(query), vocabulary))
+
+
+def tfidf_scores(texts: List[str], query: str) -> "np.ndarray":
+    """
+    Score documents against a query by cosine similarity of sublinear TF-IDF vectors.
+
+    Args:
+        texts: Documents
+        query: Query text
+
+    Returns:
+        Array of scores between 0 and 1, one per document
+    """
+    import numpy as np
+
+    matrix, vocabulary = _term_matrix(texts)
+    matrix, idf = _tfidf_weights(matrix)
+
+    query_vector = _query_vector(tokenize(query), vocabulary)
+    query_vector[query_vector > 0] = 1 + np.log(query_vector[query_vector > 0])
+    query_vector *= idf
+    query_norm = np.linalg.norm(query_vector) or 1.0
+    return (matrix @ query_vector) / query_norm
+
+
+def tfidf_matrix(texts: List[str]) -> "sparse.csr_matrix":
+    """
+    Compute L2-normalized sublinear TF-IDF vectors sharing one vocabulary.
+
+    The dot product of two rows is the cosine similarity of their documents.
+
+    Args:
+        texts: Documents
+
+    Returns:
+        CSR matrix with one row per document
+    """
+    matrix, _ = _term_matrix(texts)
+    return _tfidf_weights(matrix)[0]
+
+
+def rank_findings(df: "pd.DataFrame", description: str, top_k: Optional[int] = None,
+                  min_score: Optional[float] = None, method: str = "bm25") -> "pd.DataFrame":
+    """
+    Rank findings by relevance to a category description.
+
+    Titles count twice, since they summarize the issue.
+
+    Args:
+        df: Findings with title and content columns
+        description: Text describing the category, e.g. from category_description()
+        top_k: Keep at most this many findings (None for no limit)
+        min_score: Drop findings scoring below this (None for no threshold)
+        method: 'bm25' or 'tfidf'
+
+    Returns:
+        Findings sorted by a new 'relevance_score' column, highest first
+    """
+    import pandas as pd
+
+    if method not in RANKING_METHODS:
+        raise ValueError(f"Unsupported ranking method '{method}', expected one of {RANKING_METHODS}")
+    if df.empty:
+        return df.assign(relevance_score=pd.Series(dtype=float))
+
+    titles = df["title"].fillna("").astype(str) if "title" in df.columns else pd.Series("", index=df.index)
+    contents = df["content"].fillna("").astype(str) if "content" in df.columns else pd.Series("", index=df.index)
+    texts = (titles + "\n" + titles + "\n" + contents).tolist()
+
+    if method == "bm25":
+        scores = bm25_scores(texts, description)
+    else:
+        scores = tfidf_scores(texts, description)
+
+    result = df.assign(relevance_score=scores)
+    result = result.sort_values("relevance_score", ascending=False, kind="stable")
+    if min_score is not None:
+        result = result[result["relevance_score"] >= min_score]
+    if top_k is not None:
+        result = result.head(top_k)
+    logger.info(f"Ranked {len(df)} findings with {method}, keeping {len(result)} "
+                f"(scores {result['relevance_score'].min() if len(result) else 0:.2f}"
+                f"-{result['relevance_score'].max() if len(result) else 0:.2f})")
+    return result.reset_index(drop=True)
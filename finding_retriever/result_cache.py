@@ -0,0 +1,181 @@
+"""
+Query result cache module.
+Caches retriever query results on disk, keyed by a hash of the query and its parameters.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+from pathlib import Path
+
+from common.disk_cache import DiskCache
+from finding_retriever.store import FINDINGS_DIR, ParquetFindingsWriter
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = FINDINGS_DIR / ".cache" / "queries"
+DEFAULT_TTL = 24 * 60 * 60
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+def normalize_query(query: str) -> str:
+    """
+    Normalize SQL text so formatting differences map to the same cache key.
+
+    Args:
+        query: SQL query string
+
+    Returns:
+        Query with collapsed whitespace and no trailing semicolon
+    """
+    return re.sub(r"\s+", " ", query).strip().rstrip(";").strip()
+
+
+class CacheEntryWriter(ParquetFindingsWriter):
+    """Writes a query result into the cache, committing its metadata on close."""
+
+    def __init__(self, cache: "QueryResultCache", key: str, query: str, params: Tuple[Any, ...]):
+        super().__init__(cache._data_path(key))
+        # Concurrent writers of the same query each write their own file and
+        # the last one to close wins
+        self.tmp_file = cache._tmp_path(self.output_file)
+        self.cache = cache
+        self.key = key
+        self.query = query
+        self.params = params
+
+    def close(self) -> None:
+        super().close()
+        self.cache._commit(self.key, self.query, self.params, self.rows_written)
+
+
+class QueryResultCache(DiskCache):
+    """Disk-backed cache of query results with a TTL and an LRU size limit."""
+
+    label = "Query cache"
+
+    def __init__(self, cache_dir: Optional[Path] = None, ttl: float = DEFAULT_TTL,
+                 max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        Initialize the cache.
+
+        Args:
+            cache_dir: Directory holding the cache entries (default: findings/.cache/queries)
+            ttl: Seconds after which an entry expires (default: 24 hours)
+            max_bytes: Total size of cached results kept on disk (default: 512 MB)
+        """
+        super().__init__(cache_dir or DEFAULT_CACHE_DIR, ttl, max_bytes)
+
+    def key(self, query: str, params: Tuple[Any, ...] = ()) -> str:
+        """
+        Compute the cache key of a query.
+
+        Args:
+            query: SQL query string
+            params: Parameters bound to the query placeholders
+
+        Returns:
+            Hex digest identifying the query and its parameters
+        """
+        payload = json.dumps([normalize_query(query), list(params)], default=str, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _data_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.parquet"
+
+    def _meta_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.meta.json"
+
+    def _usage_path(self, key: str) -> Path:
+        return self._meta_path(key)
+
+    def _entry_paths(self, key: str) -> List[Path]:
+        return [self._meta_path(key), self._data_path(key)]
+
+    def _keys(self) -> List[str]:
+        return [path.name[:-len(".meta.json")] for path in self.cache_dir.glob("*.meta.json")]
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a fresh cache entry and mark it as recently used.
+
+        Args:
+            key: Cache key from key()
+
+        Returns:
+            Entry metadata, or None on a miss or an expired entry
+        """
+        meta_path = self._meta_path(key)
+        try:
+            with open(meta_path, "r") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            self._count("misses")
+            return None
+
+        data_path = self._data_path(key)
+        if time.time() - meta["created"] > self.ttl or (meta["rows"] and not data_path.exists()):
+            self._remove(key)
+            self._count("misses")
+            return None
+
+        self._touch(key)
+        self._count("hits")
+        return meta
+
+    def iter_batches(self, key: str, batch_size: int) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Stream a cached result in batches without loading it all into memory.
+
+        Args:
+            key: Cache key of an entry returned by get()
+            batch_size: Number of rows per batch
+
+        Yields:
+            Lists of finding dictionaries
+        """
+        data_path = self._data_path(key)
+        if not data_path.exists():
+            return
+        import pyarrow.parquet as pq
+
+        parquet_file = pq.ParquetFile(data_path)
+        for record_batch in parquet_file.iter_batches(batch_size=batch_size):
+            yield record_batch.to_pylist()
+
+    def writer(self, key: str, query: str, params: Tuple[Any, ...] = ()) -> CacheEntryWriter:
+        """
+        Create a writer that stores a query result under a key.
+
+        The entry only becomes visible once the writer is closed; aborting the
+        writer leaves the cache untouched.
+
+        Args:
+            key: Cache key from key()
+            query: SQL query string, recorded for inspection
+            params: Query parameters, recorded for inspection
+
+        Returns:
+            CacheEntryWriter instance
+        """
+        return CacheEntryWriter(self, key, query, params)
+
+    def _commit(self, key: str, query: str, params: Tuple[Any, ...], rows: int) -> None:
+        if not rows and self._data_path(key).exists():
+            # Drop the data of an earlier, non-empty result for the same query
+            self._data_path(key).unlink()
+        meta = {
+            "created": time.time(),
+            "query": normalize_query(query),
+            "params": [str(param) for param in params],
+            "rows": rows,
+        }
+        tmp_path = self._tmp_path(self._meta_path(key))
+        with open(tmp_path, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self._meta_path(key))
+        self._written(key)
@@ -3,22 +3,82 @@ Solodit TiDB Finding Retriever module.
 Handles retrieving Solodit findings from TiDB database.
 """
 
+import copy
 import logging
-import mysql.connector
-import pandas as pd
-import os
-from typing import List, Dict, Any, Optional
-from pathlib import Path
-from mysql.connector import MySQLConnection
-from mysql.connector.cursor import MySQLCursor
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import TYPE_CHECKING, List, Dict, Any, Iterator, Optional, Tuple
+
+from finding_retriever.base import DEFAULT_BATCH_SIZE, FindingRetriever
+from finding_retriever.instrumentation import estimate_row_bytes, span
+from finding_retriever.query_builder import FindingsQuery, keyset_page_query
+from finding_retriever.result_cache import QueryResultCache
+from finding_retriever.store import DEFAULT_FORMAT, WatermarkStore, findings_path, upsert_findings, write_findings
+
+if TYPE_CHECKING:
+    from mysql.connector import MySQLConnection
+    from mysql.connector.cursor import MySQLCursor
+    from mysql.connector.pooling import MySQLConnectionPool
 
 logger = logging.getLogger(__name__)
 
-class SoloditTiDBRetriever:
+# Server error codes worth retrying: lock contention, TiDB write conflicts and
+# server/region unavailability. Numeric so that mysql.connector is only
+# imported once a connection is needed
+TRANSIENT_ERROR_CODES = {
+    1205,  # ER_LOCK_WAIT_TIMEOUT
+    1213,  # ER_LOCK_DEADLOCK
+    2006,  # CR_SERVER_GONE_ERROR
+    2013,  # CR_SERVER_LOST
+    2003,  # CR_CONN_HOST_ERROR
+    9001,  # TiDB: PD server timeout
+    9002,  # TiDB: TiKV server timeout
+    9005,  # TiDB: region unavailable
+    9007,  # TiDB: write conflict
+}
+
+def is_transient_error(err: Exception) -> bool:
+    """
+    Check whether a database error is likely to succeed when retried.
+    
+    Args:
+        err: Exception raised while talking to TiDB
+        
+    Returns:
+        True if the operation should be retried
+    """
+    if isinstance(err, ConnectionError):
+        return True
+    if "mysql.connector" not in sys.modules:
+        # No MySQL error can have been raised before the driver was loaded
+        return False
+    from mysql.connector import errorcode
+    from mysql.connector.errors import Error, InterfaceError, OperationalError, PoolError
+
+    if isinstance(err, PoolError):
+        return True
+    if isinstance(err, Error):
+        if err.errno in TRANSIENT_ERROR_CODES:
+            return True
+        # Connection-level failures are retried, but a query that hit its
+        # execution limit would only hit it again
+        return (isinstance(err, (InterfaceError, OperationalError))
+                and err.errno not in (errorcode.ER_QUERY_TIMEOUT, errorcode.ER_QUERY_INTERRUPTED))
+    return False
+
+class SoloditTiDBRetriever(FindingRetriever):
     """Component to retrieve Solodit findings from TiDB database."""
     
+    source_name = "TiDB"
+    
     def __init__(self, host: str, user: str, password: str, port: int = 4000, 
-                 database: str = "shield_alds_stg"):
+                 database: str = "shield_alds_stg", pool_size: int = 5,
+                 pool_timeout: float = 30.0, query_timeout: Optional[float] = None,
+                 base_query: Optional[FindingsQuery] = None,
+                 cache: Optional[QueryResultCache] = None, refresh_cache: bool = False):
         """
         Initialize the Solodit TiDB retriever with connection parameters.
         
@@ -28,6 +88,13 @@ class SoloditTiDBRetriever:
             password: Database password
             port: TiDB server port (default: 4000)
             database: Database name (default: shield_alds_stg)
+            pool_size: Maximum number of pooled connections (default: 5, at most 32)
+            pool_timeout: Seconds to wait for a free pooled connection (default: 30)
+            query_timeout: Default server-side execution limit per query in seconds (None for no limit)
+            base_query: Column projection and filters applied to every generated query
+                (default: pipeline columns of HIGH-impact findings)
+            cache: Query result cache consulted before connecting to TiDB (None to disable)
+            refresh_cache: Ignore cached results and overwrite them with fresh ones
         """
         self.connection_params = {
             "host": host,
@@ -36,23 +103,101 @@ class SoloditTiDBRetriever:
             "port": port,
             "database": database
         }
+        self.pool_size = pool_size
+        self.pool_timeout = pool_timeout
+        self.query_timeout = query_timeout
+        self._pool: Optional["MySQLConnectionPool"] = None
+        self._pool_lock = threading.Lock()
+        # Retriever whose connection pool this one borrows from, see derive()
+        self._pool_owner: Optional["SoloditTiDBRetriever"] = None
+        self.base_query = base_query or FindingsQuery()
+        self.cache = cache
+        self.refresh_cache = refresh_cache
+        
+    def derive(self, **options) -> "SoloditTiDBRetriever":
+        """
+        Create a retriever with other query options that shares this retriever's connection pool.
+        
+        Closing the derived retriever leaves the shared pool open.
+        
+        Args:
+            **options: Attributes to override, e.g. base_query, query_timeout or refresh_cache
+            
+        Returns:
+            Retriever borrowing connections from this one
+        """
+        unknown = [name for name in options if not hasattr(self, name) or name.startswith("_")]
+        if unknown:
+            raise ValueError(f"Unknown retriever options: {', '.join(unknown)}")
+        retriever = copy.copy(self)
+        retriever._pool_owner = self._pool_owner or self
+        for name, value in options.items():
+            setattr(retriever, name, value)
+        return retriever
         
-    def connect_to_database(self) -> Optional[MySQLConnection]:
+    def _get_pool(self) -> "MySQLConnectionPool":
         """
-        Establish a connection to the TiDB database.
+        Get the connection pool, creating it on first use.
+        
+        Returns:
+            MySQL connection pool
+        """
+        if self._pool_owner is not None:
+            return self._pool_owner._get_pool()
+        from mysql.connector.pooling import MySQLConnectionPool
+        
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = MySQLConnectionPool(
+                    pool_name=f"solodit_tidb_{id(self)}",
+                    pool_size=self.pool_size,
+                    pool_reset_session=True,
+                    **self.connection_params,
+                )
+                logger.info(f"Successfully connected to TiDB at {self.connection_params['host']} "
+                            f"(pool size {self.pool_size})")
+            return self._pool
+        
+    def connect_to_database(self) -> Optional["MySQLConnection"]:
+        """
+        Borrow a connection to the TiDB database from the connection pool.
+        
+        Closing the returned connection hands it back to the pool. When every
+        pooled connection is in use this waits up to pool_timeout seconds.
         
         Returns:
             MySQL connection object or None if connection fails
         """
-        try:
-            connection = mysql.connector.connect(**self.connection_params)
-            logger.info(f"Successfully connected to TiDB at {self.connection_params['host']}")
-            return connection
-        except mysql.connector.Error as err:
-            logger.error(f"Failed to connect to TiDB: {err}")
-            return None
+        import mysql.connector
+        from mysql.connector.errors import PoolError
+        
+        deadline = time.monotonic() + self.pool_timeout
+        delay = 0.05
+        while True:
+            try:
+                with span("tidb.connect"):
+                    return self._get_pool().get_connection()
+            except PoolError as err:
+                if time.monotonic() >= deadline:
+                    logger.error(f"Failed to get a TiDB connection from the pool: {err}")
+                    return None
+                time.sleep(delay)
+                delay = min(delay * 2, 1.0)
+            except mysql.connector.Error as err:
+                logger.error(f"Failed to connect to TiDB: {err}")
+                return None
     
-    def _get_query_by_category(self, category: str) -> str:
+    def close(self) -> None:
+        """Close every idle pooled connection. Connections still borrowed are closed when returned."""
+        if self._pool_owner is not None:
+            return
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool._remove_connections()
+                self._pool = None
+                logger.debug("Database connection pool closed")
+    
+    def _get_query_by_category(self, category: str) -> Tuple[str, Tuple[Any, ...]]:
         """
         Generate a SQL query based on the specified category.
         
@@ -60,91 +205,412 @@ class SoloditTiDBRetriever:
             category: The search category (e.g., 'vesting', 'reentrancy', etc.)
             
         Returns:
-            SQL query string with the category search term
+            Tuple of SQL query string and the parameters bound to it,
+            including the category search term
         """
-        return f"""
-        SELECT *
-        FROM shield_alds_stg.t_solodit_findings
-        WHERE impact IN ('HIGH')
-        AND (LOWER(title) LIKE '%{category}%' OR LOWER(content) LIKE '%{category}%');
+        return self.base_query.replace(category=category).build()
+    
+    def _get_sync_query(self, category: str, updated_since: Optional[str]) -> Tuple[str, Tuple[Any, ...]]:
+        """
+        Generate the incremental sync query for a category.
+        
+        Unlike the regular category query this also returns rows that have
+        become invalid, so they can be dropped from the local store. A delta
+        query (with updated_since) is not filtered by category, impact, date
+        or audit company either, so rows that stopped matching them are
+        returned too; sync_findings checks the filters client-side.
+        
+        Args:
+            category: The search category (e.g., 'vesting', 'reentrancy', etc.)
+            updated_since: Only return rows updated at or after this time (None for all)
+            
+        Returns:
+            Tuple of SQL query string and its parameters
         """
+        # >= rather than > so rows written in the same second as the last
+        # sync are not missed; the upsert makes re-fetching them harmless
+        query = self.base_query.with_columns("updated_time", "is_valid")
+        if updated_since is None:
+            return query.replace(category=category, order_by="updated_time").build()
+        filters = self.base_query.replace(category=category)
+        query = query.with_columns(*filters.filter_columns).replace(
+            impacts=None, category=None, published_after=None, published_before=None,
+            audit_companies=None, updated_since=updated_since, order_by="updated_time",
+        )
+        return query.build()
     
-    def _execute_query(self, cursor: MySQLCursor, query: str) -> List[Dict[str, Any]]:
+    def _execute_query(self, cursor: "MySQLCursor", query: str, params: Tuple[Any, ...] = (),
+                       batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[List[Dict[str, Any]]]:
         """
-        Execute a query and return the results.
+        Execute a query and yield the results in batches.
+        
+        Rows are pulled from the server with fetchmany, so at most one batch
+        is held in memory when the cursor is unbuffered.
         
         Args:
             cursor: MySQL cursor object
             query: SQL query to execute
+            params: Parameters bound to the query placeholders
+            batch_size: Number of rows fetched per round trip
             
-        Returns:
-            List of dictionaries containing the query results
+        Yields:
+            Lists of dictionaries containing the query results
         """
-        cursor.execute(query)
+        with span("tidb.execute"):
+            cursor.execute(query, params or None)
         columns = [col[0] for col in cursor.description]
-        results = []
         
-        for row in cursor.fetchall():
-            results.append(dict(zip(columns, row)))
-            
-        return results
-            
-    def retrieve_findings(self, category: Optional[str], custom_query: Optional[str] = None):
+        while True:
+            with span("tidb.fetch") as fetch_span:
+                rows = cursor.fetchmany(batch_size)
+                batch = [dict(zip(columns, row)) for row in rows]
+                if fetch_span.enabled:
+                    fetch_span.add(rows=len(rows), bytes=estimate_row_bytes(rows))
+            if not batch:
+                break
+            yield batch
+    
+    def _stream_query(self, query: str, params: Tuple[Any, ...] = (),
+                      batch_size: int = DEFAULT_BATCH_SIZE,
+                      timeout: Optional[float] = None) -> Iterator[List[Dict[str, Any]]]:
         """
-        Retrieve Solodit findings from TiDB using either a custom query or
-        a query generated based on the provided category.
+        Borrow a connection and stream the results of a query in batches.
+        
+        Uses an unbuffered cursor so the result set is streamed from the
+        server instead of being materialized on the client. Queries with
+        parameters are executed as server-side prepared statements.
         
         Args:
-            category: Search category for findings
-            custom_query: Optional custom SQL query that overrides the category-based query
+            query: SQL query to execute
+            params: Parameters bound to the query placeholders
+            batch_size: Number of rows fetched per round trip
+            timeout: Server-side execution limit in seconds (default: self.query_timeout)
             
-        Returns:
-            List of finding dictionaries
+        Yields:
+            Lists of dictionaries containing the query results
         """
         connection = self.connect_to_database()
         if not connection:
-            logger.error("Cannot retrieve findings: database connection failed")
-            return []
+            raise ConnectionError("Cannot retrieve findings: database connection failed")
+        import mysql.connector
         
+        timeout = timeout if timeout is not None else self.query_timeout
+        logger.debug(f"Query: {query}")
+        cursor = None
         try:
-            # Determine which query to use
-            if custom_query:
-                query = custom_query
-                logger.info("Using custom SQL query")
+            if timeout:
+                # Pooled sessions are reset when returned, so this only affects this query
+                settings_cursor = connection.cursor()
+                settings_cursor.execute(f"SET SESSION max_execution_time = {int(timeout * 1000)}")
+                settings_cursor.close()
+            # Parameterized queries run as server-side prepared statements;
+            # both cursor kinds are unbuffered
+            cursor = connection.cursor(prepared=True) if params else connection.cursor(buffered=False)
+            yield from self._execute_query(cursor, query, params, batch_size)
+        finally:
+            if cursor is not None:
+                try:
+                    cursor.close()
+                except mysql.connector.Error as err:
+                    # An abandoned stream leaves unread rows behind; drop the
+                    # socket so the pool reconnects instead of reusing it
+                    logger.debug(f"Error closing cursor: {err}")
+                    connection.disconnect()
+            try:
+                connection.close()
+            except mysql.connector.Error as err:
+                logger.debug(f"Error returning connection to the pool: {err}")
+            logger.debug("Database connection returned to the pool")
+    
+    def _cached_stream(self, query: str, params: Tuple[Any, ...] = (),
+                       batch_size: int = DEFAULT_BATCH_SIZE,
+                       timeout: Optional[float] = None) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Stream the results of a query from the result cache when possible,
+        otherwise from TiDB while storing them in the cache.
+        
+        A cache hit never opens a database connection. A result is only
+        cached once it has been streamed completely.
+        
+        Args:
+            query: SQL query to execute
+            params: Parameters bound to the query placeholders
+            batch_size: Number of rows fetched per round trip
+            timeout: Server-side execution limit in seconds (default: self.query_timeout)
+            
+        Yields:
+            Lists of dictionaries containing the query results
+        """
+        if self.cache is None:
+            yield from self._stream_query(query, params, batch_size, timeout)
+            return
+        
+        key = self.cache.key(query, params)
+        if not self.refresh_cache:
+            entry = self.cache.get(key)
+            if entry is not None:
+                logger.info(f"Using {entry['rows']} cached results for query {key[:12]}")
+                batches = self.cache.iter_batches(key, batch_size)
+                while True:
+                    with span("cache.read") as read_span:
+                        batch = next(batches, None)
+                        read_span.add(rows=len(batch) if batch else 0)
+                    if batch is None:
+                        return
+                    yield batch
+        
+        writer = self.cache.writer(key, query, params)
+        completed = False
+        try:
+            for batch in self._stream_query(query, params, batch_size, timeout):
+                writer.write_batch(batch)
+                yield batch
+            completed = True
+        finally:
+            if completed:
+                writer.close()
             else:
-                query = self._get_query_by_category(category)
-                logger.info(f"Using category-based query for '{category}'")
+                writer.abort()
+    
+    def iter_table_batches(self, updated_since: Optional[str] = None,
+                           batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Stream every row of the findings table, e.g. to build a local mirror.
+        
+        Invalid rows are included so that mirrors can drop them.
+        
+        Args:
+            updated_since: Only return rows updated at or after this time (None for all)
+            batch_size: Number of rows fetched per round trip
             
-            logger.debug(f"Query: {query}")
+        Yields:
+            Lists of finding dictionaries, ordered by updated_time
+        """
+        query = self.base_query.with_columns("title", "content", "impact", "updated_time", "is_valid").replace(
+            impacts=None, category=None, published_after=None, published_before=None,
+            audit_companies=None, updated_since=updated_since, order_by="updated_time",
+        )
+        yield from self._stream_query(*query.build(), batch_size=batch_size)
+    
+    def iter_candidate_batches(self, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Stream every finding passing the non-category filters of the base
+        query (by default all HIGH-impact findings), so categories can be
+        matched client-side.
+        
+        Args:
+            batch_size: Number of rows fetched per round trip
             
-            # Create a cursor and execute the query
-            cursor = connection.cursor()
-            findings = self._execute_query(cursor, query)
+        Yields:
+            Lists of finding dictionaries, each at most batch_size long
+        """
+        query = self.base_query.with_columns("title", "content")
+        logger.info("Scanning candidate findings for multi-category matching")
+        yield from self._cached_stream(*query.build(), batch_size=batch_size)
+    
+    def iter_finding_batches(self, category: Optional[str], custom_query: Optional[str] = None,
+                             batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Lazily retrieve Solodit findings from TiDB in batches.
+        
+        Args:
+            category: Search category for findings
+            custom_query: Optional custom SQL query that overrides the category-based query
+            batch_size: Number of rows fetched per round trip
             
-            logger.info(f"Retrieved {len(findings)} Solodit findings from TiDB")
+        Yields:
+            Lists of finding dictionaries, each at most batch_size long
+        """
+        # Determine which query to use
+        if custom_query:
+            query, params = custom_query, ()
+            logger.info("Using custom SQL query")
+        else:
+            query, params = self._get_query_by_category(category)
+            logger.info(f"Using category-based query for '{category}'")
+        
+        yield from self._cached_stream(query, params, batch_size=batch_size)
+    
+    def iter_keyset_page(self, custom_query: str, after_id: Optional[Any], limit: int,
+                         batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Lazily retrieve one page of a custom query's results ordered by id from TiDB.
+        
+        Pages bypass the query result cache; they are stored as dataset chunks instead.
+        
+        Args:
+            custom_query: SQL query selecting the id column
+            after_id: Last id of the previous page (None for the first page)
+            limit: Maximum number of rows in the page
+            batch_size: Number of rows fetched per round trip
             
-            if findings:
-                # Create findings directory if it doesn't exist
-                findings_dir = Path(__file__).parent.parent / "findings"
-                os.makedirs(findings_dir, exist_ok=True)
-                
-                # Save raw findings as CSV for reference
-                output_filename = f"solodit_tidb_{category if not custom_query else 'custom'}.csv"
-                output_file = findings_dir / output_filename
-                
-                # Convert findings to DataFrame and save
-                df = pd.DataFrame(findings)
-                df.to_csv(output_file, index=False)
-                logger.info(f"Raw findings saved to {output_file}")
-            else:
-                logger.warning("No findings to save to CSV")
+        Yields:
+            Lists of finding dictionaries, each at most batch_size long
+        """
+        yield from self._stream_query(*keyset_page_query(custom_query, after_id, limit), batch_size=batch_size)
+    
+    def is_transient_error(self, err: Exception) -> bool:
+        """Check whether a TiDB error is worth retrying."""
+        return is_transient_error(err)
+    
+    def dataset_max_age(self) -> Optional[float]:
+        """Reuse completed pulls for as long as the query cache would serve the same query."""
+        if self.cache is None or self.refresh_cache:
+            return None
+        return self.cache.ttl
+    
+    def sync_findings(self, category: str, batch_size: int = DEFAULT_BATCH_SIZE,
+                      output_format: str = DEFAULT_FORMAT,
+                      watermarks: Optional[WatermarkStore] = None) -> Dict[str, int]:
+        """
+        Incrementally sync the local findings file of a category with TiDB.
+        
+        Only rows whose updated_time is at or after the stored high-water mark
+        are fetched. They are upserted into the local file by id, and rows
+        that have become invalid or no longer match the category and filters
+        (e.g. a downgraded impact or edited text) are removed. Without a local
+        file or watermark this falls back to a full pull, which replaces the
+        local file and is streamed to it batch by batch.
+        
+        Args:
+            category: Search category for findings
+            batch_size: Number of rows fetched per round trip
+            output_format: Local store file format ('parquet', 'arrow' or 'csv')
+            watermarks: Watermark store (default: findings/.watermarks.json)
             
+        Returns:
+            Dictionary with 'upserted', 'removed' and 'total' row counts
+        """
+        watermarks = watermarks or WatermarkStore()
+        output_file = findings_path(category, output_format)
+        watermark_key = f"{category}.{output_format}"
+        updated_since = watermarks.get(watermark_key) if output_file.exists() else None
+        
+        if updated_since:
+            logger.info(f"Syncing '{category}' findings updated since {updated_since}")
+        else:
+            logger.info(f"No watermark for '{category}', performing a full sync")
+        
+        query, params = self._get_sync_query(category, updated_since)
+        filters = self.base_query.replace(category=category)
+        stored_columns = self.base_query.with_columns("updated_time", "is_valid").columns
+        high_water = updated_since
+        
+        def tracked_batches():
+            nonlocal high_water
+            for batch in self._stream_query(query, params, batch_size):
+                for row in batch:
+                    if row.get("updated_time") is not None:
+                        updated_time = str(row["updated_time"])
+                        if high_water is None or updated_time > high_water:
+                            high_water = updated_time
+                if updated_since is not None:
+                    # Rows that stopped matching are passed on as invalid, so the upsert drops them
+                    batch = [
+                        ({column: row.get(column) for column in stored_columns} if stored_columns else row)
+                        if filters.matches(row) else {"id": row["id"], "is_valid": 0}
+                        for row in batch
+                    ]
+                yield batch
+        
+        try:
+            if updated_since is None:
+                stats = write_findings(output_file, tracked_batches(), output_format)
+            else:
+                stats = upsert_findings(output_file, tracked_batches(), output_format)
         except Exception as e:
-            logger.error(f"Error retrieving Solodit findings from TiDB: {e}")
-            return []
-        finally:
-            if 'cursor' in locals():
-                cursor.close()
-            if connection:
-                connection.close()
-                logger.debug("Database connection closed")
\ No newline at end of file
+            logger.error(f"Error syncing Solodit findings from TiDB: {e}")
+            raise
+        
+        if high_water is not None:
+            watermarks.set(watermark_key, high_water)
+        logger.info(f"Synced '{category}': {stats['upserted']} upserted, {stats['removed']} removed, "
+                    f"{stats['total']} stored in {output_file}")
+        return stats
+    
+    def _retrieve_with_retry(self, name: str, query: str, params: Tuple[Any, ...], batch_size: int,
+                             output_format: str, timeout: Optional[float], retries: int,
+                             backoff: float) -> int:
+        """
+        Stream one query to its findings file, retrying transient failures
+        with exponential backoff and jitter.
+        
+        Args:
+            name: Category name or custom query name used for the output file
+            query: SQL query to execute
+            params: Parameters bound to the query placeholders
+            batch_size: Number of rows fetched and written per batch
+            output_format: Output file format ('parquet', 'arrow' or 'csv')
+            timeout: Server-side execution limit in seconds
+            retries: Number of retries after the first attempt
+            backoff: Base delay in seconds before the first retry
+            
+        Returns:
+            Number of findings retrieved
+        """
+        attempt = 0
+        while True:
+            try:
+                writer = self._write_findings(
+                    name, self._cached_stream(query, params, batch_size, timeout), output_format
+                )
+                return writer.rows_written
+            except Exception as e:
+                if attempt >= retries or not is_transient_error(e):
+                    raise
+                delay = backoff * (2 ** attempt) * (0.5 + random.random())
+                attempt += 1
+                logger.warning(f"Transient error retrieving '{name}' ({e}); "
+                               f"retry {attempt}/{retries} in {delay:.1f}s")
+                time.sleep(delay)
+    
+    def retrieve_parallel(self, categories: Optional[List[str]] = None,
+                          custom_queries: Optional[Dict[str, str]] = None,
+                          max_workers: Optional[int] = None, batch_size: int = DEFAULT_BATCH_SIZE,
+                          output_format: str = DEFAULT_FORMAT, timeout: Optional[float] = None,
+                          retries: int = 3, backoff: float = 1.0) -> Dict[str, int]:
+        """
+        Run several category and custom queries concurrently, each on its own
+        pooled connection, writing one findings file per query.
+        
+        Args:
+            categories: Search categories to retrieve
+            custom_queries: Custom SQL queries keyed by the name used for their output file
+            max_workers: Number of queries run at once (default: pool size)
+            batch_size: Number of rows fetched and written per batch
+            output_format: Output file format ('parquet', 'arrow' or 'csv')
+            timeout: Server-side execution limit per query in seconds (default: self.query_timeout)
+            retries: Number of retries for transient errors (default: 3)
+            backoff: Base delay in seconds before the first retry (default: 1.0)
+            
+        Returns:
+            Dictionary mapping each category or query name to its number of findings
+            (0 for queries that failed)
+        """
+        jobs: Dict[str, Tuple[str, Tuple[Any, ...]]] = {}
+        for category in categories or []:
+            jobs[category] = self._get_query_by_category(category)
+        for name, query in (custom_queries or {}).items():
+            jobs[name] = (query, ())
+        if not jobs:
+            return {}
+        
+        max_workers = min(max_workers or self.pool_size, self.pool_size, len(jobs))
+        logger.info(f"Running {len(jobs)} queries on {max_workers} workers")
+        
+        results: Dict[str, int] = {}
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tidb") as executor:
+            futures = {
+                executor.submit(self._retrieve_with_retry, name, query, params, batch_size,
+                                output_format, timeout, retries, backoff): name
+                for name, (query, params) in jobs.items()
+            }
+            for future in as_completed(futures):
+                name = futures[future]
+                try:
+                    results[name] = future.result()
+                    logger.info(f"Retrieved {results[name]} findings for '{name}'")
+                except Exception as e:
+                    logger.error(f"Error retrieving findings for '{name}': {e}")
+                    results[name] = 0
+        return results
@@ -0,0 +1,564 @@
+"""
+Findings store module.
+Handles writing retrieved findings to local files incrementally and
+keeping them in sync with the source table.
+"""
+
+import json
+import logging
+import os
+from typing import TYPE_CHECKING, List, Dict, Any, Iterable, Iterator, Optional, Tuple
+from pathlib import Path
+
+from finding_retriever.instrumentation import span
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+FINDINGS_DIR = Path(__file__).parent.parent / "findings"
+
+# parquet: zstd-compressed columnar file, the default store
+# arrow: uncompressed Arrow IPC file that can be memory-mapped without copying
+# csv: plain text export
+SUPPORTED_FORMATS = ("parquet", "arrow", "csv")
+DEFAULT_FORMAT = "parquet"
+
+# Timestamp columns, stored as strings once rows have been merged
+TIMESTAMP_COLUMNS = ("created_time", "updated_time", "publish_date")
+
+
+def findings_path(name: str, fmt: str = DEFAULT_FORMAT, findings_dir: Optional[Path] = None) -> Path:
+    """
+    Build the path of the local findings file for a category or query name.
+
+    Args:
+        name: Category name (or 'custom' for custom queries)
+        fmt: File format, one of SUPPORTED_FORMATS
+        findings_dir: Directory holding the findings files (default: FINDINGS_DIR)
+
+    Returns:
+        Path to the findings file
+    """
+    if fmt not in SUPPORTED_FORMATS:
+        raise ValueError(f"Unsupported findings format: {fmt}")
+    return Path(findings_dir or FINDINGS_DIR) / f"solodit_tidb_{name}.{fmt}"
+
+
+class FindingsWriter:
+    """Base class for writers that append findings to a file batch by batch."""
+
+    def __init__(self, output_file: Path):
+        """
+        Initialize the writer.
+
+        The target is written to a temporary file first and moved into place
+        on close, so an interrupted run never leaves a truncated findings file.
+
+        Args:
+            output_file: Path of the file to write
+        """
+        self.output_file = Path(output_file)
+        self.tmp_file = self.output_file.with_name(self.output_file.name + ".tmp")
+        self.rows_written = 0
+        os.makedirs(self.output_file.parent, exist_ok=True)
+
+    def write_batch(self, batch: List[Dict[str, Any]]) -> None:
+        """
+        Append a batch of findings to the output file.
+
+        Args:
+            batch: List of finding dictionaries
+        """
+        if not batch:
+            return
+        import pandas as pd
+
+        with span("store.build_frame") as frame_span:
+            df = pd.DataFrame(batch)
+            frame_span.add(rows=len(batch))
+        with span("store.write") as write_span:
+            self._write_frame(df)
+            write_span.add(rows=len(batch))
+        self.rows_written += len(batch)
+
+    def _write_frame(self, df: "pd.DataFrame") -> None:
+        raise NotImplementedError
+
+    def _finalize(self) -> None:
+        """Flush and release any open file handles."""
+
+    def close(self) -> None:
+        """Finish writing and move the file into place if anything was written."""
+        with span("store.close") as close_span:
+            self._finalize()
+            if close_span.enabled and self.tmp_file.exists():
+                close_span.add(rows=self.rows_written, bytes=self.tmp_file.stat().st_size)
+        if self.rows_written:
+            os.replace(self.tmp_file, self.output_file)
+        elif self.tmp_file.exists():
+            self.tmp_file.unlink()
+
+    def abort(self) -> None:
+        """Discard a partially written file."""
+        self._finalize()
+        if self.tmp_file.exists():
+            self.tmp_file.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+
+class CSVFindingsWriter(FindingsWriter):
+    """Writes findings to a CSV file, appending one batch at a time."""
+
+    def __init__(self, output_file: Path):
+        super().__init__(output_file)
+        self.columns: Optional[List[str]] = None
+
+    def _write_frame(self, df: "pd.DataFrame") -> None:
+        if self.columns is None:
+            self.columns = list(df.columns)
+            df.to_csv(self.tmp_file, index=False, mode="w")
+        else:
+            df.reindex(columns=self.columns).to_csv(self.tmp_file, index=False, mode="a", header=False)
+
+
+class _ArrowFindingsWriter(FindingsWriter):
+    """Base class for writers of Arrow-based formats, one record batch per batch."""
+
+    def __init__(self, output_file: Path):
+        super().__init__(output_file)
+        self._writer = None
+        self._schema = None
+
+    def _open(self, schema):
+        raise NotImplementedError
+
+    def _write_frame(self, df: "pd.DataFrame") -> None:
+        import pyarrow as pa
+
+        if self._writer is None:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            # Columns that are entirely NULL in the first batch would otherwise
+            # be typed as null and reject values in later batches
+            self._schema = pa.schema([
+                field.with_type(pa.string()) if pa.types.is_null(field.type) else field
+                for field in table.schema
+            ]).remove_metadata()
+            self._writer = self._open(self._schema)
+        df = df.reindex(columns=self._schema.names)
+        table = pa.Table.from_pandas(df, schema=self._schema, preserve_index=False, safe=False)
+        self._writer.write_table(table)
+
+    def _finalize(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+class ParquetFindingsWriter(_ArrowFindingsWriter):
+    """Writes findings to a compressed Parquet file, one row group per batch."""
+
+    def __init__(self, output_file: Path, compression: str = "zstd"):
+        super().__init__(output_file)
+        self.compression = compression
+
+    def _open(self, schema):
+        import pyarrow.parquet as pq
+
+        return pq.ParquetWriter(self.tmp_file, schema, compression=self.compression)
+
+
+class ArrowFindingsWriter(_ArrowFindingsWriter):
+    """Writes findings to an uncompressed Arrow IPC file that can be memory-mapped."""
+
+    def _open(self, schema):
+        import pyarrow as pa
+
+        return pa.ipc.new_file(str(self.tmp_file), schema)
+
+
+def open_writer(output_file: Path, fmt: str = DEFAULT_FORMAT) -> FindingsWriter:
+    """
+    Create a findings writer for the given format.
+
+    Args:
+        output_file: Path of the file to write
+        fmt: File format, one of SUPPORTED_FORMATS
+
+    Returns:
+        FindingsWriter instance
+    """
+    if fmt == "csv":
+        return CSVFindingsWriter(output_file)
+    if fmt == "parquet":
+        return ParquetFindingsWriter(output_file)
+    if fmt == "arrow":
+        return ArrowFindingsWriter(output_file)
+    raise ValueError(f"Unsupported findings format: {fmt}")
+
+
+def read_findings_table(path: Path, fmt: str = DEFAULT_FORMAT, columns: Optional[List[str]] = None):
+    """
+    Read a columnar findings file as a pyarrow Table, loading only the requested columns.
+
+    Arrow IPC files are memory-mapped, so the returned table references the
+    file without copying it; Parquet files only decode the selected columns.
+
+    Args:
+        path: Path of the findings file
+        fmt: File format, 'parquet' or 'arrow'
+        columns: Columns to load (None for all)
+
+    Returns:
+        pyarrow Table with the stored findings
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if fmt == "arrow":
+        table = pa.ipc.open_file(pa.memory_map(str(path), "r")).read_all()
+        if columns is not None:
+            table = table.select([column for column in columns if column in table.column_names])
+        return table
+    if fmt == "parquet":
+        if columns is not None:
+            available = pq.read_schema(path).names
+            columns = [column for column in columns if column in available]
+        return pq.read_table(path, columns=columns, memory_map=True)
+    raise ValueError(f"Unsupported columnar findings format: {fmt}")
+
+
+def read_findings(path: Path, fmt: str = DEFAULT_FORMAT, columns: Optional[List[str]] = None) -> "pd.DataFrame":
+    """
+    Read a local findings file into a DataFrame.
+
+    Args:
+        path: Path of the findings file
+        fmt: File format, one of SUPPORTED_FORMATS
+        columns: Columns to load (None for all); missing columns are skipped
+
+    Returns:
+        DataFrame with the stored findings (empty if the file does not exist)
+    """
+    import pandas as pd
+
+    path = Path(path)
+    if not path.exists():
+        return pd.DataFrame()
+    if fmt not in SUPPORTED_FORMATS:
+        raise ValueError(f"Unsupported findings format: {fmt}")
+    with span("store.read", format=fmt) as read_span:
+        if fmt == "csv":
+            wanted = set(columns) if columns is not None else None
+            df = pd.read_csv(path, usecols=(lambda column: column in wanted) if wanted is not None else None)
+        else:
+            df = read_findings_table(path, fmt, columns).to_pandas()
+        if read_span.enabled:
+            read_span.add(rows=len(df), bytes=path.stat().st_size)
+    return df
+
+
+def latest_findings_path(name: str, findings_dir: Optional[Path] = None) -> Optional[Tuple[Path, str]]:
+    """
+    Find the most recently written findings file of a category in any format.
+
+    Files of other formats are left behind when the format of a category
+    changes between runs, so the newest one is the current one.
+
+    Args:
+        name: Category name (or 'custom' for custom queries)
+        findings_dir: Directory holding the findings files (default: FINDINGS_DIR)
+
+    Returns:
+        Tuple of the file path and its format, or None if no file exists
+    """
+    latest = None
+    latest_mtime = None
+    for fmt in SUPPORTED_FORMATS:
+        path = findings_path(name, fmt, findings_dir)
+        try:
+            mtime = path.stat().st_mtime
+        except FileNotFoundError:
+            continue
+        if latest_mtime is None or mtime > latest_mtime:
+            latest, latest_mtime = (path, fmt), mtime
+    return latest
+
+
+def load_findings(name: str, columns: Optional[List[str]] = None,
+                  findings_dir: Optional[Path] = None) -> "pd.DataFrame":
+    """
+    Load the stored findings of a category from the most recently written
+    findings file, unless a partitioned dataset of the same name was completed
+    after it.
+
+    Args:
+        name: Category name (or 'custom' for custom queries)
+        columns: Columns to load (None for all)
+        findings_dir: Directory holding the findings files (default: FINDINGS_DIR)
+
+    Returns:
+        DataFrame with the stored findings
+    """
+    from finding_retriever.dataset import stored_dataset
+
+    dataset = stored_dataset(name, findings_dir)
+    if dataset is not None:
+        logger.info(f"Loading findings from the {len(dataset.partitions())} partitions of {dataset.path}")
+        return dataset.to_pandas(columns)
+    latest = latest_findings_path(name, findings_dir)
+    if latest is not None:
+        path, fmt = latest
+        logger.info(f"Loading findings from {path}")
+        return read_findings(path, fmt, columns)
+    raise FileNotFoundError(f"No stored findings for '{name}' in {findings_dir or FINDINGS_DIR}")
+
+
+def iter_findings(path: Path, fmt: str = DEFAULT_FORMAT,
+                  batch_size: int = 10000) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Read a local findings file batch by batch.
+
+    Args:
+        path: Path of the findings file
+        fmt: File format, one of SUPPORTED_FORMATS
+        batch_size: Maximum number of rows per batch
+
+    Yields:
+        Lists of finding dictionaries (nothing if the file does not exist)
+    """
+    path = Path(path)
+    if not path.exists():
+        return
+    if fmt == "csv":
+        import pandas as pd
+
+        for chunk in pd.read_csv(path, chunksize=batch_size):
+            yield chunk.astype(object).where(chunk.notna(), None).to_dict(orient="records")
+    elif fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        for record_batch in pq.ParquetFile(path, memory_map=True).iter_batches(batch_size=batch_size):
+            yield record_batch.to_pylist()
+    elif fmt == "arrow":
+        import pyarrow as pa
+
+        reader = pa.ipc.open_file(pa.memory_map(str(path), "r"))
+        for index in range(reader.num_record_batches):
+            record_batch = reader.get_batch(index)
+            for offset in range(0, record_batch.num_rows, batch_size):
+                yield record_batch.slice(offset, batch_size).to_pylist()
+    else:
+        raise ValueError(f"Unsupported findings format: {fmt}")
+
+
+def _is_invalid(row: Dict[str, Any]) -> bool:
+    return row.get("is_valid") is not None and int(row["is_valid"]) == 0
+
+
+def _stored_row(row: Dict[str, Any], columns: List[str]) -> Dict[str, Any]:
+    """Project a row onto the stored columns, with timestamps as strings."""
+    # Stored timestamps come back as strings from CSV, so every merged row
+    # keeps them in the same representation
+    stored = {column: row.get(column) for column in columns}
+    for column in TIMESTAMP_COLUMNS:
+        if stored.get(column) is not None:
+            stored[column] = str(stored[column])
+    return stored
+
+
+def write_findings(path: Path, batches: Iterable[List[Dict[str, Any]]],
+                   fmt: str = DEFAULT_FORMAT) -> Dict[str, int]:
+    """
+    Replace a local findings file with a full pull, streaming it batch by batch.
+
+    Rows whose is_valid flag is 0 are skipped.
+
+    Args:
+        path: Path of the findings file
+        batches: Batches of finding dictionaries
+        fmt: File format, one of SUPPORTED_FORMATS
+
+    Returns:
+        Dictionary with 'upserted', 'removed' and 'total' row counts
+    """
+    with open_writer(path, fmt) as writer:
+        for batch in batches:
+            writer.write_batch([row for row in batch if not _is_invalid(row)])
+    if not writer.rows_written and Path(path).exists():
+        Path(path).unlink()
+    return {"upserted": writer.rows_written, "removed": 0, "total": writer.rows_written}
+
+
+def upsert_findings(path: Path, batches: Iterable[List[Dict[str, Any]]], fmt: str = DEFAULT_FORMAT,
+                    key: str = "id", batch_size: int = 10000) -> Dict[str, int]:
+    """
+    Merge changed findings into a local findings file.
+
+    Rows are matched on the key column; a newer version of a row replaces the
+    stored one, and rows whose is_valid flag has dropped to 0 are removed.
+
+    The changed rows are spooled to a temporary Parquet file while only their
+    keys are kept in memory. The stored file is then copied batch by batch
+    without the replaced and removed rows, followed by the latest version of
+    each changed row, so neither side is ever loaded as a whole.
+
+    Args:
+        path: Path of the findings file
+        batches: Batches of changed finding dictionaries
+        fmt: File format, one of SUPPORTED_FORMATS
+        key: Column that uniquely identifies a finding
+        batch_size: Number of stored rows merged per batch
+
+    Returns:
+        Dictionary with 'upserted', 'removed' and 'total' row counts
+    """
+    path = Path(path)
+    if not path.exists():
+        return write_findings(path, batches, fmt)
+
+    # Position of the latest valid version of each changed key in the spool,
+    # or None if its latest version is invalid
+    latest: Dict[Any, Optional[int]] = {}
+    spool = ParquetFindingsWriter(path.with_name(path.name + ".delta"))
+    try:
+        with spool:
+            for batch in batches:
+                valid = []
+                for row in batch:
+                    if _is_invalid(row):
+                        latest[row[key]] = None
+                    else:
+                        latest[row[key]] = spool.rows_written + len(valid)
+                        valid.append(row)
+                spool.write_batch(valid)
+        if not latest:
+            return {"upserted": 0, "removed": 0, "total": _count_rows(path, fmt)}
+
+        columns = _stored_columns(path, fmt)
+        if spool.rows_written:
+            import pyarrow.parquet as pq
+
+            columns += [column for column in pq.read_schema(spool.output_file).names if column not in columns]
+
+        removed = 0
+        with open_writer(path, fmt) as writer:
+            for batch in iter_findings(path, fmt, batch_size):
+                kept = []
+                for row in batch:
+                    if row[key] not in latest:
+                        kept.append(_stored_row(row, columns))
+                    elif latest[row[key]] is None:
+                        removed += 1
+                writer.write_batch(kept)
+            position = 0
+            for batch in iter_findings(spool.output_file, "parquet", batch_size):
+                writer.write_batch([
+                    _stored_row(row, columns)
+                    for offset, row in enumerate(batch, position)
+                    if latest[row[key]] == offset
+                ])
+                position += len(batch)
+    finally:
+        if spool.output_file.exists():
+            spool.output_file.unlink()
+
+    if not writer.rows_written and path.exists():
+        path.unlink()
+    upserted = sum(1 for offset in latest.values() if offset is not None)
+    return {"upserted": upserted, "removed": removed, "total": writer.rows_written}
+
+
+def _stored_columns(path: Path, fmt: str) -> List[str]:
+    """List the columns of a local findings file."""
+    if fmt == "csv":
+        import pandas as pd
+
+        return list(pd.read_csv(path, nrows=0).columns)
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        return list(pq.read_schema(path).names)
+    import pyarrow as pa
+
+    return list(pa.ipc.open_file(pa.memory_map(str(path), "r")).schema.names)
+
+
+def _count_rows(path: Path, fmt: str) -> int:
+    """Count the rows of a local findings file without loading them."""
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        return pq.ParquetFile(path).metadata.num_rows
+    return sum(len(batch) for batch in iter_findings(path, fmt))
+
+
+class WatermarkStore:
+    """Persists the per-category high-water mark of synced updated_time values."""
+
+    def __init__(self, path: Optional[Path] = None):
+        """
+        Initialize the watermark store.
+
+        Args:
+            path: JSON file holding the watermarks (default: findings/.watermarks.json)
+        """
+        self.path = Path(path or FINDINGS_DIR / ".watermarks.json")
+
+    def _load(self) -> Dict[str, str]:
+        if not self.path.exists():
+            return {}
+        with open(self.path, "r") as f:
+            return json.load(f)
+
+    def _save(self, watermarks: Dict[str, str]) -> None:
+        os.makedirs(self.path.parent, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(watermarks, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def get(self, name: str) -> Optional[str]:
+        """
+        Get the watermark for a category.
+
+        Args:
+            name: Category name
+
+        Returns:
+            Last synced updated_time as a string, or None if never synced
+        """
+        return self._load().get(name)
+
+    def set(self, name: str, value: str) -> None:
+        """
+        Record the watermark for a category.
+
+        Args:
+            name: Category name
+            value: Highest updated_time seen for the category
+        """
+        watermarks = self._load()
+        watermarks[name] = value
+        self._save(watermarks)
+
+    def clear(self, name: str) -> None:
+        """
+        Forget the watermark for a category so the next sync is a full pull.
+
+        Args:
+            name: Category name
+        """
+        watermarks = self._load()
+        if watermarks.pop(name, None) is not None:
+            self._save(watermarks)
@@ -2,16 +2,39 @@
 """
 Main entry point for the Checklist Generator system.
 Controls the overall workflow of retrieving findings and generating checklists.
+
+Commands:
+    retrieve   Retrieve findings from TiDB or the local index, then deduplicate and rank them
+    generate   Update checklists from previously retrieved findings
+    run        Retrieve findings and update checklists
+    index      Rebuild or refresh the local full-text findings index
+    serve      Serve retrieve, generate and run jobs over a local HTTP API
+
+Without a command, the options of all commands are accepted as before.
+Heavy dependencies (pandas, mysql.connector, the OpenAI client) are only
+imported by the code paths that use them, so --help starts quickly.
 """
 
 import os
+import sys
 import argparse
 import logging
 from pathlib import Path
-from dotenv import load_dotenv
+from typing import TYPE_CHECKING
+
+from finding_retriever import instrumentation
+from finding_retriever.instrumentation import span
+from finding_retriever.dataset import DEFAULT_CHUNK_ROWS, DEFAULT_PARTITION_BY, PARTITION_COLUMNS, stored_dataset
+from finding_retriever.query_builder import ALL_COLUMNS, DEFAULT_COLUMNS, FindingsQuery
+from finding_retriever.ranking import RANKING_METHODS
+from finding_retriever.store import DEFAULT_FORMAT, SUPPORTED_FORMATS, findings_path, load_findings, open_writer
+from checklist_generator.coverage import DEFAULT_COVERAGE_THRESHOLD
+from checklist_generator.normalizer import DEFAULT_MAX_CODE_LINES
 
-from finding_retriever.solodit_tidb import SoloditTiDBRetriever
-# from checklist_generator.generator import ChecklistGenerator
+if TYPE_CHECKING:
+    from finding_retriever.result_cache import QueryResultCache
+    from finding_retriever.solodit_tidb import SoloditTiDBRetriever
+    from checklist_generator.llm_client import AsyncLLMClient
 
 # Configure logging
 logging.basicConfig(
@@ -23,68 +46,642 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+COMMANDS = ('retrieve', 'generate', 'run', 'index', 'serve')
+
 def load_environment():
     """Load environment variables from .env file"""
     env_path = Path(__file__).parent / '.env'
     if env_path.exists():
+        from dotenv import load_dotenv
+        
         logger.info(f"Loading environment variables from {env_path}")
         load_dotenv(dotenv_path=env_path)
         logger.debug("Environment variables loaded successfully")
     else:
         logger.warning(f".env file not found at {env_path}")
 
-def parse_arguments():
-    """Parse command line arguments."""
-    parser = argparse.ArgumentParser(description='Generate checklists from findings.')
-    parser.add_argument('--source', choices=['solodit_tidb'], default='solodit_tidb',
+def parse_categories(value: str) -> list:
+    """
+    Parse the --categories argument.
+    
+    Args:
+        value: Comma-separated categories, or the path of a file listing one
+            category per line (blank lines and lines starting with '#' are skipped)
+            
+    Returns:
+        List of category names, without repeats
+    """
+    path = Path(value)
+    if path.is_file():
+        lines = path.read_text().splitlines()
+    else:
+        lines = value.split(',')
+    categories = [line.strip() for line in lines if line.strip() and not line.strip().startswith('#')]
+    categories = list(dict.fromkeys(categories))
+    if not categories:
+        raise argparse.ArgumentTypeError(f"No categories found in '{value}'")
+    return categories
+
+def add_target_arguments(parser):
+    """Add the category selection and findings format arguments."""
+    category_group = parser.add_mutually_exclusive_group()
+    category_group.add_argument('--category', help='Category of findings to retrieve')
+    category_group.add_argument('--categories', type=parse_categories, default=None,
+                                help='Comma-separated categories, or a file with one category per line, '
+                                     'retrieved together in a single pass')
+    add_output_arguments(parser)
+
+def add_output_arguments(parser):
+    """Add the findings format and incremental update arguments."""
+    parser.add_argument('--format', choices=list(SUPPORTED_FORMATS), default=DEFAULT_FORMAT,
+                        help='Output format for retrieved findings: zstd-compressed parquet, '
+                             'memory-mappable arrow, or csv export (default: parquet)')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Only fetch findings updated since the last sync and merge them into the local file, '
+                             'and only send findings not yet incorporated into the generated checklist')
+
+def add_query_arguments(parser):
+    """Add the column projection and filter arguments of TiDB queries."""
+    parser.add_argument('--batch-size', type=int, default=1000,
+                        help='Number of findings fetched and written per batch (default: 1000)')
+    parser.add_argument('--columns', type=lambda value: [c.strip() for c in value.split(',') if c.strip()],
+                        default=list(DEFAULT_COLUMNS),
+                        help=f"Comma-separated columns to retrieve, or 'all' (default: {','.join(DEFAULT_COLUMNS)})")
+    parser.add_argument('--impact', action='append', default=None,
+                        help='Impact level to include; repeat for several (default: HIGH)')
+    parser.add_argument('--published-after', default=None,
+                        help='Only retrieve findings published on or after this date (YYYY-MM-DD)')
+    parser.add_argument('--published-before', default=None,
+                        help='Only retrieve findings published on or before this date (YYYY-MM-DD)')
+    parser.add_argument('--audit-company', action='append', default=None,
+                        help='Only retrieve findings from this audit company; repeat for several')
+
+def add_retrieval_arguments(parser):
+    """Add the arguments controlling where and how findings are retrieved."""
+    parser.add_argument('--source', choices=['solodit_tidb', 'local_index'], default='solodit_tidb',
                         help='Source for retrieving findings (default: solodit_tidb)')
-    parser.add_argument('--category', help='Category of findings to retrieve', required=True)
     # Note: this feature is not well implemented yet
     parser.add_argument('--query', type=str, default=None,
                         help='Optional custom SQL query to override the default query')
+    parser.add_argument('--partition-by', choices=list(PARTITION_COLUMNS) + ['none'], default=DEFAULT_PARTITION_BY,
+                        help='With --query and the parquet format, page through the results by id and store them '
+                             'as findings/solodit_tidb_custom/ partitioned by publish month or audit company, '
+                             f'or in a single partition with none (default: {DEFAULT_PARTITION_BY})')
+    parser.add_argument('--chunk-rows', type=int, default=DEFAULT_CHUNK_ROWS,
+                        help=f'Rows per page and chunk file of --query results (default: {DEFAULT_CHUNK_ROWS})')
+    parser.add_argument('--restart', action='store_true',
+                        help='Discard an interrupted --query pull instead of resuming it after its last chunk, '
+                             'and do not reuse a completed pull of the same query')
+    parser.add_argument('--parallel', type=int, default=None, metavar='WORKERS',
+                        help='Run --categories as concurrent TiDB queries on this many pooled connections '
+                             'instead of a single table pass')
+    parser.add_argument('--query-timeout', type=float, default=None,
+                        help='Server-side execution limit per TiDB query in seconds')
+    add_query_arguments(parser)
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Always query TiDB and do not store results in the local query cache')
+    parser.add_argument('--refresh', action='store_true',
+                        help='Ignore cached query results and completed --query pulls and replace them with fresh ones')
+    parser.add_argument('--cache-ttl', type=float, default=24.0,
+                        help='Hours after which cached query results expire (default: 24)')
+    parser.add_argument('--cache-max-size', type=int, default=512,
+                        help='Maximum size of the query cache in MB (default: 512)')
+    parser.add_argument('--limit', type=int, default=None,
+                        help='Maximum number of findings to retrieve from the local index')
+
+def add_postprocess_arguments(parser):
+    """Add the deduplication and ranking arguments."""
+    parser.add_argument('--dedup', action='store_true',
+                        help='Collapse near-duplicate findings into solodit_tidb_<category>_dedup.<format>')
+    parser.add_argument('--dedup-threshold', type=float, default=0.8,
+                        help='Estimated Jaccard similarity at which findings are duplicates (default: 0.8)')
+    parser.add_argument('--rank', action='store_true',
+                        help='Rank findings by relevance to checklist/<category>/ and write '
+                             'solodit_tidb_<category>_ranked.<format> with a relevance_score column')
+    parser.add_argument('--rank-method', choices=list(RANKING_METHODS), default='bm25',
+                        help='Relevance scoring method (default: bm25)')
+    parser.add_argument('--top-k', type=int, default=None,
+                        help='Keep only the K most relevant findings (implies --rank)')
+    parser.add_argument('--min-score', type=float, default=None,
+                        help='Keep only findings with at least this relevance score (implies --rank)')
+
+def add_generation_arguments(parser):
+    """Add the arguments controlling checklist generation."""
+    parser.add_argument('--model', default='gpt-4',
+                        help='Chat model used to generate checklists (default: gpt-4)')
+    parser.add_argument('--context-window', type=int, default=8192,
+                        help='Context window of the model in tokens; findings are batched to fit it (default: 8192)')
+    parser.add_argument('--max-concurrency', type=int, default=4,
+                        help='Maximum number of requests in flight to the model (default: 4)')
+    parser.add_argument('--requests-per-minute', type=float, default=None,
+                        help='Rate limit of model requests per minute')
+    parser.add_argument('--tokens-per-minute', type=float, default=None,
+                        help='Rate limit of prompt and completion tokens per minute')
+    parser.add_argument('--llm-base-url', default=None,
+                        help='Base URL of an OpenAI-compatible API, e.g. a local stub server')
+    parser.add_argument('--skip-covered', action='store_true',
+                        help='Only send findings not covered by an existing checklist item, '
+                             'and write output/<category>_coverage.md')
+    parser.add_argument('--coverage-threshold', type=float, default=DEFAULT_COVERAGE_THRESHOLD,
+                        help='Similarity at which a checklist item covers a finding '
+                             f'(default: {DEFAULT_COVERAGE_THRESHOLD})')
+    parser.add_argument('--no-normalize', action='store_true',
+                        help='Send finding content to the model as retrieved, without stripping credit lines, '
+                             'links and repeated or long code blocks')
+    parser.add_argument('--max-code-lines', type=int, default=DEFAULT_MAX_CODE_LINES,
+                        help=f'Lines kept per code block when normalizing findings (default: {DEFAULT_MAX_CODE_LINES})')
+    parser.add_argument('--normalize-workers', type=int, default=None,
+                        help='Processes used to normalize findings (default: CPU count)')
+    parser.add_argument('--no-llm-cache', action='store_true',
+                        help='Always call the model and do not store its responses in the local response cache')
+    parser.add_argument('--llm-cache-ttl', type=float, default=30.0,
+                        help='Days after which cached model responses expire (default: 30)')
+    parser.add_argument('--llm-cache-max-size', type=int, default=256,
+                        help='Maximum size of the model response cache in MB (default: 256)')
+
+def add_profile_arguments(parser):
+    """Add the profiling arguments."""
+    parser.add_argument('--profile', action='store_true',
+                        help='Time every pipeline stage and print a summary table when done')
+    parser.add_argument('--profile-output', type=str, default=None,
+                        help='Also write the timed stages as a Chrome trace JSON file (implies --profile)')
+
+def add_serve_arguments(parser):
+    """Add the listening address and job queue arguments of the service."""
+    parser.add_argument('--host', default='127.0.0.1',
+                        help='Address the HTTP API listens on (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8765,
+                        help='Port the HTTP API listens on (default: 8765)')
+    parser.add_argument('--socket', default=None,
+                        help='Listen on this Unix socket instead of a TCP port')
+    parser.add_argument('--workers', type=int, default=4,
+                        help='Jobs run at once, each on its own pooled TiDB connection (default: 4)')
+    parser.add_argument('--queue-size', type=int, default=64,
+                        help='Jobs waiting for a worker before new ones are rejected (default: 64)')
+
+def build_legacy_parser() -> argparse.ArgumentParser:
+    """Build the parser used when no command is given, accepting the options of every command."""
+    parser = argparse.ArgumentParser(
+        description='Generate checklists from findings.',
+        epilog=f"Commands: {', '.join(COMMANDS)}. Run 'main.py <command> --help' for the options of one command.",
+    )
+    add_target_arguments(parser)
+    add_retrieval_arguments(parser)
+    add_postprocess_arguments(parser)
+    parser.add_argument('--rebuild-index', action='store_true',
+                        help='Rebuild the local full-text findings index from TiDB')
+    parser.add_argument('--refresh-index', action='store_true',
+                        help='Update the local full-text findings index with rows changed in TiDB')
+    parser.add_argument('--generate', action='store_true',
+                        help='Update the checklist of the category with the retrieved findings using ChatGPT')
+    add_generation_arguments(parser)
+    add_profile_arguments(parser)
+    parser.set_defaults(command=None)
+    return parser
+
+def build_command_parser() -> argparse.ArgumentParser:
+    """Build the parser of the retrieve, generate, run and index commands."""
+    parser = argparse.ArgumentParser(description='Generate checklists from findings.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    
+    retrieve_parser = subparsers.add_parser('retrieve', help='Retrieve, deduplicate and rank findings')
+    add_target_arguments(retrieve_parser)
+    add_retrieval_arguments(retrieve_parser)
+    add_postprocess_arguments(retrieve_parser)
+    add_profile_arguments(retrieve_parser)
+    retrieve_parser.set_defaults(generate=False, rebuild_index=False, refresh_index=False)
+    
+    generate_parser = subparsers.add_parser('generate', help='Update checklists from retrieved findings')
+    add_target_arguments(generate_parser)
+    add_postprocess_arguments(generate_parser)
+    add_generation_arguments(generate_parser)
+    add_profile_arguments(generate_parser)
+    generate_parser.set_defaults(generate=True, rebuild_index=False, refresh_index=False, columns=None)
+    
+    run_parser = subparsers.add_parser('run', help='Retrieve findings and update checklists')
+    add_target_arguments(run_parser)
+    add_retrieval_arguments(run_parser)
+    add_postprocess_arguments(run_parser)
+    add_generation_arguments(run_parser)
+    add_profile_arguments(run_parser)
+    run_parser.set_defaults(generate=True, rebuild_index=False, refresh_index=False)
     
-    args = parser.parse_args()
-    logger.debug(f"Parsed arguments: source={args.source}, category={args.category}")
+    index_parser = subparsers.add_parser('index', help='Maintain the local full-text findings index')
+    index_parser.add_argument('--rebuild', action='store_true',
+                              help='Rebuild the index from TiDB instead of updating it with changed rows')
+    add_query_arguments(index_parser)
+    add_profile_arguments(index_parser)
+    index_parser.set_defaults(category=None, categories=None, generate=False)
+    
+    serve_parser = subparsers.add_parser('serve', help='Serve retrieve, generate and run jobs over a local HTTP API',
+                                         description='Serve jobs over a local HTTP API. The options below are '
+                                                     'the defaults of every job; see service.py for the API.')
+    add_serve_arguments(serve_parser)
+    add_output_arguments(serve_parser)
+    add_retrieval_arguments(serve_parser)
+    add_postprocess_arguments(serve_parser)
+    add_generation_arguments(serve_parser)
+    add_profile_arguments(serve_parser)
+    serve_parser.set_defaults(category=None, categories=None, generate=False, rebuild_index=False,
+                              refresh_index=False)
+    return parser
+
+def parse_arguments(argv: list = None):
+    """
+    Parse command line arguments.
+    
+    Args:
+        argv: Arguments without the program name (default: sys.argv[1:])
+        
+    Returns:
+        Parsed arguments; 'command' is None when no command was given
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] in COMMANDS:
+        parser = build_command_parser()
+    else:
+        parser = build_legacy_parser()
+    args = parser.parse_args(argv)
+    
+    if args.command == 'index':
+        args.rebuild_index, args.refresh_index = args.rebuild, not args.rebuild
+    if args.columns == ['all']:
+        args.columns = None
+    elif args.columns and set(args.columns) - set(ALL_COLUMNS):
+        parser.error(f"Unknown columns: {', '.join(sorted(set(args.columns) - set(ALL_COLUMNS)))}")
+    if getattr(args, 'top_k', None) is not None or getattr(args, 'min_score', None) is not None:
+        args.rank = True
+    if args.profile_output:
+        args.profile = True
+    if args.command == 'serve' and args.query:
+        parser.error('--query is not supported by serve; run custom queries with the retrieve command')
+    if args.command != 'serve' and not (args.category or args.categories) \
+            and not (args.rebuild_index or args.refresh_index):
+        parser.error('--category or --categories is required unless only maintaining the local index')
+    logger.debug(f"Parsed arguments: command={args.command}, category={args.category}")
     return args
 
-def main():
-    # Load environment variables
-    load_environment()
+def build_base_query(args) -> FindingsQuery:
+    """Build the column projection and filters shared by all TiDB queries from the arguments."""
+    return FindingsQuery(
+        columns=args.columns,
+        impacts=[impact.upper() for impact in args.impact] if args.impact else ("HIGH",),
+        published_after=args.published_after,
+        published_before=args.published_before,
+        audit_companies=args.audit_company,
+    )
+
+def create_query_cache(args) -> "QueryResultCache":
+    """Create the query result cache from the arguments, or None if caching is disabled."""
+    if args.no_cache:
+        return None
+    from finding_retriever.result_cache import QueryResultCache
+    
+    return QueryResultCache(ttl=args.cache_ttl * 3600, max_bytes=args.cache_max_size * 1024 * 1024)
+
+def create_tidb_retriever(pool_size: int = 5, query_timeout: float = None,
+                          base_query: FindingsQuery = None, cache: "QueryResultCache" = None,
+                          refresh_cache: bool = False) -> "SoloditTiDBRetriever":
+    """Create a TiDB retriever from the connection settings in the environment."""
+    from finding_retriever.solodit_tidb import SoloditTiDBRetriever
+    
+    logger.info("Initializing TiDB retriever")
+    return SoloditTiDBRetriever(
+        host=os.getenv("TIDB_HOST"),
+        user=os.getenv("TIDB_USER"),
+        password=os.getenv("TIDB_PASSWORD"),
+        port=int(os.getenv("TIDB_PORT")),
+        database=os.getenv("TIDB_DATABASE"),
+        pool_size=pool_size,
+        query_timeout=query_timeout,
+        base_query=base_query,
+        cache=cache,
+        refresh_cache=refresh_cache,
+    )
+
+def deduplicate_category(category: str, output_format: str, threshold: float) -> int:
+    """
+    Write the near-duplicate-free findings of a category next to the retrieved ones.
+    
+    Returns:
+        Number of findings kept
+    """
+    from finding_retriever.dedup import deduplicate_batches, deduplicate_findings
+    
+    output_file = findings_path(f"{category}_dedup", output_format)
+    dataset = stored_dataset(category)
+    if dataset is not None:
+        # Stream the partitions twice instead of loading them
+        with open_writer(output_file, output_format) as writer:
+            for batch in deduplicate_batches(dataset.iter_batches, threshold=threshold):
+                writer.write_batch(batch)
+        logger.info(f"Deduplicated findings saved to {output_file}")
+        return writer.rows_written
+    
+    try:
+        findings = load_findings(category)
+    except FileNotFoundError:
+        return 0
+    if findings.empty:
+        return 0
+    deduplicated = deduplicate_findings(findings, threshold=threshold)
+    with open_writer(output_file, output_format) as writer:
+        writer.write_batch(deduplicated.to_dict(orient='records'))
+    logger.info(f"Deduplicated findings saved to {output_file}")
+    return len(deduplicated)
+
+def rank_category(category: str, findings_name: str, output_format: str, method: str,
+                  top_k: int = None, min_score: float = None) -> int:
+    """
+    Write the findings of a category ordered by relevance next to the retrieved ones.
+    
+    Returns:
+        Number of findings kept
+    """
+    from finding_retriever.ranking import category_description, rank_findings
+    
+    try:
+        findings = load_findings(findings_name)
+    except FileNotFoundError:
+        return 0
+    ranked = rank_findings(findings, category_description(category), top_k=top_k, min_score=min_score,
+                           method=method)
+    output_file = findings_path(f"{findings_name}_ranked", output_format)
+    with open_writer(output_file, output_format) as writer:
+        writer.write_batch(ranked.to_dict(orient='records'))
+    logger.info(f"Ranked findings saved to {output_file}")
+    return len(ranked)
+
+def postprocess_findings(category: str, findings_name: str, args) -> str:
+    """
+    Deduplicate and rank retrieved findings as requested by the arguments.
+    
+    Args:
+        category: Category the findings were retrieved for
+        findings_name: Name of the retrieved findings
+        args: Parsed command line arguments
+        
+    Returns:
+        Name of the findings to generate the checklist from
+    """
+    if args.dedup:
+        with span("postprocess.dedup", category=category) as dedup_span:
+            dedup_span.add(rows=deduplicate_category(findings_name, args.format, args.dedup_threshold))
+        findings_name = f"{findings_name}_dedup"
+    if args.rank:
+        with span("postprocess.rank", category=category) as rank_span:
+            rank_span.add(rows=rank_category(category, findings_name, args.format, args.rank_method,
+                                             top_k=args.top_k, min_score=args.min_score))
+        findings_name = f"{findings_name}_ranked"
+    return findings_name
+
+def retrieve_category(retriever, category: str, args) -> int:
+    """
+    Retrieve the findings of one category into the findings store.
+    
+    Args:
+        retriever: TiDB or local index retriever
+        category: Category of findings to retrieve
+        args: Parsed command line arguments
+        
+    Returns:
+        Number of findings retrieved
+    """
+    if args.query and args.format == 'parquet':
+        if args.incremental:
+            logger.warning("Incremental retrieval is ignored for custom queries")
+        return retriever.retrieve_dataset(args.query, batch_size=args.batch_size, chunk_rows=args.chunk_rows,
+                                          partition_by=None if args.partition_by == 'none' else args.partition_by,
+                                          restart=args.restart)
+    if args.source == 'solodit_tidb' and args.incremental and not args.query:
+        stats = retriever.sync_findings(category=category, batch_size=args.batch_size, output_format=args.format)
+        return stats['total']
+    if args.source == 'solodit_tidb' and args.incremental:
+        logger.warning("Incremental retrieval is ignored for custom queries")
+    return retriever.retrieve_findings(category=category, custom_query=args.query, batch_size=args.batch_size,
+                                       output_format=args.format)
+
+def create_llm_client(args) -> "AsyncLLMClient":
+    """Create the rate-limited LLM client shared by all checklist generators."""
+    from checklist_generator.llm_client import AsyncLLMClient, OpenAIBackend
+    
+    return AsyncLLMClient(
+        OpenAIBackend(api_key=os.getenv("OPENAI_API_KEY"), base_url=args.llm_base_url),
+        model=args.model,
+        max_concurrency=args.max_concurrency,
+        requests_per_minute=args.requests_per_minute,
+        tokens_per_minute=args.tokens_per_minute,
+    )
+
+def create_response_cache(args):
+    """Create the model response cache from the arguments, or None if caching is disabled."""
+    if args.no_llm_cache:
+        return None
+    from checklist_generator.response_cache import LLMResponseCache
+    
+    return LLMResponseCache(ttl=args.llm_cache_ttl * 24 * 3600, max_bytes=args.llm_cache_max_size * 1024 * 1024)
+
+def create_normalizer(args):
+    """Create the finding normalizer from the arguments, or None if normalization is disabled."""
+    if args.no_normalize:
+        return None
+    from checklist_generator.normalizer import FindingNormalizer, NormalizationCache
+    
+    return FindingNormalizer(max_code_lines=args.max_code_lines, processes=args.normalize_workers,
+                             cache=NormalizationCache(), model=args.model)
+
+async def generate_checklists(findings_names: dict, args, client: "AsyncLLMClient" = None,
+                              response_cache=None, normalizer=None, checklist_cache=None) -> dict:
+    """
+    Update the checklists of several categories concurrently and save them to output/.
+    
+    Args:
+        findings_names: Mapping of category to the name of its stored findings
+        args: Parsed command line arguments
+        client: LLM client shared with other callers and left open; without one, a client,
+            response cache and normalizer are created from the arguments and released when done
+        response_cache: Model response cache used with a shared client
+        normalizer: Finding normalizer used with a shared client
+        checklist_cache: Cache of parsed checklists (None to parse the checklist files every time)
+        
+    Returns:
+        Mapping of category to the number of findings sent to the model, or None if generation failed
+    """
+    from checklist_generator.generator import ChecklistGenerator
+    
+    owns_client = client is None
+    if owns_client:
+        client = create_llm_client(args)
+        response_cache = create_response_cache(args)
+        normalizer = create_normalizer(args)
+    
+    async def generate(category: str, findings_name: str):
+        logger.info(f"Generating checklist for category: {category}")
+        generator = ChecklistGenerator(category=category, context_window=args.context_window, client=client,
+                                       response_cache=response_cache,
+                                       coverage_threshold=args.coverage_threshold if args.skip_covered else None,
+                                       normalizer=normalizer, checklist_cache=checklist_cache)
+        try:
+            with span("generate", category=category) as generate_span:
+                processed = await generator.update_checklist_async(findings_name=findings_name,
+                                                                   incremental=args.incremental)
+                generate_span.add(rows=processed)
+            return processed
+        except Exception as e:
+            logger.error(f"Error generating checklist for '{category}': {e}")
+            return None
+    
+    import asyncio
+    
+    try:
+        results = await asyncio.gather(*(generate(category, name) for category, name in findings_names.items()))
+    finally:
+        if owns_client:
+            await client.close()
+            if normalizer:
+                normalizer.close()
+    if owns_client:
+        logger.info(f"LLM client: {client.stats['requests']} requests, {client.stats['retries']} retries, "
+                    f"{client.stats['tokens']} tokens")
+        if response_cache:
+            response_cache.log_stats()
+    return dict(zip(findings_names, results))
+
+def maintain_index(args) -> None:
+    """Rebuild or refresh the local findings index from TiDB."""
+    from finding_retriever.local_index import FindingsIndex
+    
+    index = FindingsIndex()
+    tidb_retriever = create_tidb_retriever(base_query=build_base_query(args))
+    with span("index", rebuild=args.rebuild_index):
+        if args.rebuild_index:
+            index.rebuild(tidb_retriever, batch_size=args.batch_size)
+        else:
+            index.refresh(tidb_retriever, batch_size=args.batch_size)
+
+def retrieve_findings(args) -> dict:
+    """
+    Retrieve, deduplicate and rank the findings of the requested categories.
+    
+    Args:
+        args: Parsed command line arguments
+        
+    Returns:
+        Mapping of each category with findings to the name of the findings to generate its checklist from
+    """
+    from finding_retriever.local_index import LocalIndexRetriever
     
-    # Parse command line arguments
-    args = parse_arguments()
     category = args.category
-    source = args.source
+    query_cache = create_query_cache(args) if args.source == 'solodit_tidb' else None
+    
+    if args.categories:
+        logger.info(f"Retrieving findings for categories: {', '.join(args.categories)}")
+        if args.query or args.incremental:
+            logger.warning("--query and incremental retrieval are ignored with --categories")
+        with span("retrieve", categories=len(args.categories)) as retrieve_span:
+            if args.source == 'solodit_tidb' and args.parallel:
+                retriever = create_tidb_retriever(pool_size=args.parallel, query_timeout=args.query_timeout,
+                                                  base_query=build_base_query(args), cache=query_cache,
+                                                  refresh_cache=args.refresh)
+                counts = retriever.retrieve_parallel(categories=args.categories, max_workers=args.parallel,
+                                                     batch_size=args.batch_size, output_format=args.format)
+                retriever.close()
+            else:
+                if args.source == 'solodit_tidb':
+                    retriever = create_tidb_retriever(query_timeout=args.query_timeout,
+                                                      base_query=build_base_query(args), cache=query_cache,
+                                                      refresh_cache=args.refresh)
+                else:
+                    retriever = LocalIndexRetriever()
+                counts = retriever.retrieve_categories(args.categories, batch_size=args.batch_size,
+                                                       output_format=args.format)
+            retrieve_span.add(rows=sum(counts.values()))
+        logger.info(f"Successfully retrieved {sum(counts.values())} findings across {len(counts)} categories")
+        findings_names = {name: postprocess_findings(name, name, args) for name, count in counts.items() if count}
+        if query_cache:
+            query_cache.log_stats()
+        return findings_names
     
     logger.info(f"Retrieving findings for category: {category}")
     
     # Fetch findings from different sources
-    findings = []
-    if args.source == 'solodit_tidb':            
-        logger.info("Initializing TiDB retriever")
-        retriever = SoloditTiDBRetriever(
-            host=os.getenv("TIDB_HOST"),
-            user=os.getenv("TIDB_USER"),
-            password=os.getenv("TIDB_PASSWORD"),
-            port=int(os.getenv("TIDB_PORT")),
-            database=os.getenv("TIDB_DATABASE"),
-        )
-        
-        # Retrieve findings
-        retriever.retrieve_findings(category=category, custom_query=args.query)
-        
-        if findings:
-            logger.info(f"Successfully retrieved {len(findings)} findings")
+    num_findings = 0
+    with span("retrieve", category=category) as retrieve_span:
+        if args.source == 'solodit_tidb':            
+            retriever = create_tidb_retriever(query_timeout=args.query_timeout, base_query=build_base_query(args),
+                                              cache=query_cache, refresh_cache=args.refresh)
+            num_findings = retrieve_category(retriever, category, args)
+        elif args.source == 'local_index':
+            logger.info("Initializing local index retriever")
+            retriever = LocalIndexRetriever(limit=args.limit)
+            num_findings = retrieve_category(retriever, category, args)
         else:
-            logger.warning("No findings were retrieved")
+            logger.error(f"Invalid source: {args.source}")
+        retrieve_span.add(rows=num_findings)
+    
+    findings_name = category if not args.query else 'custom'
+    findings_names = {}
+    if num_findings:
+        logger.info(f"Successfully retrieved {num_findings} findings")
+        findings_names[category] = postprocess_findings(category, findings_name, args)
+    else:
+        logger.warning("No findings were retrieved")
+    if query_cache:
+        query_cache.log_stats()
+    return findings_names
+
+def run_pipeline(args):
+    """Maintain the index, retrieve findings and generate checklists as requested by the arguments."""
+    if args.command == 'serve':
+        from service import serve
+        
+        serve(args)
+        return
+    
+    # Maintain the local findings index
+    if args.rebuild_index or args.refresh_index:
+        maintain_index(args)
+        if not (args.category or args.categories):
+            return
+    
+    if args.command == 'generate':
+        # Generate from the findings stored by an earlier retrieval
+        categories = args.categories or [args.category]
+        findings_names = {category: postprocess_findings(category, category, args) for category in categories}
     else:
-        logger.error(f"Invalid source: {args.source}")
+        findings_names = retrieve_findings(args)
     
     # Generate checklist based on the findings
-    # generator = ChecklistGenerator(category=category, api_key=os.getenv("OPENAI_API_KEY"))
-
+    if args.generate and findings_names:
+        import asyncio
+        
+        asyncio.run(generate_checklists(findings_names, args))
     
     logger.info("Checklist generator completed successfully")
 
+def report_profile(profiler, output_path: str = None) -> None:
+    """Print the summary table of a profiled run and optionally write its Chrome trace."""
+    print(profiler.summary())
+    if output_path:
+        profiler.write_trace(Path(output_path))
+
+def main():
+    # Parse command line arguments; --help exits before anything else is loaded
+    args = parse_arguments()
+    
+    # Load environment variables
+    load_environment()
+    
+    if not args.profile:
+        run_pipeline(args)
+        return
+    
+    profiler = instrumentation.enable()
+    try:
+        run_pipeline(args)
+    finally:
+        instrumentation.disable()
+        report_profile(profiler, args.profile_output)
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
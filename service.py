@@ -0,0 +1,533 @@
+#!/usr/bin/env python3
+"""
+Checklist service module.
+Runs retrieve, generate and run jobs in a long-lived process that keeps the
+TiDB connection pool, the query cache, the local findings index, the parsed
+checklists and the LLM client warm between requests.
+
+Jobs are queued for a bounded pool of workers. A job submitted while an
+identical one (same command, category and options) is queued or running is
+coalesced into it, and jobs writing the same findings run one at a time.
+
+HTTP API (JSON bodies and responses):
+    POST /jobs        Submit {"command": "retrieve" | "generate" | "run", "category": "...",
+                      "options": {...}, "wait": true | <seconds>}; 'options' override the
+                      defaults given to 'main.py serve' (see JOB_OPTIONS). Returns the job,
+                      with 202 while it is unfinished, or 503 when the queue is full
+    GET /jobs/<id>    Get a job
+    GET /jobs         List the recent jobs
+    GET /health       Get the worker and queue state
+
+Usage:
+    poetry run python main.py serve --workers 4
+    curl -s localhost:8765/jobs -d '{"command": "run", "category": "vesting", "wait": true}'
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import queue
+import signal
+import socketserver
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Dict, Any, Optional
+
+from finding_retriever.dataset import PARTITION_COLUMNS
+from finding_retriever.instrumentation import span
+from finding_retriever.query_builder import ALL_COLUMNS
+from finding_retriever.ranking import RANKING_METHODS
+from finding_retriever.store import SUPPORTED_FORMATS
+
+logger = logging.getLogger(__name__)
+
+JOB_COMMANDS = ('retrieve', 'generate', 'run')
+
+# Options a job may override; the others configure resources shared by all jobs.
+# Custom SQL ('query') is deliberately absent: the API is unauthenticated, so
+# clients only pick categories and filters of the queries the service builds
+JOB_OPTIONS = (
+    'format', 'incremental', 'source', 'partition_by', 'chunk_rows', 'restart', 'query_timeout',
+    'batch_size', 'columns', 'impact',
+    'published_after', 'published_before', 'audit_company', 'refresh', 'limit',
+    'dedup', 'dedup_threshold', 'rank', 'rank_method', 'top_k', 'min_score',
+    'context_window', 'skip_covered', 'coverage_threshold',
+)
+
+# Allowed values of options that are not free-form
+OPTION_CHOICES = {
+    'format': tuple(SUPPORTED_FORMATS),
+    'source': ('solodit_tidb', 'local_index'),
+    'partition_by': PARTITION_COLUMNS + ('none',),
+    'rank_method': tuple(RANKING_METHODS),
+}
+
+# Types of options whose default is None
+NULLABLE_OPTION_TYPES = {
+    'query_timeout': (int, float),
+    'published_after': str,
+    'published_before': str,
+    'limit': int,
+    'top_k': int,
+    'min_score': (int, float),
+}
+
+# Finished jobs kept for GET /jobs/<id>
+MAX_FINISHED_JOBS = 1000
+
+
+class ServiceBusy(Exception):
+    """Raised when the job queue is full or the service is stopping."""
+
+
+class Job:
+    """A retrieve, generate or run request for one category."""
+
+    def __init__(self, command: str, category: str, options: Dict[str, Any], args: argparse.Namespace):
+        self.id = uuid.uuid4().hex[:12]
+        self.command = command
+        self.category = category
+        self.options = options
+        self.args = args
+        self.status = "queued"
+        self.result: Dict[str, Any] = {}
+        self.error: Optional[str] = None
+        self.requests = 1
+        self.submitted = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.done = threading.Event()
+
+    @property
+    def key(self) -> tuple:
+        """Identity of the job for coalescing duplicate requests."""
+        return self.command, self.category, json.dumps(self.options, sort_keys=True)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "command": self.command,
+            "category": self.category,
+            "options": self.options,
+            "status": self.status,
+            "result": self.result,
+            "error": self.error,
+            "requests": self.requests,
+            "queued_seconds": round((self.started or time.time()) - self.submitted, 3),
+            "run_seconds": round((self.finished or time.time()) - self.started, 3) if self.started else None,
+        }
+
+
+def job_arguments(defaults: argparse.Namespace, options: Dict[str, Any]) -> argparse.Namespace:
+    """
+    Apply the options of a job to the service defaults.
+
+    Args:
+        defaults: Arguments the service was started with
+        options: Job options from the request
+
+    Returns:
+        Arguments of the job
+
+    Raises:
+        ValueError: If an option is unknown or has an invalid value
+    """
+    unknown = sorted(set(options) - set(JOB_OPTIONS))
+    if unknown:
+        raise ValueError(f"Unknown job options: {', '.join(unknown)}")
+    args = argparse.Namespace(**vars(defaults))
+    for name, value in options.items():
+        default = getattr(defaults, name)
+        if name == 'columns':
+            if value == 'all' or value == ['all']:
+                value = None
+            elif not isinstance(value, list) or set(value) - set(ALL_COLUMNS):
+                raise ValueError(f"'columns' must be 'all' or a list of columns from {', '.join(ALL_COLUMNS)}")
+        elif name in ('impact', 'audit_company'):
+            if value is not None and not (isinstance(value, list) and all(isinstance(v, str) for v in value)):
+                raise ValueError(f"'{name}' must be a list of strings")
+        elif name in NULLABLE_OPTION_TYPES:
+            if value is not None and not isinstance(value, NULLABLE_OPTION_TYPES[name]):
+                raise ValueError(f"'{name}' has an invalid type")
+        elif not isinstance(value, type(default)) and not (isinstance(default, float) and isinstance(value, int)):
+            raise ValueError(f"'{name}' must be of type {type(default).__name__}")
+        if name in OPTION_CHOICES and value not in OPTION_CHOICES[name]:
+            raise ValueError(f"'{name}' must be one of {', '.join(OPTION_CHOICES[name])}")
+        setattr(args, name, value)
+    if args.top_k is not None or args.min_score is not None:
+        args.rank = True
+    return args
+
+
+class ChecklistService:
+    """Runs jobs on a bounded worker pool with warm connections and caches."""
+
+    def __init__(self, args: argparse.Namespace, workers: int = 4, queue_size: int = 64):
+        """
+        Initialize the service.
+
+        Args:
+            args: Parsed 'serve' arguments, used as the defaults of every job
+            workers: Number of jobs run at once
+            queue_size: Number of jobs waiting for a worker before new ones are rejected
+        """
+        self.defaults = args
+        self.workers = workers
+        self._queue: "queue.Queue[Optional[Job]]" = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._inflight: Dict[tuple, Job] = {}
+        self._findings_locks: Dict[str, threading.Lock] = {}
+        self._threads: List[threading.Thread] = []
+        self._running = 0
+        self._stopping = False
+        self.started = time.time()
+
+        # Warm state shared by the jobs, created on first use
+        self._resource_lock = threading.Lock()
+        self._query_cache = None
+        self._tidb_retriever = None
+        self._local_index = None
+        self._checklist_cache = None
+        self._client = None
+        self._response_cache = None
+        self._normalizer = None
+        # Generation runs on one event loop so that all jobs share the client's rate limits
+        self._loop = asyncio.new_event_loop()
+        self._loop_thread = threading.Thread(target=self._loop.run_forever, name="service-llm", daemon=True)
+
+    def start(self) -> None:
+        """Start the workers and connect to TiDB ahead of the first job."""
+        from checklist_generator.generator import ChecklistCache
+        from finding_retriever.local_index import FindingsIndex
+
+        self._checklist_cache = ChecklistCache()
+        self._local_index = FindingsIndex(keep_open=True)
+        self._loop_thread.start()
+        for number in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"service-worker-{number + 1}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+        if self.defaults.source == 'solodit_tidb':
+            try:
+                self._tidb()._get_pool()
+            except Exception as e:
+                logger.warning(f"Could not connect to TiDB yet, retrying on the first job: {e}")
+        logger.info(f"Service started with {self.workers} workers")
+
+    def stop(self) -> None:
+        """Stop accepting jobs, fail the queued ones, wait for the running ones and release resources."""
+        with self._lock:
+            self._stopping = True
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+
+        if self._client is not None:
+            asyncio.run_coroutine_threadsafe(self._client.close(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._loop_thread.join()
+        self._loop.close()
+        if self._normalizer is not None:
+            self._normalizer.close()
+        if self._tidb_retriever is not None:
+            self._tidb_retriever.close()
+        if self._local_index is not None:
+            self._local_index.close()
+        if self._query_cache is not None:
+            self._query_cache.log_stats()
+        if self._response_cache is not None:
+            self._response_cache.log_stats()
+        logger.info("Service stopped")
+
+    def submit(self, command: str, category: str, options: Optional[Dict[str, Any]] = None) -> Job:
+        """
+        Queue a job, or join an identical one that is queued or running.
+
+        Args:
+            command: 'retrieve', 'generate' or 'run'
+            category: Category of findings
+            options: Job options overriding the service defaults
+
+        Returns:
+            The job serving the request
+
+        Raises:
+            ValueError: If the request is invalid
+            ServiceBusy: If the queue is full or the service is stopping
+        """
+        if command not in JOB_COMMANDS:
+            raise ValueError(f"'command' must be one of {', '.join(JOB_COMMANDS)}")
+        if not isinstance(category, str) or not category.strip():
+            raise ValueError("'category' is required")
+        options = options or {}
+        if not isinstance(options, dict):
+            raise ValueError("'options' must be an object")
+        job = Job(command, category.strip(), options, job_arguments(self.defaults, options))
+
+        with self._lock:
+            if self._stopping:
+                raise ServiceBusy("Service is stopping")
+            existing = self._inflight.get(job.key)
+            if existing is not None:
+                existing.requests += 1
+                logger.info(f"Coalesced {command} request for '{job.category}' into job {existing.id}")
+                return existing
+            try:
+                self._queue.put_nowait(job)
+            except queue.Full:
+                raise ServiceBusy(f"Job queue is full ({self._queue.maxsize} jobs waiting)")
+            self._inflight[job.key] = job
+            self._jobs[job.id] = job
+            self._prune_jobs()
+        logger.info(f"Queued {command} job {job.id} for '{job.category}'")
+        return job
+
+    def _prune_jobs(self) -> None:
+        finished = [job_id for job_id, job in self._jobs.items() if job.done.is_set()]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Get a job by id, or None if it is unknown or was pruned."""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self) -> List[Job]:
+        """Get the known jobs, oldest first."""
+        with self._lock:
+            return list(self._jobs.values())
+
+    def health(self) -> Dict[str, Any]:
+        """Get the state of the workers and the queue."""
+        with self._lock:
+            return {
+                "status": "stopping" if self._stopping else "ok",
+                "workers": self.workers,
+                "running": self._running,
+                "queued": self._queue.qsize(),
+                "queue_size": self._queue.maxsize,
+                "uptime_seconds": round(time.time() - self.started, 1),
+            }
+
+    def _work(self) -> None:
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            with self._lock:
+                stopping = self._stopping
+                if not stopping:
+                    self._running += 1
+            if stopping:
+                self._finish(job, error="Service stopped before the job started")
+                continue
+            job.status, job.started = "running", time.time()
+            try:
+                with self._findings_lock(job.category):
+                    with span("service.job", command=job.command, category=job.category) as job_span:
+                        job.result = self._execute(job)
+                        job_span.add(rows=job.result.get("findings"))
+                self._finish(job, error=job.result.pop("error", None))
+            except Exception as e:
+                logger.error(f"Job {job.id} ({job.command} '{job.category}') failed: {e}")
+                self._finish(job, error=str(e))
+            finally:
+                with self._lock:
+                    self._running -= 1
+
+    def _finish(self, job: Job, error: Optional[str] = None) -> None:
+        with self._lock:
+            job.status = "failed" if error else "done"
+            job.error = error
+            job.finished = time.time()
+            if self._inflight.get(job.key) is job:
+                del self._inflight[job.key]
+            job.done.set()
+        logger.info(f"Job {job.id} {job.status} in {job.finished - (job.started or job.submitted):.3f}s")
+
+    def _findings_lock(self, findings_name: str) -> threading.Lock:
+        """Lock serializing the jobs that write the same findings."""
+        with self._lock:
+            return self._findings_locks.setdefault(findings_name, threading.Lock())
+
+    def _tidb(self):
+        """Get the TiDB retriever owning the shared connection pool, creating it on first use."""
+        from main import create_query_cache, create_tidb_retriever
+
+        with self._resource_lock:
+            if self._tidb_retriever is None:
+                self._query_cache = create_query_cache(self.defaults)
+                # One connection per worker, and one to spare for warming up
+                self._tidb_retriever = create_tidb_retriever(pool_size=min(self.workers + 1, 32),
+                                                             query_timeout=self.defaults.query_timeout,
+                                                             cache=self._query_cache)
+            return self._tidb_retriever
+
+    def _generation_resources(self) -> tuple:
+        """Get the LLM client, response cache and normalizer shared by generate jobs."""
+        from main import create_llm_client, create_normalizer, create_response_cache
+
+        with self._resource_lock:
+            if self._client is None:
+                self._client = create_llm_client(self.defaults)
+                self._response_cache = create_response_cache(self.defaults)
+                self._normalizer = create_normalizer(self.defaults)
+            return self._client, self._response_cache, self._normalizer
+
+    def _execute(self, job: Job) -> Dict[str, Any]:
+        """
+        Run a job on the calling worker thread.
+
+        Returns:
+            Job result with the number of 'findings' retrieved, the name of the findings
+            the checklist is generated from and the number of findings 'processed' by
+            the model; 'error' is set when generation failed
+        """
+        from finding_retriever.local_index import LocalIndexRetriever
+        from main import build_base_query, generate_checklists, postprocess_findings, retrieve_category
+
+        args = job.args
+        result: Dict[str, Any] = {}
+        if job.command != 'generate':
+            if args.source == 'solodit_tidb':
+                retriever = self._tidb().derive(base_query=build_base_query(args), query_timeout=args.query_timeout,
+                                                refresh_cache=args.refresh)
+            else:
+                retriever = LocalIndexRetriever(index=self._local_index, limit=args.limit)
+            result["findings"] = retrieve_category(retriever, job.category, args)
+            if not result["findings"]:
+                return result
+        findings_name = postprocess_findings(job.category, job.category, args)
+        result["findings_name"] = findings_name
+
+        if job.command in ('generate', 'run'):
+            client, response_cache, normalizer = self._generation_resources()
+            coroutine = generate_checklists({job.category: findings_name}, args, client=client,
+                                            response_cache=response_cache, normalizer=normalizer,
+                                            checklist_cache=self._checklist_cache)
+            processed = asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()[job.category]
+            if processed is None:
+                result["error"] = "Checklist generation failed; see the service log"
+            else:
+                result["processed"] = processed
+        return result
+
+
+class ServiceRequestHandler(BaseHTTPRequestHandler):
+    """Handles the JSON requests of the service API."""
+
+    server_version = "ChecklistService/1.0"
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def service(self) -> ChecklistService:
+        return self.server.service
+
+    def address_string(self) -> str:
+        # Unix socket clients have no address
+        return self.client_address[0] if isinstance(self.client_address, tuple) else "local"
+
+    def log_message(self, format: str, *args) -> None:
+        logger.debug(f"{self.address_string()} {format % args}")
+
+    def _send_json(self, status: int, payload: Any) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_job(self, job: Job) -> None:
+        self._send_json(200 if job.done.is_set() else 202, job.to_dict())
+
+    def do_GET(self) -> None:
+        path = self.path.split("?", 1)[0].rstrip("/")
+        if path == "/health":
+            self._send_json(200, self.service.health())
+        elif path == "/jobs":
+            self._send_json(200, [job.to_dict() for job in self.service.jobs()])
+        elif path.startswith("/jobs/"):
+            job = self.service.get(path[len("/jobs/"):])
+            if job is None:
+                self._send_json(404, {"error": "Unknown job"})
+            else:
+                self._send_job(job)
+        else:
+            self._send_json(404, {"error": f"Unknown path {path}"})
+
+    def do_POST(self) -> None:
+        path = self.path.split("?", 1)[0].rstrip("/")
+        # Read the body in any case so that the connection can be reused
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if path != "/jobs":
+            self._send_json(404, {"error": f"Unknown path {path}"})
+            return
+        try:
+            request = json.loads(body or b"{}")
+            if not isinstance(request, dict):
+                raise ValueError("Request body must be an object")
+            job = self.service.submit(request.get("command", "run"), request.get("category"),
+                                      request.get("options"))
+        except (ValueError, TypeError) as e:
+            self._send_json(400, {"error": str(e)})
+            return
+        except ServiceBusy as e:
+            self._send_json(503, {"error": str(e)})
+            return
+
+        wait = request.get("wait")
+        if wait is True:
+            job.done.wait()
+        elif isinstance(wait, (int, float)) and wait > 0:
+            job.done.wait(wait)
+        self._send_job(job)
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """HTTP server listening on a Unix socket, one thread per connection."""
+
+    daemon_threads = True
+
+
+def serve(args: argparse.Namespace) -> None:
+    """
+    Run the service until interrupted.
+
+    Args:
+        args: Parsed 'serve' arguments
+    """
+    service = ChecklistService(args, workers=args.workers, queue_size=args.queue_size)
+    service.start()
+
+    if args.socket:
+        if os.path.exists(args.socket):
+            os.unlink(args.socket)
+        server = UnixHTTPServer(args.socket, ServiceRequestHandler)
+        os.chmod(args.socket, 0o600)
+        address = args.socket
+    else:
+        server = ThreadingHTTPServer((args.host, args.port), ServiceRequestHandler)
+        address = f"http://{args.host}:{server.server_address[1]}"
+    server.service = service
+
+    # serve_forever() runs on this thread, so shutdown() must come from another
+    signal.signal(signal.SIGTERM, lambda signum, frame: threading.Thread(target=server.shutdown).start())
+    logger.info(f"Serving checklist jobs on {address}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Interrupted")
+    finally:
+        server.server_close()
+        service.stop()
+        if args.socket and os.path.exists(args.socket):
+            os.unlink(args.socket)